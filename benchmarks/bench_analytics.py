@@ -0,0 +1,63 @@
+""" Time to build occupancy statistics for 2,000 car parks x 30 days of minute-level history.
+
+Run with: python -m benchmarks.bench_analytics [days]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from modules.analytics import OccupancyAnalytics
+from .synthetic import carpark_numbers
+
+CAR_PARKS = 2_000
+
+
+def synthetic_day(day, numbers, seed=0):
+    """ One day of minute polls for every car park, with categorical keys as compact frames hold them. """
+    rng = np.random.default_rng(seed)
+    minutes = 24 * 60
+    feed = pd.date_range(day, periods=minutes, freq='min', tz='Asia/Singapore')
+    total_lots = rng.integers(50, 800, len(numbers))
+    # A daytime peak with per-car-park noise.
+    peak = np.sin(np.pi * np.clip((feed.hour.to_numpy() - 7) / 12, 0, 1))
+    taken = np.clip(peak[None, :] * rng.uniform(0.4, 1.0, (len(numbers), 1))
+                    + rng.normal(0, 0.05, (len(numbers), minutes)), 0, 1)
+    return pd.DataFrame({
+        'car_park_no': pd.Categorical(np.repeat(numbers, minutes)),
+        'lot_type': pd.Categorical(np.full(len(numbers) * minutes, 'C')),
+        'lots_available': (np.repeat(total_lots, minutes) * (1 - taken.ravel())).astype(np.int32),
+        'total_lots': np.repeat(total_lots, minutes).astype(np.int32),
+        'feed_timestamp': pd.to_datetime(np.tile(feed.asi8, len(numbers)), utc=True).tz_convert(feed.tz),
+    })
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    numbers = carpark_numbers(CAR_PARKS)
+    start = pd.Timestamp('2025-03-03', tz='Asia/Singapore')
+    analytics = OccupancyAnalytics(start, start + pd.Timedelta(days=days) - pd.Timedelta(minutes=1))
+    elapsed, rows = 0.0, 0
+    for day in range(days):
+        chunk = synthetic_day(start + pd.Timedelta(days=day), numbers, seed=day)
+        began = time.perf_counter()
+        analytics.add(chunk)
+        elapsed += time.perf_counter() - began
+        rows += len(chunk)
+
+    timings = {}
+    for name, stage in [('rolling average (1h)', lambda: analytics.rolling_average('1h')),
+                        ('hour-of-week profile', analytics.hour_of_week_profile),
+                        ('forecast (30 min)', lambda: analytics.forecast(30))]:
+        began = time.perf_counter()
+        stage()
+        timings[name] = time.perf_counter() - began
+
+    print(f"rows:                  {rows:,} ({CAR_PARKS:,} car parks x {days} days)")
+    print(f"accumulate:            {elapsed:.2f} s ({rows / elapsed / 1e6:.1f} M rows/s)")
+    for name, seconds in timings.items():
+        print(f"{name + ':':<22} {seconds * 1e3:.1f} ms")
+    print(f"total:                 {elapsed + sum(timings.values()):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+""" Feed parsing: APIFetcher.parse_payload versus the original per-record loop.
+
+Run with: python -m benchmarks.bench_api_parse
+"""
+import json
+import timeit
+import pandas as pd
+from modules.api_fetcher import APIFetcher, orjson
+from .synthetic import synthetic_feed
+
+
+def legacy_parse(data):
+    """ The parser APIFetcher used before it read every lot type. """
+    item = data["items"][0]
+    feed_timestamp = item.get("timestamp", None)
+    records = []
+    for record in item.get("carpark_data", []):
+        carpark_number = record.get("carpark_number")
+        update_datetime = record.get("update_datetime")
+        carpark_info_list = record.get("carpark_info", [])
+        if not carpark_number or not update_datetime or not carpark_info_list:
+            continue
+        info = carpark_info_list[0]
+        try:
+            total_lots = int(info.get("total_lots"))
+            lot_type = info.get("lot_type")
+            lots_available = int(info.get("lots_available"))
+        except (ValueError, TypeError):
+            continue
+        records.append({
+            "carpark_number": carpark_number,
+            "update_datetime": update_datetime,
+            "total_lots": total_lots,
+            "lot_type": lot_type,
+            "lots_available": lots_available,
+            "feed_timestamp": feed_timestamp,
+        })
+    return pd.DataFrame(records)
+
+
+def best(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    numbers = pd.read_csv('data/HDBCarparkInformation.csv', usecols=['car_park_no'])['car_park_no']
+    for scale in (1, 10):
+        payload = synthetic_feed([f"{n}-{i}" for i in range(scale) for n in numbers])
+        raw = json.dumps(payload).encode('utf-8')
+        rows = len(APIFetcher.parse_payload(payload))
+        print(f"car parks: {len(numbers) * scale}, lot rows: {rows}, payload: {len(raw) / 1e6:.1f} MB")
+        print(f"  json.loads        {best(lambda: json.loads(raw)) * 1e3:8.2f} ms")
+        if orjson is not None:
+            print(f"  orjson.loads      {best(lambda: orjson.loads(raw)) * 1e3:8.2f} ms")
+        print(f"  legacy loop       {best(lambda: legacy_parse(payload)) * 1e3:8.2f} ms (first lot type only)")
+        print(f"  parse_payload     {best(lambda: APIFetcher.parse_payload(payload)) * 1e3:8.2f} ms (all lot types)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+""" Compound attribute filter: a chain of pandas masks versus AttributeIndex bitmaps.
+
+Run with: python -m benchmarks.bench_attribute_filter
+"""
+import timeit
+from modules.attribute_index import AttributeIndex
+from .synthetic import synthetic_static
+
+WHERE = {'night_parking': 'YES', 'car_park_type': 'MULTI-STOREY CAR PARK', 'gantry_height': [2.1, None],
+         'car_park_basement': 'N'}
+
+
+def pandas_mask(data):
+    return ((data['night_parking'] == 'YES') & (data['car_park_type'] == 'MULTI-STOREY CAR PARK')
+            & (data['gantry_height'] >= 2.1) & (data['car_park_basement'] == 'N')).to_numpy()
+
+
+def best(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    for car_parks in (2_500, 250_000):
+        data = synthetic_static(car_parks)
+        number = max(1, 250_000 // car_parks)
+        build = best(lambda: AttributeIndex(data), 1)
+        index = AttributeIndex(data)
+        assert (index.mask(WHERE) == pandas_mask(data)).all()
+        print(f"car parks: {car_parks:,} ({index.mask(WHERE).sum():,} match)")
+        print(f"  pandas masks     {best(lambda: pandas_mask(data), number) * 1e3:8.3f} ms")
+        print(f"  bitmap index     {best(lambda: index.mask(WHERE), number) * 1e3:8.3f} ms "
+              f"(built once in {build * 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
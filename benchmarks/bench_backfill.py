@@ -0,0 +1,45 @@
+""" Backfilling minute snapshots from a local stub feed with 50 ms latency: one APIFetcher versus AsyncFetcher.
+
+Run with: python -m benchmarks.bench_backfill [snapshots]
+"""
+import sys
+import time
+import pandas as pd
+from modules.api_fetcher import APIFetcher
+from modules.async_fetcher import AsyncFetcher, snapshot_times
+from tests.stub_server import StubFeedServer
+from .synthetic import carpark_numbers, synthetic_feed
+
+CAR_PARKS = 2_000
+LATENCY = 0.05
+START = pd.Timestamp('2025-03-08 00:00')
+
+
+def main():
+    snapshots = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    payload = synthetic_feed(carpark_numbers(CAR_PARKS))
+
+    def snapshot(params):
+        item = dict(payload['items'][0], timestamp=params['date_time'] + '+08:00')
+        return {'items': [item]}
+
+    end = START + pd.Timedelta(minutes=snapshots - 1)
+    with StubFeedServer(snapshot, etag=None, delay=LATENCY) as server:
+        began = time.perf_counter()
+        fetcher = APIFetcher(server.url)
+        for date_time in snapshot_times(START, end):
+            fetcher.fetch_data(date_time=date_time)
+        sequential = time.perf_counter() - began
+
+        began = time.perf_counter()
+        fetched = sum(1 for _ in AsyncFetcher(limit=16, per_host=16, rate=None).backfill(server.url, START, end))
+        concurrent = time.perf_counter() - began
+
+    print(f"snapshots:   {snapshots} x {CAR_PARKS:,} car parks, {LATENCY * 1e3:.0f} ms latency")
+    for name, seconds in [('sequential', sequential), ('async', concurrent)]:
+        print(f"{name + ':':<12} {seconds:.2f} s ({seconds / snapshots * 1440 / 60:.1f} min per day of minutes)")
+    print(f"fetched:     {fetched} snapshots")
+
+
+if __name__ == "__main__":
+    main()
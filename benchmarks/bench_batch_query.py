@@ -0,0 +1,35 @@
+""" Time to resolve 10k car park numbers with batch_query after data is loaded.
+
+Run with: python -m benchmarks.bench_batch_query
+"""
+import contextlib
+import io
+import time
+import numpy as np
+from modules.cli import batch_query
+from .synthetic import synthetic_static, synthetic_availability
+
+CAR_PARKS = 2_500
+LOOKUPS = 10_000
+
+
+def main():
+    static_data = synthetic_static(CAR_PARKS)
+    data = static_data.merge(synthetic_availability(static_data), on='car_park_no', how='left')
+    rng = np.random.default_rng(1)
+    # Mostly known numbers with a few that are not in the data.
+    numbers = list(rng.choice(data['car_park_no'].to_numpy(), LOOKUPS))
+    numbers[::100] = [f"X{i}" for i in range(len(numbers[::100]))]
+
+    print(f"{'format':>8} {'seconds':>10} {'output (kB)':>12}")
+    for output_format in ('text', 'ndjson', 'csv'):
+        out = io.StringIO()
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(out):
+            batch_query(numbers, data, output_format=output_format)
+        elapsed = time.perf_counter() - began
+        print(f"{output_format:>8} {elapsed:>10.3f} {len(out.getvalue()) / 1e3:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
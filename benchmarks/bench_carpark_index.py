@@ -0,0 +1,30 @@
+""" Lookup cost of CarparkIndex versus a boolean mask as the catalogue grows.
+
+Run with: python -m benchmarks.bench_carpark_index
+"""
+import timeit
+import numpy as np
+from modules.carpark_index import CarparkIndex
+from .synthetic import synthetic_static, synthetic_availability
+
+SIZES = [1_000, 10_000, 100_000]
+LOOKUPS = 200
+
+
+def main():
+    print(f"{'car parks':>10} {'mask (us)':>12} {'index (us)':>12} {'bulk 1k (ms)':>14}")
+    for n in SIZES:
+        static_data = synthetic_static(n)
+        data = static_data.merge(synthetic_availability(static_data), on='car_park_no', how='left')
+        keys = np.random.default_rng(1).choice(data['car_park_no'].to_numpy(), LOOKUPS)
+        index = CarparkIndex(data)
+
+        mask = timeit.timeit(lambda: [data[data['car_park_no'] == k] for k in keys], number=1) / LOOKUPS
+        single = min(timeit.repeat(lambda: [index.lookup(k) for k in keys], number=1, repeat=3)) / LOOKUPS
+        bulk_keys = keys.repeat(5)
+        bulk = min(timeit.repeat(lambda: index.lookup_many(bulk_keys), number=1, repeat=3))
+        print(f"{n:>10} {mask * 1e6:>12.1f} {single * 1e6:>12.1f} {bulk * 1e3:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+""" Loading a 500k-row static catalogue: the original per-value cleaning versus vectorized, chunked and pooled loads.
+
+Run with: python -m benchmarks.bench_data_loader [rows] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from modules.data_loader import DataLoader
+from .synthetic import synthetic_static
+
+CHUNK_ROWS = 100_000
+
+
+def legacy_load(path):
+    """ DataLoader.load_data before cleaning was vectorized. """
+    data = pd.read_csv(path)
+    data.columns = data.columns.str.strip()
+    data.replace("", pd.NA, inplace=True)
+    for col in data.select_dtypes(include=['object']).columns:
+        data[col] = data[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
+    data = data.where(pd.notnull(data), pd.NA)
+    data['x_coord'] = data['x_coord'].astype(float)
+    data['y_coord'] = data['y_coord'].astype(float)
+    data['car_park_decks'] = data['car_park_decks'].astype(int)
+    data['gantry_height'] = data['gantry_height'].astype(float)
+    return data
+
+
+def peak_mb(load):
+    tracemalloc.start()
+    load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(2, os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalogue.csv')
+        data = synthetic_static(rows)
+        # Padded text, as merged third-party catalogues arrive.
+        data['address'] = ' ' + data['address'] + ' '
+        data['car_park_type'] = data['car_park_type'] + ' '
+        data.to_csv(path, index=False)
+        print(f"rows: {rows:,} ({os.path.getsize(path) / 1e6:.0f} MB CSV), {os.cpu_count()} CPUs")
+
+        loads = [
+            ('original', lambda: legacy_load(path)),
+            ('vectorized', DataLoader(path).load_data),
+            ('chunked', DataLoader(path, chunk_rows=CHUNK_ROWS).load_data),
+            (f'chunked, {workers} workers', DataLoader(path, chunk_rows=CHUNK_ROWS, workers=workers).load_data),
+            ('chunked, compact', DataLoader(path, chunk_rows=CHUNK_ROWS, compact=True).load_data),
+        ]
+        print(f"{'load':<24} {'seconds':>8}")
+        for name, load in loads:
+            began = time.perf_counter()
+            load()
+            print(f"{name:<24} {time.perf_counter() - began:>8.2f}")
+
+        stream = lambda: sum(len(chunk) for chunk in DataLoader(path).iter_chunks(CHUNK_ROWS))
+        print(f"{'peak traced memory':<24} {'MB':>8}")
+        for name, load in [('vectorized', loads[1][1]), ('chunked, compact', loads[4][1]), ('iter_chunks', stream)]:
+            print(f"{name:<24} {peak_mb(load):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
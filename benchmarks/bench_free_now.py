@@ -0,0 +1,38 @@
+""" "Free right now" across the catalogue: reading each row's schedule versus ScheduleTable.
+
+Run with: python -m benchmarks.bench_free_now
+"""
+import timeit
+import numpy as np
+from modules.parking_schedule import ScheduleTable, compile_schedule, day_bits, local_time
+from .synthetic import synthetic_static
+
+AT = local_time('2025-03-09T08:00')
+
+
+def per_row(values):
+    """ Parse and evaluate every row's schedule, as a row-wise apply would. """
+    minute, today = AT.hour * 60 + AT.minute, day_bits(AT.date())
+    return np.array([any(days & today and start <= minute < end for days, start, end in
+                         compile_schedule.__wrapped__(value)) for value in values])
+
+
+def best(func, number=1):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    for car_parks in (2_500, 250_000):
+        data = synthetic_static(car_parks)
+        values = data['free_parking'].to_numpy()
+        build = best(lambda: ScheduleTable(data, 'free_parking'))
+        table = ScheduleTable(data, 'free_parking')
+        assert (table.active(AT) == per_row(values)).all()
+        print(f"car parks: {car_parks:,} ({table.active(AT).sum():,} free at {AT:%a %H:%M})")
+        print(f"  per row          {best(lambda: per_row(values)) * 1e3:8.2f} ms")
+        print(f"  ScheduleTable    {best(lambda: table.active(AT), 20) * 1e3:8.2f} ms "
+              f"(compiled once in {build * 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+""" Disk use and scan time of HistoryStore for minute-level polling of about 2,000 car parks.
+
+Run with: python -m benchmarks.bench_history_store [days]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from modules.history_store import HistoryStore
+from .synthetic import carpark_numbers
+
+CAR_PARKS = 2_000
+LOT_TYPES = np.array(['C', 'Y', 'H'], dtype=object)
+
+
+def synthetic_history(start, minutes, numbers, seed=0):
+    """ One row per car park, lot type and minute, shaped like stacked fetch_data snapshots. """
+    rng = np.random.default_rng(seed)
+    # Every car park reports cars; roughly a third also report motorcycles or heavy vehicles.
+    lot_types = [LOT_TYPES[:1 + (i % 3 == 0) + (i % 9 == 0)] for i in range(len(numbers))]
+    keys = pd.DataFrame([(n, t) for n, types in zip(numbers, lot_types) for t in types],
+                        columns=['carpark_number', 'lot_type'])
+    feed = start + pd.to_timedelta(np.repeat(np.arange(minutes), len(keys)), unit='min')
+    total_lots = np.tile(rng.integers(20, 800, len(keys)), minutes)
+    return pd.DataFrame({
+        'carpark_number': np.tile(keys['carpark_number'].to_numpy(), minutes),
+        'update_datetime': (feed - pd.Timedelta(seconds=20)).tz_localize(None),
+        'total_lots': total_lots,
+        'lot_type': np.tile(keys['lot_type'].to_numpy(), minutes),
+        'lots_available': rng.integers(0, total_lots + 1),
+        'feed_timestamp': feed,
+    })
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    numbers = carpark_numbers(CAR_PARKS)
+    directory = tempfile.mkdtemp()
+    try:
+        store = HistoryStore(directory)
+        start = pd.Timestamp('2025-03-10', tz='Asia/Singapore')
+        began = time.perf_counter()
+        for hour in range(days * 24):
+            store.append(synthetic_history(start + pd.Timedelta(hours=hour), 60, numbers, seed=hour))
+        append = time.perf_counter() - began
+        began = time.perf_counter()
+        store.compact()
+        compact = time.perf_counter() - began
+
+        rows = sum(segment['rows'] for segment in store.segments)
+        size = sum(os.path.getsize(os.path.join(directory, s['file'])) for s in store.segments)
+        began = time.perf_counter()
+        history = store.query(numbers[CAR_PARKS // 2])
+        one_carpark = time.perf_counter() - began
+        began = time.perf_counter()
+        store.query(start=start + pd.Timedelta(hours=12), end=start + pd.Timedelta(hours=13))
+        one_hour = time.perf_counter() - began
+
+        print(f"rows stored:             {rows:,} ({days} day(s))")
+        print(f"disk:                    {size / 1e6:.1f} MB ({size / rows:.2f} bytes/row)")
+        print(f"append (per hour):       {append / (days * 24) * 1e3:.1f} ms")
+        print(f"compact:                 {compact:.2f} s")
+        print(f"one car park, all time:  {one_carpark * 1e3:.1f} ms ({len(history):,} rows)")
+        print(f"all car parks, one hour: {one_hour * 1e3:.1f} ms")
+        print(f"projected year:          {size / days * 365 / 1e9:.2f} GB on disk, "
+              f"~{one_carpark / days * 365:.1f} s per car park scan")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
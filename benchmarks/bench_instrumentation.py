@@ -0,0 +1,47 @@
+""" Cost of the instrumentation hooks per call, switched off (the default) and on.
+
+Run with: python -m benchmarks.bench_instrumentation
+"""
+import timeit
+from modules.instrumentation import count, instruments, stage, timed
+
+CALLS = 200_000
+
+
+def bare():
+    pass
+
+
+@timed('bench')
+def decorated():
+    pass
+
+
+def staged():
+    with stage('bench'):
+        pass
+
+
+def counted():
+    count('bench', rows=1)
+
+
+def per_call(function):
+    return timeit.timeit(function, number=CALLS) / CALLS * 1e9
+
+
+def main():
+    baseline = per_call(bare)
+    for enabled in (False, True):
+        if enabled:
+            instruments.enable()
+        print(f"instrumentation {'on' if enabled else 'off'}:")
+        print(f"  bare call:      {baseline:.0f} ns")
+        print(f"  @timed:         {per_call(decorated):.0f} ns")
+        print(f"  with stage():   {per_call(staged):.0f} ns")
+        print(f"  count():        {per_call(counted):.0f} ns")
+    instruments.disable()
+
+
+if __name__ == "__main__":
+    main()
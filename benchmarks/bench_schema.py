@@ -0,0 +1,49 @@
+""" Validating a catalogue with some malformed rows: a per-row try/except loop versus Schema.validate.
+
+Run with: python -m benchmarks.bench_schema
+"""
+import timeit
+import numpy as np
+from modules.data_loader import CATALOGUE_SCHEMA
+from .synthetic import synthetic_static
+
+CAR_PARKS = 250_000
+BAD_SHARE = 0.01
+
+
+def per_row(data):
+    """ Check and cast each row in Python, keeping the rows that pass. """
+    kept = []
+    for row in data.itertuples(index=False):
+        try:
+            decks = int(row.car_park_decks)
+            height = float(row.gantry_height)
+        except (TypeError, ValueError):
+            continue
+        if decks >= 0 and height >= 0 and isinstance(row.car_park_no, str) and row.night_parking in ('YES', 'NO'):
+            kept.append(row)
+    return kept
+
+
+def best(func, number=1):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    data = synthetic_static(CAR_PARKS)
+    rng = np.random.default_rng(0)
+    bad = rng.choice(CAR_PARKS, int(CAR_PARKS * BAD_SHARE), replace=False)
+    data['car_park_decks'] = data['car_park_decks'].astype(object)
+    data.loc[bad[::2], 'car_park_decks'] = 'n/a'
+    data.loc[bad[1::2], 'gantry_height'] = -1.0
+    valid, quarantine = CATALOGUE_SCHEMA.validate(data)
+    assert len(valid) == len(per_row(data)) == CAR_PARKS - len(bad)
+    print(f"car parks: {CAR_PARKS:,}, quarantined: {len(quarantine):,}")
+    print(f"  per-row loop     {best(lambda: per_row(data)) * 1e3:8.1f} ms")
+    print(f"  Schema.validate  {best(lambda: CATALOGUE_SCHEMA.validate(data)) * 1e3:8.1f} ms")
+    clean = synthetic_static(CAR_PARKS)
+    print(f"  clean catalogue  {best(lambda: CATALOGUE_SCHEMA.validate(clean)) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+""" Rendering cost of a broad address search: iterrows and print per line versus the formatter layer.
+
+Run with: python -m benchmarks.bench_search_output
+"""
+import contextlib
+import io
+import time
+from modules.cli import search_by_address
+from .synthetic import synthetic_static, synthetic_availability
+
+CAR_PARKS = 20_000
+SEPARATOR = "-------------------------------------------------"
+
+
+def legacy_search(result):
+    for _, row in result.iterrows():
+        print("Car Park Details:")
+        print(f"Car Park No: {row['car_park_no']}")
+        print(f"Address: {row['address']}")
+        print(f"Operating Hours: {row.get('operating_hours', 'N/A')}")
+        print(f"Rules: {row.get('rules', 'N/A')}")
+        print(f"Parking System: {row.get('type_of_parking_system', 'N/A')}")
+        print(f"Capacity: Total lots: {row.get('total_lots', 'N/A')}, Lots available: {row.get('lots_available', 'N/A')}")
+        print(f"Coordinates: (x: {row.get('x_coord', 'N/A')}, y: {row.get('y_coord', 'N/A')})")
+        print(f"Update Time: {row.get('update_datetime', 'N/A')}")
+        print(f"Feed Timestamp: {row.get('feed_timestamp', 'N/A')}")
+        print(SEPARATOR)
+
+
+def timed(function):
+    out = io.StringIO()
+    began = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        function()
+    return time.perf_counter() - began, len(out.getvalue())
+
+
+def main():
+    static_data = synthetic_static(CAR_PARKS)
+    data = static_data.merge(synthetic_availability(static_data), on='car_park_no', how='left')
+    timed(lambda: search_by_address('BLK', data, limit=1))  # build the address index outside the timings
+    print(f"{'renderer':>22} {'seconds':>10} {'output (kB)':>12}")
+    rows = [
+        ('iterrows + print', lambda: legacy_search(data)),
+        ('formatter text', lambda: search_by_address('BLK', data)),
+        ('formatter ndjson', lambda: search_by_address('BLK', data, output_format='ndjson')),
+        ('formatter csv', lambda: search_by_address('BLK', data, output_format='csv')),
+        ('formatter text page', lambda: search_by_address('BLK', data, limit=50, offset=1000)),
+    ]
+    for name, function in rows:
+        seconds, size = timed(function)
+        print(f"{name:>22} {seconds:>10.3f} {size / 1e3:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+""" Memory of a pool of query workers that each merge their own frame versus workers attached to one SharedTable.
+
+Memory is the workers' summed proportional set size (PSS), which splits each shared page between the
+processes mapping it, so it is Linux only.
+
+Run with: python -m benchmarks.bench_shared_table
+"""
+import multiprocessing
+import os
+import tempfile
+import timeit
+from modules.data_merger import DataMerger
+from modules.shared_table import SharedTable
+from .synthetic import synthetic_availability, synthetic_static
+
+CAR_PARKS = 250_000
+WORKERS = (1, 2, 4, 8)
+
+
+def pss():
+    """ This process's proportional set size in bytes. """
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def worker(mode, path, static_data, availability, sizes, done):
+    before = pss()
+    if mode == 'merge':
+        data = DataMerger().merge_data(static_data, availability)
+    else:
+        data = SharedTable(path).frame()
+    # Read every column, as answering queries eventually would.
+    for column in data.columns:
+        data[column].to_numpy()
+    data['lots_available'].sum()
+    sizes.put(pss() - before)
+    done.wait()
+
+
+def pool_memory(mode, workers, path, static_data, availability):
+    context = multiprocessing.get_context('fork')
+    sizes, done = context.Queue(), context.Event()
+    processes = [context.Process(target=worker, args=(mode, path, static_data, availability, sizes, done))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    # Every worker holds its frame until all of them have measured.
+    total = sum(sizes.get() for _ in processes)
+    done.set()
+    for process in processes:
+        process.join()
+    return total
+
+
+def main():
+    static_data = synthetic_static(CAR_PARKS)
+    availability = synthetic_availability(static_data)
+    data = DataMerger().merge_data(static_data, availability)
+    with tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None) as tmp:
+        path = os.path.join(tmp, 'carparks.table')
+        table = SharedTable(path)
+        publish = min(timeit.repeat(lambda: table.publish(data), number=1, repeat=3))
+        merge = min(timeit.repeat(lambda: DataMerger().merge_data(static_data, availability), number=1, repeat=3))
+        attach = min(timeit.repeat(lambda: SharedTable(path).frame(), number=1, repeat=5))
+        print(f"car parks: {CAR_PARKS:,}; table {os.path.getsize(path) / 2**20:.1f} MiB, "
+              f"published in {publish * 1e3:.0f} ms")
+        print(f"per worker: merge {merge * 1e3:.0f} ms, attach {attach * 1e3:.1f} ms")
+        print(f"{'workers':>7} {'merge MiB':>10} {'shared MiB':>11}")
+        for workers in WORKERS:
+            merged = pool_memory('merge', workers, path, static_data, availability)
+            shared = pool_memory('shared', workers, path, static_data, availability)
+            print(f"{workers:>7} {merged / 2**20:>10.1f} {shared / 2**20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+""" What each CLI call costs once the data is loaded somewhere: merging and indexing in-process versus
+indexed SQL against a shared SQLiteStore.
+
+Run with: python -m benchmarks.bench_sqlite_store
+"""
+import contextlib
+import io
+import os
+import tempfile
+import timeit
+from modules import cli
+from modules.data_merger import DataMerger
+from modules.sqlite_store import SQLiteStore
+from .synthetic import synthetic_availability, synthetic_static
+
+CAR_PARKS = 2_500
+
+
+def best(func, number=20):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    static_data = synthetic_static(CAR_PARKS)
+    availability = synthetic_availability(static_data)
+    number = static_data['car_park_no'].iloc[CAR_PARKS // 2]
+    address = static_data['address'].iloc[CAR_PARKS // 2]
+
+    def in_memory(action, *args):
+        # Every CLI call without a daemon merges and indexes before answering.
+        data = DataMerger().merge_data(static_data, availability)
+        cli.build_indexes(data)
+        action(*args[:1], data, *args[1:])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'carparks.db')
+        store = SQLiteStore(path)
+        load = best(lambda: store.load_catalogue(static_data), 1)
+        upsert = best(lambda: store.upsert_availability(availability), 5)
+
+        print(f"car parks: {CAR_PARKS:,}; catalogue load {load * 1e3:.1f} ms, availability upsert {upsert * 1e3:.1f} ms")
+        print(f"{'action':<8} {'in-memory ms':>13} {'store ms':>9}")
+        for name, memory_action, store_action, value in [
+            ('query', cli.query_carpark, cli.store_query, number),
+            ('search', cli.search_by_address, cli.store_search, address),
+            ('near', cli.find_nearest, cli.store_nearest, (30000.0, 35000.0)),
+        ]:
+            memory = best(lambda: in_memory(memory_action, value), 5)
+            # A fresh SQLiteStore per call, as each CLI process opens its own.
+            stored = best(lambda: store_action(value, SQLiteStore(path)))
+            print(f"{name:<8} {memory * 1e3:>13.2f} {stored * 1e3:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+""" Import time of `main.py --help` and of a --query answered from the lookup snapshot, from python -X importtime.
+
+Exits with status 1 when the median import time of either command exceeds the threshold,
+or when either command imports pandas, numpy or requests.
+
+Run with: python -m benchmarks.bench_startup [threshold_ms]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from modules.lookup_snapshot import LookupSnapshot
+from .synthetic import synthetic_static, synthetic_availability
+
+RUNS = 7
+THRESHOLD_MS = 60
+HEAVY = ('numpy', 'pandas', 'requests')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(args):
+    """ Microseconds per top-level import made by the program itself, after interpreter startup. """
+    output = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times, started = {}, False
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not started:
+            started = name.strip() == 'site'
+            continue
+        if not name.startswith('  ') and cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    names = {line.split('|')[-1].strip() for line in output.stderr.splitlines() if '|' in line}
+    return times, names
+
+
+def measure(label, args):
+    totals, walls, names = [], [], set()
+    for _ in range(RUNS):
+        began = time.perf_counter()
+        times, imported = import_times(args)
+        walls.append(time.perf_counter() - began)
+        totals.append(sum(times.values()) / 1e3)
+        names |= imported
+    heavy = sorted(name for name in HEAVY if name in names)
+    print(f"{label:<18} {statistics.median(totals):>10.1f} {statistics.median(walls) * 1e3:>10.1f}  "
+          f"{', '.join(heavy) or '-'}")
+    return statistics.median(totals), heavy
+
+
+def main():
+    threshold = float(sys.argv[1]) if len(sys.argv) > 1 else THRESHOLD_MS
+    static_data = synthetic_static(2_500)
+    data = static_data.merge(synthetic_availability(static_data), on='car_park_no', how='left')
+    number = data['car_park_no'].iloc[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, path = os.path.join(tmp, 'static.csv'), os.path.join(tmp, 'lookup.json')
+        static_data.to_csv(source, index=False)
+        LookupSnapshot(path, source).write(data, time.time() + 3600)
+        query = ("import sys\nfrom modules import cli\n"
+                 f"cli.STATIC_DATA_PATH, cli.LOOKUP_SNAPSHOT_PATH = {source!r}, {path!r}\n"
+                 f"sys.argv = ['main.py', '--query', {number!r}, '--cache-ttl', '3600', '--no-daemon']\n"
+                 "cli.main()")
+
+        print(f"{'command':<18} {'import ms':>10} {'wall ms':>10}  heavy imports")
+        results = [measure('main.py --help', ['main.py', '--help']),
+                   measure('snapshot --query', ['-c', query])]
+
+    failed = [total for total, heavy in results if total > threshold or heavy]
+    print(f"threshold:         {threshold:.0f} ms -> {'FAIL' if failed else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+""" Cost of one --watch poll on the feed's scale: diffing two snapshots and the NDJSON that goes out.
+
+Run with: python -m benchmarks.bench_watch
+"""
+import timeit
+import numpy as np
+from modules.api_fetcher import APIFetcher
+from modules.formatters import NDJSONFormatter
+from modules.watch import diff_snapshots
+from .synthetic import carpark_numbers, synthetic_feed
+
+CAR_PARKS = 2_200
+CHANGES = 40
+
+
+def main():
+    previous = APIFetcher.parse_payload(synthetic_feed(carpark_numbers(CAR_PARKS))).rename(
+        columns={'carpark_number': 'car_park_no'})
+    current = previous.sample(frac=1, random_state=0).reset_index(drop=True)
+    rng = np.random.default_rng(0)
+    changed = rng.choice(len(current), CHANGES, replace=False)
+    current.loc[changed, 'lots_available'] = np.maximum(current.loc[changed, 'lots_available'] - 1, 0)
+
+    runs = 50
+    seconds = timeit.timeit(lambda: diff_snapshots(previous, current), number=runs) / runs
+    deltas = diff_snapshots(previous, current)
+    full = NDJSONFormatter().rows(current)
+    delta = NDJSONFormatter().rows(deltas)
+    print(f"snapshot rows:  {len(current):,} ({CAR_PARKS:,} car parks, shuffled)")
+    print(f"diff:           {seconds * 1e3:.1f} ms")
+    print(f"deltas:         {len(deltas)} records")
+    print(f"NDJSON out:     {len(delta) / 1e3:.1f} kB instead of {len(full) / 1e3:.0f} kB")
+
+
+if __name__ == "__main__":
+    main()
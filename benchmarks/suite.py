@@ -0,0 +1,213 @@
+""" Benchmark suite: the pipeline stages and CLI lookups on the real catalogue and a recorded feed,
+scaled up to 10x, 100x and 1000x the car parks, with JSON baselines and a regression check.
+
+Run with:
+    python -m benchmarks.suite record
+    python -m benchmarks.suite run --scales 1 10 100 --save baseline
+    python -m benchmarks.suite run --scales 1 10 100 --output current.json
+    python -m benchmarks.suite compare benchmarks/baselines/baseline.json current.json --threshold 0.2
+
+record saves the live feed to benchmarks/fixtures/ for later runs to replay; until a recording exists, runs
+replay a synthetic feed for the catalogue's car parks. Each case reports its fastest and median run;
+compare flags cases whose fastest run slowed by more than the threshold, and exits with status 1 if any did.
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+import pandas as pd
+import requests
+from modules import cli
+from modules.api_fetcher import APIFetcher
+from modules.data_loader import DataLoader
+from modules.data_merger import DataMerger
+from .synthetic import scaled_catalogue, scaled_feed, scaled_number, synthetic_feed
+
+FIXTURE_PATH = 'benchmarks/fixtures/carpark-availability.json.gz'
+BASELINE_DIR = 'benchmarks/baselines'
+SCALES = (1, 10, 100)
+REPEAT = 5
+# Slow cases stop repeating once they have used this many seconds.
+CASE_BUDGET = 10.0
+THRESHOLD = 0.2
+
+
+class ReplaySession:
+    """ Stands in for requests.Session, answering every GET with one recorded response body. """
+
+    def __init__(self, body):
+        self.body = body
+        self.headers = {}
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = self.body
+        return response
+
+
+def record(url=cli.API_URL, path=FIXTURE_PATH):
+    """ Save the live feed's response body as a fixture. """
+    response = requests.get(url, timeout=(3.05, 30))
+    response.raise_for_status()
+    APIFetcher.parse_payload(response.json())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wb') as f:
+        f.write(response.content)
+    return path
+
+
+def load_feed(catalogue, path=FIXTURE_PATH):
+    """ The recorded feed payload and 'recorded', or a synthetic one for the catalogue and 'synthetic'. """
+    if os.path.exists(path):
+        with gzip.open(path, 'rb') as f:
+            return json.loads(f.read()), 'recorded'
+    return synthetic_feed(catalogue['car_park_no']), 'synthetic'
+
+
+def measure(function, repeat=REPEAT, budget=CASE_BUDGET):
+    """ Run function up to repeat times, or until budget seconds are used; returns run time statistics. """
+    times = []
+    began = time.perf_counter()
+    while len(times) < repeat and (not times or time.perf_counter() - began < budget):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'runs': len(times)}
+
+
+def run_scale(catalogue, payload, factor, workdir, repeat=REPEAT):
+    """ Time every case on the catalogue and feed scaled up factor times. """
+    csv_path = os.path.join(workdir, f"catalogue-{factor}x.csv")
+    scaled_catalogue(catalogue, factor).to_csv(csv_path, index=False)
+    body = json.dumps(scaled_feed(payload, factor)).encode('utf-8')
+    fetcher = APIFetcher(cli.API_URL, session=ReplaySession(body))
+
+    static_data = DataLoader(csv_path).load_data()
+    availability = cli.fetch_availability(fetcher)
+    data = DataMerger().merge_data(static_data, availability)
+    cli.build_indexes(data)
+    number = scaled_number(catalogue['car_park_no'].iloc[len(catalogue) // 2], factor // 2)
+    address = data['address'].iloc[len(catalogue) // 2]
+
+    def end_to_end():
+        cache_dir = os.path.join(workdir, '.cache')
+        argv = ['main.py', '--query', number, '--no-daemon']
+        with patch.object(cli, 'STATIC_DATA_PATH', csv_path), patch.object(cli, 'CACHE_DIR', cache_dir), \
+                patch.object(cli, 'APIFetcher', lambda url: APIFetcher(url, session=ReplaySession(body))), \
+                patch.object(sys, 'argv', argv):
+            cli.main()
+
+    cases = {
+        'load_data': lambda: DataLoader(csv_path).load_data(),
+        'fetch_data': lambda: fetcher.fetch_data(),
+        'merge_data': lambda: DataMerger().merge_data(static_data, availability),
+        'query_carpark': lambda: cli.query_carpark(number, data),
+        'search_by_address': lambda: cli.search_by_address(address, data),
+        'cli_query': end_to_end,
+    }
+    results = {}
+    for name, function in cases.items():
+        results[f"{name}@{factor}x"] = dict(measure(function, repeat), car_parks=len(static_data))
+    return results
+
+
+def run(scales=SCALES, repeat=REPEAT, fixture=FIXTURE_PATH):
+    catalogue = pd.read_csv(cli.STATIC_DATA_PATH, dtype=str, keep_default_na=False)
+    payload, feed = load_feed(catalogue, fixture)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for factor in scales:
+            for name, stats in run_scale(catalogue, payload, factor, workdir, repeat).items():
+                results[name] = stats
+                print(f"{name:<26} {stats['min'] * 1e3:>10.2f} ms  (median {stats['median'] * 1e3:.2f} ms, "
+                      f"{stats['runs']} runs)", file=sys.stderr)
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'feed': feed,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """ Each case in both result sets as (name, baseline seconds, current seconds, ratio, regressed). """
+    rows = []
+    for name, stats in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before, after = baseline['results'][name]['min'], stats['min']
+        ratio = after / before
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Car park benchmark suite")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='Save the live feed as a fixture.')
+    record_parser.add_argument('--url', default=cli.API_URL)
+    record_parser.add_argument('--fixture', default=FIXTURE_PATH)
+    run_parser = commands.add_parser('run', help='Run every case and write the results as JSON.')
+    run_parser.add_argument('--scales', nargs='+', type=int, default=list(SCALES),
+                            help='Multiples of the catalogue to run at, e.g. 1 10 100 1000.')
+    run_parser.add_argument('--repeat', type=int, default=REPEAT)
+    run_parser.add_argument('--fixture', default=FIXTURE_PATH)
+    output = run_parser.add_mutually_exclusive_group()
+    output.add_argument('--output', help='Write the results to this file instead of stdout.')
+    output.add_argument('--save', metavar='NAME', help=f"Save the results as {BASELINE_DIR}/NAME.json.")
+    compare_parser = commands.add_parser('compare', help='Flag cases that slowed down against a baseline.')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                                help='Allowed slowdown as a fraction (default: %(default)s).')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        print(f"Recorded {record(args.url, args.fixture)}")
+        return 0
+    if args.command == 'run':
+        results = json.dumps(run(args.scales, args.repeat, args.fixture), indent=2)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json") if args.save else args.output
+        if path is None:
+            print(results)
+            return 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(results + "\n")
+        print(f"Wrote {path}", file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if baseline['meta'].get('feed') != current['meta'].get('feed'):
+        print("Warning: the results were measured on different feeds.", file=sys.stderr)
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'case':<26} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, before, after, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<26} {before * 1e3:>12.2f} {after * 1e3:>12.2f} {ratio - 1:>+8.0%}{flag}")
+    regressions = sum(regressed for *_, regressed in rows)
+    print(f"{regressions} of {len(rows)} cases slower than {args.threshold:.0%} over the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+CAR_PARK_TYPES = ['SURFACE CAR PARK', 'MULTI-STOREY CAR PARK', 'BASEMENT CAR PARK', 'COVERED CAR PARK']
+PARKING_SYSTEMS = ['ELECTRONIC PARKING', 'COUPON PARKING']
+SHORT_TERM = ['WHOLE DAY', '7AM-10.30PM', '7AM-7PM', 'NO']
+FREE_PARKING = ['SUN & PH FR 7AM-10.30PM', 'SUN & PH FR 1PM-10.30PM', 'NO']
+STREETS = ['ALJUNIED CRESCENT', 'ANG MO KIO AVENUE 3', 'BEDOK NORTH ROAD', 'CLEMENTI WEST STREET 2',
+           'JURONG WEST STREET 42', 'TAMPINES STREET 81', 'WOODLANDS DRIVE 14', 'YISHUN RING ROAD']
+
+
+def carpark_numbers(n):
+    return np.array([f"S{i:06d}" for i in range(n)], dtype=object)
+
+
+def synthetic_static(n, seed=0):
+    """ A cleaned static frame shaped like HDBCarparkInformation.csv with n car parks. """
+    rng = np.random.default_rng(seed)
+    streets = np.array(STREETS, dtype=object)[rng.integers(0, len(STREETS), n)]
+    blocks = rng.integers(1, 999, n).astype(str)
+    return pd.DataFrame({
+        'car_park_no': carpark_numbers(n),
+        'address': np.char.add(np.char.add('BLK ', blocks), np.char.add(' ', streets.astype(str))).astype(object),
+        'x_coord': rng.uniform(2000, 50000, n),
+        'y_coord': rng.uniform(25000, 50000, n),
+        'car_park_type': np.array(CAR_PARK_TYPES, dtype=object)[rng.integers(0, len(CAR_PARK_TYPES), n)],
+        'type_of_parking_system': np.array(PARKING_SYSTEMS, dtype=object)[rng.integers(0, 2, n)],
+        'short_term_parking': np.array(SHORT_TERM, dtype=object)[rng.integers(0, len(SHORT_TERM), n)],
+        'free_parking': np.array(FREE_PARKING, dtype=object)[rng.integers(0, len(FREE_PARKING), n)],
+        'night_parking': np.array(['YES', 'NO'], dtype=object)[rng.integers(0, 2, n)],
+        'car_park_decks': rng.integers(0, 15, n),
+        'gantry_height': rng.choice([0.0, 1.8, 2.0, 2.1, 2.15, 4.5], n),
+        'car_park_basement': np.array(['Y', 'N'], dtype=object)[rng.integers(0, 2, n)],
+    })
+
+
+def synthetic_availability(static_data, seed=0):
+    """ One availability row per car park in static_data, as APIFetcher.fetch_data returns it. """
+    rng = np.random.default_rng(seed)
+    n = len(static_data)
+    total_lots = rng.integers(50, 800, n)
+    return pd.DataFrame({
+        'car_park_no': static_data['car_park_no'].to_numpy(),
+        'update_datetime': '2025-03-08T23:16:32',
+        'total_lots': total_lots,
+        'lot_type': 'C',
+        'lots_available': rng.integers(0, total_lots + 1),
+        'feed_timestamp': '2025-03-08T23:16:36+08:00',
+    })
+
+
+def synthetic_feed(numbers, lot_types=('C', 'Y', 'H'), seed=0):
+    """ A carpark-availability payload with one carpark_info entry per lot type. """
+    rng = np.random.default_rng(seed)
+    records = []
+    for number in numbers:
+        info = []
+        for lot_type in lot_types[:rng.integers(1, len(lot_types) + 1)]:
+            total = int(rng.integers(10, 800))
+            info.append({'total_lots': str(total), 'lot_type': lot_type,
+                         'lots_available': str(int(rng.integers(0, total + 1)))})
+        records.append({'carpark_number': number, 'update_datetime': '2025-03-08T23:16:32',
+                        'carpark_info': info})
+    return {'items': [{'timestamp': '2025-03-08T23:16:36+08:00', 'carpark_data': records}]}
+
+
+def scaled_number(number, copy):
+    """ The car park number of the given copy of a car park in a scaled-up data set; copy 0 keeps the original. """
+    return number if copy == 0 else f"{number}-{copy}"
+
+
+def scaled_catalogue(catalogue, factor):
+    """ factor copies of a raw catalogue frame, each copy's car parks renumbered with scaled_number. """
+    numbers = catalogue['car_park_no'].to_numpy(dtype=object)
+    copies = []
+    for copy in range(factor):
+        copies.append(catalogue.assign(car_park_no=[scaled_number(number, copy) for number in numbers]))
+    return pd.concat(copies, ignore_index=True)
+
+
+def scaled_feed(payload, factor):
+    """ A feed payload listing every car park of payload factor times, numbered to match scaled_catalogue. """
+    item = payload['items'][0]
+    records = [dict(record, carpark_number=scaled_number(record['carpark_number'], copy))
+               for copy in range(factor) for record in item.get('carpark_data', [])]
+    return {'items': [dict(item, carpark_data=records)]}
@@ -0,0 +1,146 @@
+import re
+import weakref
+import numpy as np
+import pandas as pd
+from .carpark_index import cached_index
+
+# Long and plural forms are folded onto the abbreviations used in the HDB data.
+ABBREVIATIONS = {
+    'BLOCK': 'BLK', 'BLKS': 'BLK', 'STREET': 'ST', 'ROAD': 'RD', 'AVENUE': 'AVE',
+    'DRIVE': 'DR', 'CRESCENT': 'CRES', 'NORTH': 'NTH', 'SOUTH': 'STH', 'CENTRAL': 'CTRL',
+    'LORONG': 'LOR', 'JALAN': 'JLN', 'CLOSE': 'CL', 'PLACE': 'PL', 'TERRACE': 'TER',
+    'UPPER': 'UPP', 'INDUSTRIAL': 'IND', 'GARDENS': 'GDNS',
+}
+_SEPARATORS = re.compile(r'[^A-Z0-9]+')
+
+
+def _raw_tokens(text):
+    return [token for token in _SEPARATORS.split(str(text).upper()) if token]
+
+
+def normalize_tokens(text):
+    """ Upper-case, split on punctuation and fold abbreviations. """
+    return [ABBREVIATIONS.get(token, token) for token in _raw_tokens(text)]
+
+
+def prefix_forms(text):
+    """ Normalized tokens of text, with the unfolded last token and the abbreviations it may be typing.
+
+    Stored tokens are folded, so a partly typed long form such as NOR only finds NTH through the abbreviation
+    whose long form it starts.
+    """
+    raw = _raw_tokens(text)
+    if not raw:
+        return [], None, []
+    last = raw[-1]
+    abbreviations = sorted({short for long, short in ABBREVIATIONS.items() if long.startswith(last)})
+    return normalize_tokens(' '.join(raw[:-1])), last, abbreviations
+
+
+def _trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AddressIndex:
+    """ Inverted index over normalized address tokens with prefix and fuzzy lookup. """
+
+    def __init__(self, data, column='address', fuzzy_threshold=0.5):
+        self._data_ref = weakref.ref(data)
+        self._size = len(data)
+        self.fuzzy_threshold = fuzzy_threshold
+        # A positional index makes the exploded labels row positions.
+        addresses = pd.Series(data[column].to_numpy())
+        tokens = addresses.map(normalize_tokens, na_action='ignore').explode().dropna()
+        groups = pd.Series(tokens.index.to_numpy()).groupby(tokens.to_numpy(), sort=True)
+        postings = [(token, np.unique(rows.to_numpy())) for token, rows in groups]
+        self.vocabulary = np.array([token for token, _ in postings], dtype=object)
+        self._postings = [rows for _, rows in postings]
+        self._token_ids = {token: i for i, token in enumerate(self.vocabulary)}
+
+        gram_counts = np.empty(len(self.vocabulary), dtype=np.int32)
+        gram_postings = {}
+        for token_id, token in enumerate(self.vocabulary):
+            grams = _trigrams(token)
+            gram_counts[token_id] = len(grams)
+            for gram in grams:
+                gram_postings.setdefault(gram, []).append(token_id)
+        self._gram_counts = gram_counts
+        self._gram_postings = {gram: np.array(ids) for gram, ids in gram_postings.items()}
+
+    @property
+    def data(self):
+        data = self._data_ref()
+        if data is None:
+            raise ReferenceError("The indexed data frame no longer exists.")
+        return data
+
+    def _exact(self, token):
+        token_id = self._token_ids.get(token)
+        return [] if token_id is None else [token_id]
+
+    def _prefix(self, token):
+        start = np.searchsorted(self.vocabulary, token, side='left')
+        end = np.searchsorted(self.vocabulary, token + '\uffff', side='left')
+        return range(start, end)
+
+    def _similar(self, token):
+        """ Token ids and Dice similarity of vocabulary entries sharing trigrams with token. """
+        grams = _trigrams(token)
+        shared = np.zeros(len(self.vocabulary), dtype=np.int32)
+        for gram in grams:
+            ids = self._gram_postings.get(gram)
+            if ids is not None:
+                shared[ids] += 1
+        scores = 2.0 * shared / (len(grams) + self._gram_counts)
+        token_ids = np.flatnonzero(scores >= self.fuzzy_threshold)
+        return token_ids, scores[token_ids]
+
+    def _rows(self, token_ids):
+        if not len(token_ids):
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([self._postings[i] for i in token_ids]))
+
+    def search(self, query, prefix=True, limit=None):
+        """ Row positions whose address holds every query token; the last may be a prefix. """
+        if prefix:
+            tokens, last, abbreviations = prefix_forms(query)
+            if last is None:
+                return np.empty(0, dtype=np.int64)
+            last_ids = np.union1d(np.asarray(self._prefix(last), dtype=np.int64),
+                                  [i for token in abbreviations for i in self._exact(token)]).astype(np.int64)
+            lookups = [self._exact(token) for token in tokens] + [last_ids]
+        else:
+            lookups = [self._exact(token) for token in normalize_tokens(query)]
+        if not lookups:
+            return np.empty(0, dtype=np.int64)
+        result = None
+        for token_ids in lookups:
+            rows = self._rows(token_ids)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result[:limit]
+
+    def search_fuzzy(self, query, limit=10):
+        """ Row positions ranked by summed trigram similarity; every query token must match. """
+        tokens = normalize_tokens(query)
+        if not tokens:
+            return np.empty(0, dtype=np.int64)
+        total = np.zeros(self._size)
+        matched = np.ones(self._size, dtype=bool)
+        for token in tokens:
+            token_ids, scores = self._similar(token)
+            best = np.zeros(self._size)
+            for token_id, score in zip(token_ids, scores):
+                rows = self._postings[token_id]
+                best[rows] = np.maximum(best[rows], score)
+            matched &= best > 0
+            total += best
+        rows = np.flatnonzero(matched)
+        ranked = rows[np.argsort(-total[rows], kind='stable')]
+        return ranked[:limit]
+
+
+def address_index_for(data, column='address'):
+    return cached_index(data, AddressIndex, column)
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+LOCAL_TIMEZONE = 'Asia/Singapore'
+HOURS_PER_WEEK = 168
+# 1970-01-01 was a Thursday; shifting by three days makes hour 0 Monday midnight.
+_EPOCH_WEEKDAY_HOURS = 3 * 24
+
+
+def _numeric(values):
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def occupancy(data):
+    """ Share of lots taken for every row, NaN where the total is unknown or zero. """
+    total, available = _numeric(data['total_lots']), _numeric(data['lots_available'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(total > 0, 1 - available / total, np.nan)
+    return pd.Series(np.clip(rate, 0, 1), index=data.index, name='occupancy')
+
+
+def busiest(data, top=10, lot_type='C'):
+    """ The top car parks by current occupancy of one lot type (car lots by default), one row per car park. """
+    if 'lot_type' in data.columns:
+        data = data[(data['lot_type'] == lot_type).fillna(False).to_numpy(dtype=bool)]
+    ranked = data.assign(occupancy=occupancy(data)).dropna(subset=['occupancy'])
+    ranked = ranked.sort_values('occupancy', ascending=False, kind='stable')
+    return ranked[~ranked['car_park_no'].duplicated()].head(top)
+
+
+def _local_seconds(times):
+    """ Epoch seconds of Singapore wall-clock time, so hour arithmetic gives local hours. """
+    times = pd.Series(times)
+    if times.dt.tz is not None:
+        if str(times.dt.tz) != LOCAL_TIMEZONE:
+            times = times.dt.tz_convert(LOCAL_TIMEZONE)
+        times = times.dt.tz_localize(None)
+    return times.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _factorize(values):
+    """ Integer codes and their values; categoricals (compact frames) reuse their own codes. """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories.to_numpy()
+    return pd.factorize(values)
+
+
+def _hour_of_week(seconds):
+    return (seconds // 3600 + _EPOCH_WEEKDAY_HOURS) % HOURS_PER_WEEK
+
+
+class OccupancyAnalytics:
+    """ Occupancy statistics for every (car park, lot type) accumulated from history in one pass.
+
+    Rows are binned into a dense series x bucket grid with np.bincount, so each chunk added
+    costs O(rows) whatever the number of car parks; the hour-of-week profile is folded from
+    the grid. The bucket width must divide an hour.
+    """
+
+    def __init__(self, start, end, freq='15min'):
+        self.step = int(pd.Timedelta(freq).total_seconds())
+        if self.step <= 0 or 3600 % self.step:
+            raise ValueError(f"Bucket width {freq!r} must divide one hour.")
+        self.start = int(_local_seconds([pd.Timestamp(start)])[0]) // self.step * self.step
+        self.buckets = (int(_local_seconds([pd.Timestamp(end)])[0]) - self.start) // self.step + 1
+        self.keys = pd.MultiIndex.from_arrays([[], []], names=['car_park_no', 'lot_type'])
+        self._sums = np.zeros((0, self.buckets))
+        self._counts = np.zeros((0, self.buckets))
+        self._last_time = np.zeros(0, dtype=np.int64)
+        self._last_available = np.zeros(0)
+        self._last_total = np.zeros(0)
+
+    @classmethod
+    def from_frame(cls, history, freq='15min'):
+        analytics = cls(history['feed_timestamp'].min(), history['feed_timestamp'].max(), freq=freq)
+        analytics.add(history)
+        return analytics
+
+    @classmethod
+    def from_store(cls, store, start, end, car_park_no=None, freq='15min'):
+        """ Stream a HistoryStore range segment by segment. """
+        analytics = cls(start, end, freq=freq)
+        for chunk in store.iter_query(car_park_no, start=start, end=end):
+            analytics.add(chunk)
+        return analytics
+
+    def _series_codes(self, history):
+        """ Map each row's (car park, lot type) to a series number, registering unseen pairs. """
+        carpark_codes, carparks = _factorize(history['car_park_no'])
+        lot_type_codes, lot_types = _factorize(history['lot_type'])
+        pairs = carpark_codes.astype(np.int64) * len(lot_types) + lot_type_codes
+        present = np.flatnonzero(np.bincount(pairs, minlength=len(carparks) * len(lot_types)))
+        keys = pd.MultiIndex.from_arrays([np.asarray(carparks)[present // len(lot_types)],
+                                          np.asarray(lot_types)[present % len(lot_types)]],
+                                         names=self.keys.names)
+        found = self.keys.get_indexer(keys) if len(self.keys) else np.full(len(keys), -1)
+        new = found < 0
+        if new.any():
+            found[new] = np.arange(len(self.keys), len(self.keys) + new.sum())
+            self.keys = self.keys.append(keys[new]) if len(self.keys) else keys[new]
+            self._grow(len(self.keys))
+        lookup = np.full(len(carparks) * len(lot_types), -1, dtype=np.int64)
+        lookup[present] = found
+        return lookup[pairs]
+
+    def _grow(self, size):
+        extra = size - len(self._sums)
+        self._sums = np.vstack([self._sums, np.zeros((extra, self.buckets))])
+        self._counts = np.vstack([self._counts, np.zeros((extra, self.buckets))])
+        self._last_time = np.concatenate([self._last_time, np.full(extra, np.iinfo(np.int64).min)])
+        self._last_available = np.concatenate([self._last_available, np.full(extra, np.nan)])
+        self._last_total = np.concatenate([self._last_total, np.full(extra, np.nan)])
+
+    def add(self, history):
+        """ Fold a chunk of history rows (as HistoryStore.query returns them) into the statistics. """
+        if history.empty:
+            return
+        series = self._series_codes(history)
+        seconds = _local_seconds(history['feed_timestamp'])
+        np.maximum.at(self._last_time, series, seconds)
+        latest = np.flatnonzero(seconds == self._last_time[series])
+        self._last_available[series[latest]] = _numeric(history['lots_available'].iloc[latest])
+        self._last_total[series[latest]] = _numeric(history['total_lots'].iloc[latest])
+
+        rate = occupancy(history).to_numpy()
+        bucket = (seconds - self.start) // self.step
+        valid = ~np.isnan(rate) & (bucket >= 0) & (bucket < self.buckets)
+        if not valid.all():
+            series, seconds, bucket, rate = series[valid], seconds[valid], bucket[valid], rate[valid]
+        if not len(bucket):
+            return
+        # History arrives in time order, so a chunk only touches a narrow band of buckets.
+        first, last = bucket.min(), bucket.max() + 1
+        shape = (len(self.keys), last - first)
+        cells = series * shape[1] + (bucket - first)
+        self._sums[:, first:last] += np.bincount(cells, rate, minlength=shape[0] * shape[1]).reshape(shape)
+        self._counts[:, first:last] += np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+
+    def _bucket_times(self):
+        times = pd.to_datetime(self.start + np.arange(self.buckets) * self.step, unit='s')
+        return times.tz_localize(LOCAL_TIMEZONE)
+
+    def resampled(self):
+        """ Mean occupancy per series and bucket; rows are series, columns bucket start times. """
+        with np.errstate(invalid='ignore'):
+            return pd.DataFrame(self._sums / self._counts, index=self.keys, columns=self._bucket_times())
+
+    def rolling_average(self, window='1h'):
+        """ Mean occupancy over the trailing window ending at each bucket, ignoring empty buckets. """
+        width = max(1, int(pd.Timedelta(window).total_seconds()) // self.step)
+        sums = np.cumsum(self._sums, axis=1)
+        counts = np.cumsum(self._counts, axis=1)
+        sums[:, width:] -= sums[:, :-width].copy()
+        counts[:, width:] -= counts[:, :-width].copy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame(np.where(counts > 0, sums / counts, np.nan),
+                                index=self.keys, columns=self._bucket_times())
+
+    def _profile(self):
+        # One-hot map from bucket to hour of week; the matrix product sums buckets per hour.
+        hours = _hour_of_week(self.start + np.arange(self.buckets) * self.step)
+        fold = np.zeros((self.buckets, HOURS_PER_WEEK))
+        fold[np.arange(self.buckets), hours] = 1
+        with np.errstate(invalid='ignore'):
+            return (self._sums @ fold) / (self._counts @ fold)
+
+    def hour_of_week_profile(self):
+        """ Mean occupancy per series for each hour of the week, Monday 00:00 first. """
+        return pd.DataFrame(self._profile(), index=self.keys,
+                            columns=pd.RangeIndex(HOURS_PER_WEEK, name='hour_of_week'))
+
+    def current(self):
+        """ The latest recorded availability and occupancy of every series. """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = np.clip(np.where(self._last_total > 0, 1 - self._last_available / self._last_total, np.nan), 0, 1)
+        return pd.DataFrame({
+            'lots_available': self._last_available,
+            'total_lots': self._last_total,
+            'occupancy': rate,
+            'feed_timestamp': pd.to_datetime(self._last_time, unit='s').tz_localize(LOCAL_TIMEZONE),
+        }, index=self.keys)
+
+    def forecast(self, minutes=30):
+        """ Lots available `minutes` after each series' latest reading.
+
+        The latest occupancy is carried forward and shifted by how the hour-of-week profile
+        changes between now and the target time; series without a profile stay flat.
+        """
+        now = self.current()
+        profile = self._profile()
+        rows = np.arange(len(self.keys))
+        target = self._last_time + minutes * 60
+        shift = profile[rows, _hour_of_week(target)] - profile[rows, _hour_of_week(self._last_time)]
+        predicted = np.clip(now['occupancy'].to_numpy() + np.nan_to_num(shift), 0, 1)
+        forecast = np.round(self._last_total * (1 - predicted))
+        return now.assign(
+            forecast_lots_available=forecast,
+            forecast_occupancy=predicted,
+            forecast_timestamp=now['feed_timestamp'] + pd.Timedelta(minutes=minutes),
+        )
@@ -1,52 +1,133 @@
+import random
+import time
 import requests
 import pandas as pd
+from .instrumentation import count, stage
+from .schema import Column, Schema
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+FEED_SCHEMA = Schema({
+    'carpark_number': Column('text', nullable=False),
+    'update_datetime': Column('text', nullable=False, pattern=r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}'),
+    'total_lots': Column('integer', nullable=False, min=0),
+    'lot_type': Column('text', nullable=False),
+    'lots_available': Column('integer', nullable=False),
+})
 
 class APIFetcher:
-    def __init__(self, api_url):
+    def __init__(self, api_url, timeout=(3.05, 10), retries=2, backoff_factor=0.5, session=None):
         self.api_url = api_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("Accept-Encoding", "gzip, deflate")
+        self.etag = None
+        self.last_modified = None
+        self.not_modified = False
+        self.quarantine = None
+        self._last_frame = None
+
+    def restore_validators(self, frame, etag, last_modified):
+        """ Seed conditional-request state from a frame parsed by an earlier fetch. """
+        self._last_frame = frame.copy()
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def _backoff(self, attempt):
+        """ Exponential backoff with full jitter so workers do not retry in lockstep. """
+        return random.uniform(0, self.backoff_factor * 2 ** attempt)
 
-    def fetch_data(self):
+    def _get(self, params=None, headers=None):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(self.api_url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    response.raise_for_status()
+                    return response
+            time.sleep(self._backoff(attempt))
+
+    def fetch_data(self, wide=False, date_time=None):
+        """ Fetch the live feed, or the snapshot at date_time ('YYYY-MM-DDTHH:MM:SS') when given. """
+        params = {"date_time": date_time} if date_time else None
+        headers = {}
+        # Conditional requests only apply to the live feed we parsed last time.
+        if date_time is None and self._last_frame is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
         try:
-            response = requests.get(self.api_url)
-            response.raise_for_status()
-            data = response.json()
+            with stage('fetch.http'):
+                response = self._get(params, headers)
+            self.not_modified = response.status_code == 304
+            if not self.not_modified:
+                count('fetch.http', bytes=len(response.content))
+                with stage('fetch.json'):
+                    data = orjson.loads(response.content) if orjson is not None else response.json()
         except requests.exceptions.RequestException as e:
             raise
         except ValueError as e:
             raise
-        if "items" not in data or not data["items"]:
-            raise ValueError("API response does not contain 'items' or it is empty.")
-
-        item = data["items"][0]
-        feed_timestamp = item.get("timestamp", None)
-        carpark_data_list = item.get("carpark_data", [])
-
-        records = []
-        for record in carpark_data_list:
-            carpark_number = record.get("carpark_number")
-            update_datetime = record.get("update_datetime")
-            carpark_info_list = record.get("carpark_info", [])
-            if not carpark_number or not update_datetime or not carpark_info_list:
-                continue
-            info = carpark_info_list[0]
-            try:
-                total_lots = int(info.get("total_lots"))
-                lot_type = info.get("lot_type")
-                lots_available = int(info.get("lots_available"))
-            except (ValueError, TypeError) as e:
-                continue
-
-            records.append({
-                "carpark_number": carpark_number,
-                "update_datetime": update_datetime,
-                "total_lots": total_lots,
-                "lot_type": lot_type,
-                "lots_available": lots_available,
-                "feed_timestamp": feed_timestamp
-            })
-
-        if not records:
-            raise ValueError("No valid car park data found in API response.")
-
-        return pd.DataFrame(records)
+        if self.not_modified:
+            frame = self._last_frame.copy()
+        else:
+            with stage('fetch.parse'):
+                frame, self.quarantine = parse_feed(data)
+            count('fetch.parse', rows=len(frame))
+            if date_time is None:
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+                self._last_frame = frame.copy()
+        return pivot_lot_types(frame) if wide else frame
+
+    @staticmethod
+    def parse_payload(data):
+        """ Flatten a feed payload into one row per (car park, lot type), leaving out rows breaking FEED_SCHEMA. """
+        return parse_feed(data)[0]
+
+
+def parse_feed(data):
+    """ The rows of a feed payload meeting FEED_SCHEMA, and the quarantined rest with the reasons they failed. """
+    if "items" not in data or not data["items"]:
+        raise ValueError("API response does not contain 'items' or it is empty.")
+
+    item = data["items"][0]
+    feed_timestamp = item.get("timestamp", None)
+    entries = [
+        (record.get("carpark_number"), record.get("update_datetime"),
+         info.get("total_lots"), info.get("lot_type"), info.get("lots_available"))
+        for record in item.get("carpark_data", [])
+        for info in record.get("carpark_info") or ()
+    ]
+    if not entries:
+        raise ValueError("No valid car park data found in API response.")
+
+    frame = pd.DataFrame.from_records(
+        entries, columns=["carpark_number", "update_datetime", "total_lots", "lot_type", "lots_available"])
+    frame["feed_timestamp"] = feed_timestamp
+    frame, quarantine = FEED_SCHEMA.validate(frame)
+    count('fetch.quarantine', rows=len(quarantine))
+    if frame.empty:
+        raise ValueError("No valid car park data found in API response.")
+    return frame, quarantine
+
 
+def pivot_lot_types(frame):
+    """ One row per car park with total_lots_<type> and lots_available_<type> columns. """
+    keys = [c for c in frame.columns if c not in ("lot_type", "total_lots", "lots_available")]
+    wide = frame.pivot_table(index=keys[0], columns="lot_type", values=["total_lots", "lots_available"],
+                             aggfunc="first")
+    wide = wide.astype("Int64")
+    wide.columns = [f"{value}_{lot_type}" for value, lot_type in wide.columns]
+    first = frame.drop_duplicates(keys[0]).set_index(keys[0])[keys[1:]]
+    return first.join(wide).reset_index()
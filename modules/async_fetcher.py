@@ -0,0 +1,181 @@
+import asyncio
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+import pandas as pd
+import requests
+from .api_fetcher import RETRY_STATUSES, APIFetcher
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SNAPSHOT_FORMAT = '%Y-%m-%dT%H:%M:%S'
+# Snapshots fetched together by backfill before they are handed on.
+BACKFILL_BATCH = 64
+RETRY_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, asyncio.TimeoutError)
+if aiohttp is not None:
+    RETRY_ERRORS += (aiohttp.ClientConnectionError,)
+
+
+class FeedRequest:
+    """ One feed to fetch. parser turns its decoded JSON into the frame schema of APIFetcher.fetch_data. """
+
+    def __init__(self, url, params=None, parser=APIFetcher.parse_payload):
+        self.url = url
+        self.params = params
+        self.parser = parser
+
+    def __repr__(self):
+        return f"FeedRequest({self.url!r}, {self.params!r})"
+
+
+class HostRateLimiter:
+    """ Spaces the requests to each host at least 1 / rate seconds apart. """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = {}
+
+    async def wait(self, host):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next.get(host, now))
+        self._next[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class AsyncFetcher:
+    """ Fetches many feeds concurrently over aiohttp, or over requests in worker threads without it.
+
+    limit caps open requests overall and per_host per host. rate caps requests per second per host.
+    timeout bounds each attempt, and budget bounds a whole fetch_many call including retries.
+    """
+
+    def __init__(self, limit=8, per_host=4, rate=5.0, timeout=10, budget=None, retries=2, backoff_factor=0.5,
+                 transport=None):
+        transport = transport or ('aiohttp' if aiohttp is not None else 'threads')
+        if transport not in ('aiohttp', 'threads'):
+            raise ValueError(f"Unknown transport: {transport}")
+        if transport == 'aiohttp' and aiohttp is None:
+            raise ImportError("The aiohttp transport needs the aiohttp package.")
+        self.limit = limit
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.budget = budget
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.transport = transport
+        self.failures = []
+        self._session = None
+        self._deadline = None
+
+    async def __aenter__(self):
+        if self.transport == 'aiohttp':
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.per_host)
+            self._session = aiohttp.ClientSession(connector=connector, headers={"Accept-Encoding": "gzip, deflate"})
+        else:
+            self._session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=self.limit, pool_maxsize=self.limit)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+            self._executor = ThreadPoolExecutor(self.limit)
+        self._slots = asyncio.Semaphore(self.limit)
+        self._host_slots = {}
+        self._limiter = HostRateLimiter(self.rate)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.transport == 'aiohttp':
+            await self._session.close()
+        else:
+            self._session.close()
+            self._executor.shutdown(wait=False)
+        self._session = None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, self.backoff_factor * 2 ** attempt)
+
+    def _remaining(self):
+        """ Seconds the next attempt may take: the per-attempt timeout, cut short by what is left of the budget. """
+        if self._deadline is None:
+            return self.timeout
+        remaining = self._deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError("The fetch timeout budget is exhausted.")
+        return min(self.timeout, remaining)
+
+    async def _get(self, url, params, timeout):
+        if self.transport == 'aiohttp':
+            async with self._session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                return response.status, await response.read()
+        get = partial(self._session.get, url, params=params, timeout=timeout)
+        response = await asyncio.get_running_loop().run_in_executor(self._executor, get)
+        return response.status_code, response.content
+
+    async def fetch(self, request):
+        """ Fetch and parse one FeedRequest or URL, retrying connection errors and 429/5xx like APIFetcher. """
+        if isinstance(request, str):
+            request = FeedRequest(request)
+        host = urlsplit(request.url).netloc
+        host_slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        for attempt in range(self.retries + 1):
+            async with host_slots, self._slots:
+                await self._limiter.wait(host)
+                timeout = self._remaining()
+                try:
+                    status, body = await asyncio.wait_for(self._get(request.url, request.params, timeout), timeout)
+                except RETRY_ERRORS:
+                    if attempt == self.retries:
+                        raise
+                else:
+                    if status not in RETRY_STATUSES or attempt == self.retries:
+                        break
+            await asyncio.sleep(min(self._backoff(attempt), self._remaining()))
+        if status >= 400:
+            raise requests.exceptions.HTTPError(f"{status} Error for url: {request.url}")
+        data = orjson.loads(body) if orjson is not None else json.loads(body)
+        return request.parser(data)
+
+    async def fetch_many(self, feeds):
+        """ Fetch every feed concurrently. Results keep feed order, with the exception in place of a failed fetch. """
+        if self._session is None:
+            async with self:
+                return await self.fetch_many(feeds)
+        self._deadline = None if self.budget is None else asyncio.get_running_loop().time() + self.budget
+        return await asyncio.gather(*(self.fetch(feed) for feed in feeds), return_exceptions=True)
+
+    def fetch_all(self, feeds):
+        """ Run fetch_many to completion from synchronous code. """
+        return asyncio.run(self.fetch_many(feeds))
+
+    def backfill(self, url, start, end, freq='1min', batch=BACKFILL_BATCH):
+        """ Yield the feed's historical snapshots from start to end, one frame per snapshot in time order.
+
+        Snapshots are fetched concurrently batch at a time, so only one batch of frames is held at once.
+        Snapshots that could not be fetched are left out and listed in failures as (date_time, exception).
+        """
+        times = snapshot_times(start, end, freq)
+        self.failures = []
+        for first in range(0, len(times), batch):
+            batch_times = times[first:first + batch]
+            results = self.fetch_all([FeedRequest(url, {"date_time": date_time}) for date_time in batch_times])
+            for date_time, result in zip(batch_times, results):
+                if isinstance(result, BaseException):
+                    self.failures.append((date_time, result))
+                else:
+                    yield result
+
+
+def snapshot_times(start, end, freq='1min'):
+    """ The date_time parameters of the feed's snapshots from start to end inclusive. """
+    return [moment.strftime(SNAPSHOT_FORMAT) for moment in pd.date_range(start, end, freq=freq)]
@@ -0,0 +1,114 @@
+import weakref
+import numpy as np
+import pandas as pd
+from .carpark_index import cached_index
+
+CATEGORICAL_ATTRIBUTES = ('car_park_type', 'type_of_parking_system', 'short_term_parking', 'free_parking',
+                          'night_parking', 'car_park_basement')
+NUMERIC_ATTRIBUTES = ('gantry_height', 'car_park_decks')
+
+
+def _normalize(value):
+    return str(value).strip().upper()
+
+
+class AttributeIndex:
+    """ Filters rows on catalogue attributes without building a pandas mask per condition.
+
+    Each value of a categorical attribute owns a bitmap of the rows holding it, packed 8 rows to a byte, and
+    each numeric attribute is kept as a sorted array for range lookups. A compound predicate is then one
+    bitwise AND per condition. Categorical values match case-insensitively.
+    """
+
+    def __init__(self, data, categorical=CATEGORICAL_ATTRIBUTES, numeric=NUMERIC_ATTRIBUTES):
+        self._data_ref = weakref.ref(data)
+        self._size = len(data)
+        self._bitmaps = {}
+        for column in categorical:
+            if column not in data.columns:
+                continue
+            codes, uniques = pd.factorize(data[column].to_numpy(dtype=object))
+            rows = np.flatnonzero(codes >= 0)
+            order = rows[np.argsort(codes[rows], kind='stable')]
+            ends = np.cumsum(np.bincount(codes[rows], minlength=len(uniques)))
+            bitmaps = {}
+            for value, start, end in zip(uniques, ends - np.diff(ends, prepend=0), ends):
+                bitmap = self._pack(order[start:end])
+                # Values differing only in case or padding share one bitmap.
+                value = _normalize(value)
+                bitmaps[value] = bitmaps[value] | bitmap if value in bitmaps else bitmap
+            self._bitmaps[column] = bitmaps
+        self._sorted = {}
+        for column in numeric:
+            if column not in data.columns:
+                continue
+            values = pd.to_numeric(data[column], errors='coerce')
+            # Compact frames hold float32; bounds are compared at the column's precision so 2.1 still matches 2.1.
+            dtype = values.dtype if values.dtype == np.float32 else np.float64
+            values = values.to_numpy(dtype=dtype, na_value=np.nan)
+            rows = np.flatnonzero(np.isfinite(values))
+            order = rows[np.argsort(values[rows], kind='stable')]
+            self._sorted[column] = (values[order], order)
+
+    @property
+    def data(self):
+        data = self._data_ref()
+        if data is None:
+            raise ReferenceError("The indexed data frame no longer exists.")
+        return data
+
+    @property
+    def attributes(self):
+        return list(self._bitmaps) + list(self._sorted)
+
+    def values(self, column):
+        """ The distinct values of a categorical attribute. """
+        return sorted(self._bitmaps[column])
+
+    def _pack(self, positions):
+        rows = np.zeros(self._size, dtype=bool)
+        rows[positions] = True
+        return np.packbits(rows, bitorder='little')
+
+    def bitmap(self, column, values):
+        """ Packed bitmap of the rows whose attribute equals any of values. """
+        if column not in self._bitmaps:
+            raise ValueError(f"Cannot filter on {column}: not a categorical attribute of the data.")
+        if isinstance(values, str):
+            values = [values]
+        result = np.zeros((self._size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            bitmap = self._bitmaps[column].get(_normalize(value))
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+    def range_bitmap(self, column, low=None, high=None):
+        """ Packed bitmap of the rows whose attribute lies between low and high, both inclusive. """
+        if column not in self._sorted:
+            raise ValueError(f"Cannot filter on {column}: not a numeric attribute of the data.")
+        values, order = self._sorted[column]
+        start = 0 if low is None else np.searchsorted(values, values.dtype.type(low), side='left')
+        end = len(values) if high is None else np.searchsorted(values, values.dtype.type(high), side='right')
+        return self._pack(order[start:end])
+
+    def mask(self, where):
+        """ Boolean row mask of the rows meeting every condition of where.
+
+        where maps a categorical attribute to a value or list of values, and a numeric attribute to
+        [low, high] with None for an open end.
+        """
+        result = np.full((self._size + 7) // 8, 0xFF, dtype=np.uint8)
+        for column, condition in where.items():
+            if column in self._sorted:
+                result &= self.range_bitmap(column, *condition)
+            else:
+                result &= self.bitmap(column, condition)
+        return np.unpackbits(result, count=self._size, bitorder='little').view(bool)
+
+    def positions(self, where):
+        return np.flatnonzero(self.mask(where))
+
+
+def attribute_index_for(data):
+    return cached_index(data, AttributeIndex)
@@ -0,0 +1,162 @@
+import os
+import pickle
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """ Exclusive advisory lock on a file, shared by every process using the same path. """
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self.acquired = False
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX | (0 if self.blocking else fcntl.LOCK_NB))
+            else:
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK, 1)
+            self.acquired = True
+        except OSError:
+            if self.blocking:
+                self._file.close()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.acquired:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self.acquired = False
+
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class AvailabilityCache:
+    """ Wraps an APIFetcher and shares its parsed frame between processes for a TTL. """
+
+    def __init__(self, fetcher, cache_dir, ttl=60, min_refresh=5, stale_while_revalidate=False):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self.stale_while_revalidate = stale_while_revalidate
+        self.path = os.path.join(cache_dir, 'availability.pkl')
+        self.lock_path = self.path + '.lock'
+        self.refresh_thread = None
+        # When the frame fetch_data last returned stops being fresh, as recorded with it in the cache.
+        self.served_until = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def expires_at(self, fetched_at, feed_timestamp):
+        """ The TTL runs from the feed's own timestamp, but never expires within min_refresh of a fetch. """
+        feed_time = _parse_timestamp(feed_timestamp)
+        start = fetched_at if feed_time is None else min(feed_time, fetched_at)
+        return max(start + self.ttl, fetched_at + self.min_refresh)
+
+    def _read(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write(self, frame):
+        feed_timestamp = frame['feed_timestamp'].iloc[0] if 'feed_timestamp' in frame and len(frame) else None
+        fetched_at = time.time()
+        entry = {
+            'frame': frame,
+            'fetched_at': fetched_at,
+            'feed_timestamp': feed_timestamp,
+            'expires_at': self.expires_at(fetched_at, feed_timestamp),
+            'etag': getattr(self.fetcher, 'etag', None),
+            'last_modified': getattr(self.fetcher, 'last_modified', None),
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        return entry
+
+    @staticmethod
+    def _is_fresh(entry):
+        return entry is not None and time.time() < entry['expires_at']
+
+    def refresh(self, blocking=True):
+        """ Refetch under the lock unless another process already refreshed; None if the lock was busy. """
+        with FileLock(self.lock_path, blocking=blocking) as lock:
+            if not lock.acquired:
+                return None
+            entry = self._read()
+            if not self._is_fresh(entry):
+                if entry is not None and hasattr(self.fetcher, 'restore_validators'):
+                    self.fetcher.restore_validators(entry['frame'], entry['etag'], entry['last_modified'])
+                entry = self._write(self.fetcher.fetch_data())
+            self.served_until = entry['expires_at']
+            return entry['frame']
+
+    def revalidate(self):
+        """ Refresh in a detached process, so the caller answers from stale data and exits without waiting.
+
+        The refresher is double-forked into its own session with its standard streams on /dev/null, so it is
+        never left a zombie and does not hold a pipe the caller's reader waits on. Without fork it falls back to
+        a daemon thread. Either way the non-blocking file lock keeps it to one refresh at a time.
+        """
+        if not hasattr(os, 'fork'):
+            self.refresh_thread = threading.Thread(target=self.refresh, kwargs={'blocking': False}, daemon=True)
+            self.refresh_thread.start()
+            return
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            os.waitpid(pid, 0)
+            return
+        try:
+            os.setsid()
+            if os.fork() == 0:
+                devnull = os.open(os.devnull, os.O_RDWR)
+                for fd in (0, 1, 2):
+                    os.dup2(devnull, fd)
+                self.refresh(blocking=False)
+        except BaseException:
+            pass
+        finally:
+            os._exit(0)
+
+    def fetch_data(self):
+        entry = self._read()
+        if self._is_fresh(entry):
+            self.served_until = entry['expires_at']
+            return entry['frame']
+        if entry is not None and self.stale_while_revalidate:
+            self.revalidate()
+            self.served_until = entry['expires_at']
+            return entry['frame']
+        return self.refresh()
+
+    def invalidate(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
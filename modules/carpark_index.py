@@ -0,0 +1,79 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+_INDEXES = {}
+
+
+class CarparkIndex:
+    """ Hash index from car park number to the row positions holding it. """
+
+    def __init__(self, data, key='car_park_no'):
+        self.key = key
+        self._data_ref = weakref.ref(data)
+        codes, uniques = pd.factorize(data[key])
+        rows = np.flatnonzero(codes >= 0)
+        # Group row positions by key code so every key owns one contiguous run.
+        self._order = rows[np.argsort(codes[rows], kind='stable')]
+        self._keys = pd.Index(uniques)
+        self._counts = np.bincount(codes[rows], minlength=len(uniques))
+        self._starts = np.cumsum(self._counts) - self._counts
+
+    @property
+    def data(self):
+        data = self._data_ref()
+        if data is None:
+            raise ReferenceError("The indexed data frame no longer exists.")
+        return data
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def positions(self, key):
+        """ Row positions for one car park number, empty when unknown. """
+        try:
+            code = self._keys.get_loc(key)
+        except (KeyError, TypeError):
+            return np.empty(0, dtype=np.intp)
+        start = self._starts[code]
+        return self._order[start:start + self._counts[code]]
+
+    def positions_many(self, keys, return_requests=False):
+        """ Row positions for many car park numbers, in request order.
+
+        With return_requests, also return the index into keys that each position answers.
+        """
+        codes = self._keys.get_indexer(pd.Index(keys))
+        requests = np.flatnonzero(codes >= 0)
+        found = codes[requests]
+        counts = self._counts[found]
+        ends = np.cumsum(counts)
+        offsets = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+        positions = self._order[np.repeat(self._starts[found], counts) + offsets]
+        if return_requests:
+            return positions, np.repeat(requests, counts)
+        return positions
+
+    def lookup(self, key):
+        return self.data.take(self.positions(key))
+
+    def lookup_many(self, keys):
+        return self.data.take(self.positions_many(keys))
+
+
+def cached_index(data, index_class, *args):
+    """ Return an index over a frame, building it on first use and reusing it afterwards. """
+    cache_key = (id(data), index_class, args)
+    index = _INDEXES.get(cache_key)
+    if index is None or index._data_ref() is not data:
+        index = index_class(data, *args)
+        _INDEXES[cache_key] = index
+        weakref.finalize(data, _INDEXES.pop, cache_key, None)
+    return index
+
+
+def index_for(data, key='car_park_no'):
+    return cached_index(data, CarparkIndex, key)
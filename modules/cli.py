@@ -1,85 +1,687 @@
 import argparse
-import pandas as pd
-from .data_loader import DataLoader
-from .api_fetcher import APIFetcher
-from .data_merger import DataMerger
+import os
+import sys
+from .formatters import (
+    CAPACITY_LINES, DETAIL_LINES, DISTANCE_LINES, FORMATS, LAST_UPDATE_LINES, SEPARATOR,
+    OutputWriter, TextFormatter, formatter_for, paginate, render_lines, take_chunks, write_frames,
+)
+from .instrumentation import MetricsServer, instruments, stage, timed
+from .lazy import LazyImport
+from .lookup_snapshot import LookupSnapshot
+from . import daemon
 
-def load_data():
-    static_data_loader = DataLoader('data/HDBCarparkInformation.csv')
-    static_data = static_data_loader.load_data()
+# pandas, numpy and requests cost more to import than most lookups take, so only the
+# code paths that use them pay for the import.
+np = LazyImport('numpy')
+pd = LazyImport('pandas')
+DataLoader = LazyImport('.data_loader', 'DataLoader', __package__)
+APIFetcher = LazyImport('.api_fetcher', 'APIFetcher', __package__)
+AsyncFetcher = LazyImport('.async_fetcher', 'AsyncFetcher', __package__)
+DataMerger = LazyImport('.data_merger', 'DataMerger', __package__)
+AvailabilityCache = LazyImport('.availability_cache', 'AvailabilityCache', __package__)
+compact_frame = LazyImport('.compact_schema', 'compact_frame', __package__)
+memory_report = LazyImport('.compact_schema', 'memory_report', __package__)
+HistoryStore = LazyImport('.history_store', 'HistoryStore', __package__)
+OccupancyAnalytics = LazyImport('.analytics', 'OccupancyAnalytics', __package__)
+busiest = LazyImport('.analytics', 'busiest', __package__)
+index_for = LazyImport('.carpark_index', 'index_for', __package__)
+address_index_for = LazyImport('.address_index', 'address_index_for', __package__)
+spatial_index_for = LazyImport('.spatial_index', 'spatial_index_for', __package__)
+attribute_index_for = LazyImport('.attribute_index', 'attribute_index_for', __package__)
+schedule_table_for = LazyImport('.parking_schedule', 'schedule_table_for', __package__)
+load_holidays = LazyImport('.parking_schedule', 'load_holidays', __package__)
+local_time = LazyImport('.parking_schedule', 'local_time', __package__)
+SQLiteStore = LazyImport('.sqlite_store', 'SQLiteStore', __package__)
+SharedTable = LazyImport('.shared_table', 'SharedTable', __package__)
+wgs84_to_svy21 = LazyImport('.spatial_index', 'wgs84_to_svy21', __package__)
+watch = LazyImport('.watch', package=__package__)
 
-    api_fetcher = APIFetcher('https://api.data.gov.sg/v1/transport/carpark-availability')
+STATIC_DATA_PATH = 'data/HDBCarparkInformation.csv'
+CACHE_DIR = 'data/.cache'
+LOOKUP_SNAPSHOT_PATH = 'data/.cache/lookup.json'
+HISTORY_DIR = 'data/history'
+HOLIDAYS_PATH = 'data/public_holidays.csv'
+API_URL = 'https://api.data.gov.sg/v1/transport/carpark-availability'
+BATCH_CHUNK = 10_000
+# Attribute filter flags and the catalogue column each one filters on.
+CATEGORY_FILTERS = {
+    'type': 'car_park_type',
+    'parking_system': 'type_of_parking_system',
+    'short_term': 'short_term_parking',
+    'free_parking': 'free_parking',
+    'night_parking': 'night_parking',
+    'basement': 'car_park_basement',
+}
+RANGE_FILTERS = {
+    'gantry': 'gantry_height',
+    'decks': 'car_park_decks',
+}
+SCHEDULE_FILTERS = {
+    'free_now': 'free_parking',
+    'short_term_now': 'short_term_parking',
+}
+
+def load_static_data(rebuild_cache=False, compact=False):
+    static_data_loader = DataLoader(STATIC_DATA_PATH, cache_dir=CACHE_DIR, compact=compact)
+    return static_data_loader.load_data(rebuild_cache=rebuild_cache)
+
+def fetch_availability(api_fetcher):
     real_time_data = api_fetcher.fetch_data()
     
     if 'carpark_number' in real_time_data.columns and 'car_park_no' not in real_time_data.columns:
         real_time_data.rename(columns={'carpark_number': 'car_park_no'}, inplace=True)
+    return real_time_data
+
+@timed('index')
+def build_indexes(merged_data):
+    index_for(merged_data)
+    address_index_for(merged_data)
+    spatial_index_for(merged_data)
+
+def availability_fetcher(cache_ttl=None, stale_while_revalidate=False):
+    """ A fetcher for the live feed, shared between processes through the availability cache with cache_ttl. """
+    api_fetcher = APIFetcher(API_URL)
+    if cache_ttl:
+        api_fetcher = AvailabilityCache(api_fetcher, CACHE_DIR, ttl=cache_ttl,
+                                        stale_while_revalidate=stale_while_revalidate)
+    return api_fetcher
 
-    data_merger = DataMerger()
+def load_data(rebuild_cache=False, static_data=None, api_fetcher=None, cache_ttl=None,
+              stale_while_revalidate=False, compact=False, history=None):
+    if static_data is None:
+        static_data = load_static_data(rebuild_cache=rebuild_cache, compact=compact)
+
+    if api_fetcher is None:
+        api_fetcher = availability_fetcher(cache_ttl, stale_while_revalidate)
+    real_time_data = fetch_availability(api_fetcher)
+    if history is not None:
+        history.append(real_time_data)
+
+    data_merger = DataMerger(compact=compact)
     merged_data = data_merger.merge_data(static_data, real_time_data)
+    build_indexes(merged_data)
     return merged_data
 
-def query_carpark(carpark_number, data):
+def filter_mask(data, where=None, available=False, open_at=None, holidays=None):
+    """ Rows meeting the attribute conditions of where, and with lots available when available.
+
+    open_at maps a schedule column (free_parking, short_term_parking) to a time its schedule must cover,
+    with holidays the path of a public holiday calendar.
+    """
+    mask = attribute_index_for(data).mask(where) if where else np.ones(len(data), dtype=bool)
+    if open_at:
+        dates = load_holidays(holidays) if holidays else ()
+        for column, at in open_at.items():
+            mask &= schedule_table_for(data, column).active(at, dates)
+    if available:
+        mask &= (pd.to_numeric(data['lots_available'], errors='coerce') > 0).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+def query_carpark(carpark_number, data, output_format='text'):
     """ Query car park details by car park number. """
-    result = data[data['car_park_no'] == carpark_number]
+    write_details(index_for(data).lookup(carpark_number), output_format)
+
+def write_details(result, output_format='text'):
     if result.empty:
         print("No data found for the specified car park number.")
+    elif output_format == 'text':
+        # The feed reports one row per lot type; list capacity for the remaining types.
+        with OutputWriter() as writer:
+            writer.write(TextFormatter(DETAIL_LINES).rows(result.iloc[:1]))
+            writer.write(TextFormatter(CAPACITY_LINES, required=()).rows(result.iloc[1:]))
     else:
-        row = result.iloc[0]
-        print("Car Park Details:")
-        print(f"Car Park No: {row['car_park_no']}")
-        print(f"Address: {row['address']}")
-        print(f"Operating Hours: {row.get('operating_hours', 'N/A')}")
-        print(f"Rules: {row.get('rules', 'N/A')}")
-        print(f"Parking System: {row.get('type_of_parking_system', 'N/A')}")
-        print(f"Capacity: Total lots: {row.get('total_lots', 'N/A')}, Lots available: {row.get('lots_available', 'N/A')}")
-        print(f"Coordinates: (x: {row.get('x_coord', 'N/A')}, y: {row.get('y_coord', 'N/A')})")
-        print(f"Update Time: {row.get('update_datetime', 'N/A')}")
-        print(f"Feed Timestamp: {row.get('feed_timestamp', 'N/A')}")
-
-def search_by_address(address, data):
-    """ Search car parks by address. """
-    result = data[data['address'].str.contains(address, case=False, na=False)]
-    if result.empty:
-        print("No data found for the specified address.")
+        write_frames([result], formatter_for(output_format))
+
+def search_by_address(address, data, fuzzy=False, limit=None, offset=0, output_format='text', where=None,
+                      available=False, open_at=None, holidays=None):
+    """ Search car parks by address tokens, or rank near matches when fuzzy, optionally only those matching where. """
+    index = address_index_for(data)
+    if fuzzy:
+        positions = index.search_fuzzy(address, limit=None)
+        limit = limit or 10
     else:
-        for _, row in result.iterrows():
-            print("Car Park Details:")
-            print(f"Car Park No: {row['car_park_no']}")
-            print(f"Address: {row['address']}")
-            print(f"Operating Hours: {row.get('operating_hours', 'N/A')}")
-            print(f"Rules: {row.get('rules', 'N/A')}")
-            print(f"Parking System: {row.get('type_of_parking_system', 'N/A')}")
-            print(f"Capacity: Total lots: {row.get('total_lots', 'N/A')}, Lots available: {row.get('lots_available', 'N/A')}")
-            print(f"Coordinates: (x: {row.get('x_coord', 'N/A')}, y: {row.get('y_coord', 'N/A')})")
-            print(f"Update Time: {row.get('update_datetime', 'N/A')}")
-            print(f"Feed Timestamp: {row.get('feed_timestamp', 'N/A')}")
-            print("-------------------------------------------------")
-
-def view_last_update(carpark_number, data):
+        positions = index.search(address)
+    if where or available or open_at:
+        positions = positions[filter_mask(data, where, available, open_at, holidays)[positions]]
+    # List each car park once, then page through positions before taking any rows.
+    positions = positions[~pd.Index(data['car_park_no'].to_numpy()[positions]).duplicated()]
+    positions = paginate(positions, offset, limit)
+    if not len(positions):
+        print("No data found for the specified address.")
+        return
+    write_frames(take_chunks(data, positions), formatter_for(output_format, separator=True))
+
+def find_nearest(point, data, radius=None, k=5, available=False, latlon=False, output_format='text', where=None,
+                 open_at=None, holidays=None):
+    """ List the car parks nearest to an SVY21 (x, y) point, or (lat, lon) when latlon. """
+    x, y = point
+    if latlon:
+        x, y = wgs84_to_svy21(x, y)
+    # List each car park once, using its first (car) lot type row.
+    mask = ~data['car_park_no'].duplicated().to_numpy() & filter_mask(data, where, available, open_at, holidays)
+    positions, distances = spatial_index_for(data).nearest(x, y, k=k, radius=radius, mask=mask)
+    if not len(positions):
+        print("No car parks found near the specified location.")
+        return
+    write_nearest(data.take(positions).assign(distance=distances), output_format)
+
+def write_nearest(result, output_format='text'):
+    write_frames([result], formatter_for(output_format, lines=DISTANCE_LINES, separator=True))
+
+def filter_carparks(where, data, available=False, limit=None, offset=0, output_format='text', open_at=None,
+                    holidays=None):
+    """ List the car parks whose attributes meet every condition of where. """
+    mask = ~data['car_park_no'].duplicated().to_numpy() & filter_mask(data, where, available, open_at, holidays)
+    positions = paginate(np.flatnonzero(mask), offset, limit)
+    if not len(positions):
+        print("No car parks match the specified filters.")
+        return
+    write_frames(take_chunks(data, positions), formatter_for(output_format, separator=True))
+
+def attribute_conditions(args):
+    """ The attribute filter flags set in args as a where mapping, or None when none are set. """
+    where = {}
+    for flag, column in CATEGORY_FILTERS.items():
+        if getattr(args, flag, None):
+            where[column] = getattr(args, flag)
+    for flag, column in RANGE_FILTERS.items():
+        low, high = getattr(args, f"min_{flag}", None), getattr(args, f"max_{flag}", None)
+        if low is not None or high is not None:
+            where[column] = [low, high]
+    return where or None
+
+def filter_options(args):
+    """ The attribute and schedule filters set in args, as options of the search, near and filter actions. """
+    options = {}
+    where = attribute_conditions(args)
+    if where:
+        options['where'] = where
+    columns = [column for flag, column in SCHEDULE_FILTERS.items() if getattr(args, flag, False)]
+    if columns:
+        # Resolved here so a daemon answers for the same moment.
+        at = local_time(getattr(args, 'at', None)).isoformat()
+        options['open_at'] = {column: at for column in columns}
+        holidays = getattr(args, 'holidays', HOLIDAYS_PATH)
+        if holidays and os.path.exists(holidays):
+            options['holidays'] = holidays
+    return options
+
+def view_last_update(carpark_number, data, output_format='text'):
     """ View the last update time for a specific car park. """
-    result = data[data['car_park_no'] == carpark_number]
+    write_last_update(index_for(data).lookup(carpark_number), output_format)
+
+def write_last_update(result, output_format='text'):
+    if result.empty:
+        print("No data found for the specified car park number.")
+    else:
+        write_frames([result.iloc[:1]], formatter_for(output_format, columns=['car_park_no', 'update_datetime'],
+                                                      lines=LAST_UPDATE_LINES, required=('update_datetime',)))
+
+def read_carpark_numbers(source):
+    """ Car park numbers listed one per line in a file, or on stdin when source is '-'. """
+    if source == '-':
+        return [line.strip() for line in sys.stdin if line.strip()]
+    with open(source, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def _batch_text(numbers, found, requests):
+    # The first row of each request gets full details, further lot types a capacity line.
+    first = np.ones(len(requests), dtype=bool)
+    first[1:] = requests[1:] != requests[:-1]
+    details = iter(TextFormatter(DETAIL_LINES).blocks(found[first]))
+    capacities = iter(TextFormatter(CAPACITY_LINES, required=()).blocks(found[~first]))
+    counts = np.bincount(requests, minlength=len(numbers))
+    out = []
+    for number, count in zip(numbers, counts):
+        if count:
+            out.append(next(details))
+            out.extend(next(capacities) for _ in range(count - 1))
+        else:
+            out.append(f"No data found for car park number {number}.\n")
+        out.append(SEPARATOR + "\n")
+    return "".join(out)
+
+def batch_query(carpark_numbers, data, output_format='text'):
+    """ Resolve many car park numbers with one index lookup per chunk, writing each chunk as it is ready. """
+    index = index_for(data)
+    formatter = formatter_for(output_format)
+    with OutputWriter() as writer:
+        writer.write(formatter.begin())
+        for start in range(0, len(carpark_numbers), BATCH_CHUNK):
+            numbers = np.asarray(carpark_numbers[start:start + BATCH_CHUNK], dtype=object)
+            positions, requests = index.positions_many(numbers, return_requests=True)
+            found = data.take(positions)
+            if output_format == 'text':
+                writer.write(_batch_text(numbers, found, requests))
+            else:
+                # Unknown numbers stay in request order as rows with found=False.
+                missing = np.setdiff1d(np.arange(len(numbers)), requests)
+                # Nullable integers keep counts as integers next to the empty rows of unknown numbers.
+                integers = {column: 'Int64' for column, dtype in found.dtypes.items()
+                            if pd.api.types.is_integer_dtype(dtype)}
+                result = pd.concat([
+                    found.astype(integers).assign(found=True, request=requests),
+                    pd.DataFrame({'car_park_no': numbers[missing], 'found': False, 'request': missing}),
+                ], ignore_index=True).sort_values('request', kind='stable').drop(columns='request')
+                writer.write(formatter.rows(result))
+            writer.flush()
+        writer.write(formatter.end())
+
+def show_history(carpark_number, history, start=None, end=None):
+    """ Print the recorded availability of a car park between start and end. """
+    result = history.query(carpark_number, start=start, end=end)
     if result.empty:
+        print("No history recorded for the specified car park number.")
+        return
+    for row in result.itertuples(index=False):
+        print(f"{row.feed_timestamp:%Y-%m-%d %H:%M:%S} {row.lot_type}: {row.lots_available}/{row.total_lots} lots available")
+
+def backfill_history(start, end, history):
+    """ Fetch the feed's minute snapshots from start to end concurrently and record them in history. """
+    fetcher = AsyncFetcher()
+    fetched = recorded = 0
+    # Each batch is recorded as it arrives, so a long range never sits in memory at once.
+    for frame in fetcher.backfill(API_URL, start, end):
+        fetched += 1
+        recorded += history.append(frame)
+    history.compact()
+    print(f"Recorded {recorded} of {fetched + len(fetcher.failures)} snapshots.")
+    for date_time, error in fetcher.failures:
+        print(f"Failed to fetch the snapshot at {date_time}: {error}")
+
+def show_forecast(carpark_number, history, minutes=30):
+    """ Print the forecast availability of a car park from its recorded history. """
+    recorded = history.query(carpark_number)
+    if recorded.empty:
+        print("No history recorded for the specified car park number.")
+        return
+    forecast = OccupancyAnalytics.from_frame(recorded).forecast(minutes)
+    for (_, lot_type), row in forecast.iterrows():
+        print(f"Forecast for {carpark_number} ({lot_type}) at {row['forecast_timestamp']:%Y-%m-%d %H:%M}: "
+              f"{row['forecast_lots_available']:.0f} lots available "
+              f"(now {row['lots_available']:.0f} of {row['total_lots']:.0f})")
+
+def show_busiest(top, data):
+    """ List the car parks with the highest share of lots taken. """
+    result = busiest(data, top=int(top))
+    if result.empty:
+        print("No availability data to rank.")
+    for rank, row in enumerate(result.itertuples(index=False), start=1):
+        print(f"{rank}. {row.car_park_no} {row.occupancy:.0%} full "
+              f"({row.lots_available}/{row.total_lots} lots available) - {row.address}")
+
+def answer_from_snapshot(action, carpark_number, snapshot):
+    """ Answer a text --query or --view from a lookup snapshot, printing what the full path would. """
+    records = snapshot.records(carpark_number)
+    if not records:
         print("No data found for the specified car park number.")
+    elif action == 'query':
+        lines = render_lines(DETAIL_LINES, records[0])
+        for record in records[1:]:
+            lines.extend(render_lines(CAPACITY_LINES, record, required=()))
+        print("\n".join(lines))
     else:
-        print(f"Last Update Time: {result['update_datetime'].iloc[0]}")
+        print(render_lines(LAST_UPDATE_LINES, records[0], required=('update_datetime',))[0])
+
+def store_query(carpark_number, store, output_format='text'):
+    """ query_carpark answered with indexed SQL against a SQLiteStore. """
+    write_details(store.lookup(carpark_number), output_format)
+
+def store_search(address, store, limit=None, offset=0, output_format='text'):
+    """ search_by_address answered from the store's full-text address index. """
+    result = store.search(address, limit=limit, offset=offset)
+    if result.empty:
+        print("No data found for the specified address.")
+        return
+    write_frames([result], formatter_for(output_format, separator=True))
+
+def store_view(carpark_number, store, output_format='text'):
+    write_last_update(store.lookup(carpark_number, limit=1), output_format)
+
+def store_nearest(point, store, radius=None, k=5, available=False, latlon=False, output_format='text'):
+    """ find_nearest answered from the store's R-tree over coordinates. """
+    x, y = point
+    if latlon:
+        x, y = wgs84_to_svy21(x, y)
+    result = store.nearest(x, y, k=k, radius=radius, available=available)
+    if result.empty:
+        print("No car parks found near the specified location.")
+        return
+    write_nearest(result, output_format)
+
+def catalogue_source():
+    """ Signature of the static CSV a store's catalogue was loaded from. """
+    stat = os.stat(STATIC_DATA_PATH)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+def open_store(path, max_age=60, rebuild_cache=False, static_data=None):
+    """ Open a SQLiteStore, reloading its catalogue when the CSV changed and its availability when older than max_age. """
+    store = SQLiteStore(path)
+    source = catalogue_source()
+    if rebuild_cache or store.catalogue_source() != source:
+        if static_data is None:
+            static_data = load_static_data(rebuild_cache=rebuild_cache)
+        store.load_catalogue(static_data, source)
+    if max_age is not None:
+        try:
+            store.refresh(lambda: fetch_availability(APIFetcher(API_URL)), max_age)
+        except Exception as e:
+            # The store still holds the last availability written, so answer from that.
+            age = store.age()
+            stored = "no stored availability" if age is None else f"availability from {age:.0f} s ago"
+            print(f"Warning: could not refresh availability ({e}); answering with {stored}.", file=sys.stderr)
+    return store
+
+def open_shared(path, max_age):
+    """ The frame published to a SharedTable, or None when nothing was published in the last max_age seconds. """
+    table = SharedTable(path)
+    age = table.age()
+    if age is None or age > max_age:
+        return None
+    return table.frame()
+
+ACTIONS = {
+    'query': query_carpark,
+    'search': search_by_address,
+    'view': view_last_update,
+    'near': find_nearest,
+    'filter': filter_carparks,
+    'busiest': show_busiest,
+    'batch': batch_query,
+}
+
+# Store-backed actions and the options each can answer; other options fall back to the in-memory path.
+STORE_ACTIONS = {
+    'query': (store_query, {'output_format'}),
+    'search': (store_search, {'output_format', 'limit', 'offset'}),
+    'view': (store_view, {'output_format'}),
+    'near': (store_nearest, {'output_format', 'radius', 'k', 'available', 'latlon'}),
+}
+
+def serve(address, refresh_interval=60, rebuild_cache=False, compact=False, history=None, metrics=None, store=None,
+          shared=None):
+    """ Run the query daemon, keeping merged data in memory between requests, in the store at path store
+    and in the shared table at path shared.
+    """
+    static_data = load_static_data(rebuild_cache=rebuild_cache, compact=compact)
+    if store is not None:
+        store = open_store(store, max_age=None, rebuild_cache=rebuild_cache, static_data=static_data)
+    if shared is not None:
+        shared = SharedTable(shared)
+    # One fetcher and merger for the daemon's lifetime keep the pooled connection, the ETag
+    # and the previous snapshot, so each refresh only writes the car parks that changed.
+    api_fetcher = APIFetcher(API_URL)
+    data_merger = DataMerger(compact=compact)
+
+    def refresh():
+        real_time_data = fetch_availability(api_fetcher)
+        if history is not None:
+            history.append(real_time_data)
+        if store is not None:
+            store.upsert_availability(real_time_data)
+        merged_data, _ = data_merger.merge_incremental(static_data, real_time_data)
+        if shared is not None:
+            shared.publish(merged_data)
+        build_indexes(merged_data)
+        return merged_data
+
+    server = daemon.QueryServer(address, ACTIONS, refresh, refresh_interval=refresh_interval)
+    server.start()
+    print(f"Serving car park queries on {address}")
+    metrics_server = MetricsServer(metrics).start() if metrics else None
+    try:
+        server.serve_forever()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+
+def watch_availability(interval=60, carparks=None, address=None, below=None, publish=None, sse=None, polls=None,
+                       metrics=None):
+    """ Poll the feed and write changed records as NDJSON, to stdout and to any socket or SSE subscribers. """
+    # No car parks listed means every car park; an address narrows the list further.
+    carparks = list(carparks) if carparks else None
+    if address:
+        static_data = load_static_data()
+        matches = static_data['car_park_no'].to_numpy()[address_index_for(static_data).search(address)]
+        carparks = matches if carparks is None else pd.Index(carparks).intersection(matches)
+    sinks = [watch.StdoutSink()]
+    if publish:
+        sinks.append(watch.DeltaPublisher(publish).start())
+    if sse:
+        sinks.append(watch.DeltaPublisher(sse, sse=True).start())
+    # The metrics server answers scrapes on its own; it is not a sink for deltas.
+    metrics_server = MetricsServer(metrics).start() if metrics else None
+    api_fetcher = APIFetcher(API_URL)
+    delta_filter = watch.DeltaFilter(carparks=carparks, below=below)
+    watcher = watch.AvailabilityWatcher(lambda: fetch_availability(api_fetcher), sinks, delta_filter, interval)
+    try:
+        watcher.run(polls)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sink in sinks[1:]:
+            sink.close()
+        if metrics_server is not None:
+            metrics_server.close()
 
 def main():
     parser = argparse.ArgumentParser(description="Car Park App CLI")
     parser.add_argument('--query', help='Query car park details by car park number.')
     parser.add_argument('--search', help='Search car parks by address.')
     parser.add_argument('--view', help='View last update time of a car park.')
+    parser.add_argument('--near', nargs=2, type=float, metavar=('X', 'Y'),
+                        help='List the car parks nearest to SVY21 coordinates X Y.')
+    parser.add_argument('--latlon', action='store_true',
+                        help='Read --near as WGS84 latitude and longitude instead of SVY21.')
+    parser.add_argument('--radius', type=float, help='Only list car parks within this many metres.')
+    parser.add_argument('--k', type=int, default=5, help='Number of nearest car parks to list.')
+    parser.add_argument('--available', action='store_true',
+                        help='Only list car parks with lots available.')
+    parser.add_argument('--type', action='append', metavar='CAR_PARK_TYPE',
+                        help='Only list car parks of this type, e.g. "MULTI-STOREY CAR PARK"; repeat to allow several.')
+    parser.add_argument('--parking-system', action='append',
+                        help='Only list car parks with this parking system, e.g. "ELECTRONIC PARKING".')
+    parser.add_argument('--short-term', action='append', metavar='HOURS',
+                        help='Only list car parks with this short-term parking, e.g. "WHOLE DAY".')
+    parser.add_argument('--free-parking', action='append', metavar='HOURS',
+                        help='Only list car parks with this free parking, e.g. "NO".')
+    parser.add_argument('--night-parking', type=str.upper, choices=('YES', 'NO'),
+                        help='Only list car parks with or without night parking.')
+    parser.add_argument('--basement', type=str.upper, choices=('Y', 'N'),
+                        help='Only list basement (Y) or non-basement (N) car parks.')
+    parser.add_argument('--min-gantry', type=float, metavar='METRES', help='Only list car parks at least this tall.')
+    parser.add_argument('--max-gantry', type=float, metavar='METRES', help='Only list car parks at most this tall.')
+    parser.add_argument('--min-decks', type=int, help='Only list car parks with at least this many decks.')
+    parser.add_argument('--max-decks', type=int, help='Only list car parks with at most this many decks.')
+    parser.add_argument('--free-now', action='store_true', help='Only list car parks where parking is free now.')
+    parser.add_argument('--short-term-now', action='store_true',
+                        help='Only list car parks that allow short-term parking now.')
+    parser.add_argument('--at', metavar='TIME',
+                        help='With --free-now or --short-term-now, check this ISO time (Singapore time) instead of now.')
+    parser.add_argument('--holidays', metavar='FILE', default=HOLIDAYS_PATH,
+                        help='Public holiday calendar: ISO dates, one per line, or a CSV with a date column '
+                             '(default: %(default)s, if present).')
+    parser.add_argument('--fuzzy', action='store_true',
+                        help='Rank approximate address matches instead of requiring every token.')
+    parser.add_argument('--limit', type=int, help='Maximum number of search or filter results.')
+    parser.add_argument('--offset', type=int, default=0, help='Skip this many search or filter results.')
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help='Discard the static data snapshot cache and rebuild it from the CSV.')
+    parser.add_argument('--cache-ttl', type=float,
+                        help='Share fetched availability between CLI calls for this many seconds.')
+    parser.add_argument('--stale-while-revalidate', action='store_true',
+                        help='With --cache-ttl, answer from stale cached availability and refresh it in the background.')
+    parser.add_argument('--compact', action='store_true',
+                        help='Hold data with categorical and narrow numeric dtypes to save memory.')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='Print bytes per column of the merged data before and after compaction.')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run as a daemon answering queries over a local socket.')
+    parser.add_argument('--daemon', default=daemon.DEFAULT_ADDRESS,
+                        help='Daemon socket path or host:port (default: %(default)s).')
+    parser.add_argument('--store', metavar='PATH',
+                        help='Keep the catalogue and latest availability in this SQLite database and answer '
+                             '--query, --search, --view and --near from it, refreshing it when older than '
+                             '--refresh-interval. With --serve, write every refresh to it.')
+    parser.add_argument('--shared', metavar='PATH',
+                        help='With --serve, publish every refresh as a memory-mapped table at PATH, e.g. '
+                             '/dev/shm/carparks.table; otherwise answer from that table while it is no older '
+                             'than twice --refresh-interval.')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Always answer in-process, even when a daemon is running.')
+    parser.add_argument('--refresh-interval', type=float, default=60,
+                        help='Seconds between availability refreshes in daemon and watch mode.')
+    parser.add_argument('--watch', nargs='*', metavar='CAR_PARK',
+                        help='Poll availability and print changed records as NDJSON, optionally only for these car parks.')
+    parser.add_argument('--address', help='With --watch, only report car parks whose address matches these tokens.')
+    parser.add_argument('--below', type=int,
+                        help='With --watch, only report records whose lots available fell below this number.')
+    parser.add_argument('--publish', metavar='ADDRESS',
+                        help='With --watch, also stream NDJSON to subscribers on this socket path or host:port.')
+    parser.add_argument('--sse', metavar='HOST:PORT',
+                        help='With --watch, also serve the changes as server-sent events on HOST:PORT.')
+    parser.add_argument('--polls', type=int, help='With --watch, stop after this many polls.')
+    parser.add_argument('--profile', nargs='?', const='table', choices=('table', 'json'),
+                        help='Print per-stage timings, rows, bytes and peak memory to stderr when done.')
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help='Write a cProfile dump per stage (load, fetch.http, merge, ...) to DIR.')
+    parser.add_argument('--metrics', metavar='HOST:PORT',
+                        help='With --serve or --watch, serve per-stage metrics for Prometheus on HOST:PORT/metrics.')
+    parser.add_argument('--record-history', action='store_true',
+                        help='Append each fetched availability snapshot to the history store.')
+    parser.add_argument('--history-dir', default=HISTORY_DIR,
+                        help='Directory of the availability history store (default: %(default)s).')
+    parser.add_argument('--history', help='Print the recorded availability of a car park.')
+    parser.add_argument('--start', help='With --history, only list snapshots from this time.')
+    parser.add_argument('--end', help='With --history, only list snapshots up to this time.')
+    parser.add_argument('--backfill', nargs=2, metavar=('START', 'END'),
+                        help='Fetch the minute snapshots from START to END and record them in the history store.')
+    parser.add_argument('--compact-history', action='store_true',
+                        help='Merge small history segments into larger ones.')
+    parser.add_argument('--batch', metavar='FILE',
+                        help="Query every car park number listed in FILE (one per line, '-' for stdin).")
+    parser.add_argument('--format', choices=FORMATS, default='text',
+                        help='Output format of --query, --search, --view, --near, --batch and attribute filters.')
+    parser.add_argument('--forecast', help='Forecast the availability of a car park from its history.')
+    parser.add_argument('--minutes', type=int, default=30, help='Forecast horizon in minutes.')
+    parser.add_argument('--busiest', action='store_true', help='List the fullest car parks right now.')
+    parser.add_argument('--top', type=int, default=10, help='Number of car parks listed by --busiest.')
     args = parser.parse_args()
 
-    data = load_data()
+    profile = getattr(args, 'profile', None)
+    profile_dir = getattr(args, 'profile_dir', None)
+    if profile or profile_dir or getattr(args, 'metrics', None):
+        instruments.enable(memory=True, profile_dir=profile_dir)
+    try:
+        run(args, parser)
+    finally:
+        if profile_dir:
+            instruments.dump_profiles()
+        if profile:
+            print(instruments.to_json() if profile == 'json' else instruments.summary(), file=sys.stderr)
 
+def run(args, parser):
+    """ Carry out the command described by parsed arguments. """
+    rebuild_cache = getattr(args, 'rebuild_cache', False)
+    compact = getattr(args, 'compact', False)
+    address = getattr(args, 'daemon', daemon.DEFAULT_ADDRESS)
+    history_dir = getattr(args, 'history_dir', HISTORY_DIR)
+    history = HistoryStore(history_dir) if getattr(args, 'record_history', False) else None
+    if getattr(args, 'serve', False):
+        serve(address, args.refresh_interval, rebuild_cache, compact, history, getattr(args, 'metrics', None),
+              getattr(args, 'store', None), getattr(args, 'shared', None))
+        return
+    if getattr(args, 'watch', None) is not None:
+        watch_availability(args.refresh_interval, args.watch, args.address, args.below, args.publish, args.sse,
+                           args.polls, getattr(args, 'metrics', None))
+        return
+    if getattr(args, 'history', None):
+        show_history(args.history, HistoryStore(history_dir), args.start, args.end)
+        return
+    if getattr(args, 'forecast', None):
+        show_forecast(args.forecast, HistoryStore(history_dir), args.minutes)
+        return
+    if getattr(args, 'backfill', None):
+        backfill_history(*args.backfill, HistoryStore(history_dir))
+        return
+    if getattr(args, 'compact_history', False):
+        print(f"Merged {HistoryStore(history_dir).compact()} history segments.")
+        return
+    if getattr(args, 'memory_report', False):
+        data = load_data(rebuild_cache=rebuild_cache)
+        print(memory_report(data, compact_frame(data)))
+        return
+
+    options = {'output_format': getattr(args, 'format', 'text')}
+    filters = filter_options(args)
+    available = getattr(args, 'available', False)
     if args.query:
-        query_carpark(args.query, data)
+        action, value = 'query', args.query
     elif args.search:
-        search_by_address(args.search, data)
+        action, value = 'search', args.search
+        options.update(fuzzy=getattr(args, 'fuzzy', False), limit=getattr(args, 'limit', None),
+                       offset=getattr(args, 'offset', 0))
+        if filters or available:
+            options.update(filters, available=available)
     elif args.view:
-        view_last_update(args.view, data)
+        action, value = 'view', args.view
+    elif getattr(args, 'near', None):
+        action, value = 'near', args.near
+        options.update(radius=args.radius, k=args.k, available=args.available, latlon=args.latlon)
+        options.update(filters)
+    elif filters or available:
+        action, value = 'filter', filters.pop('where', None)
+        options.update(filters, available=available, limit=getattr(args, 'limit', None),
+                       offset=getattr(args, 'offset', 0))
+    elif getattr(args, 'batch', None):
+        action, value = 'batch', read_carpark_numbers(args.batch)
+    elif getattr(args, 'busiest', False):
+        action, value, options = 'busiest', getattr(args, 'top', 10), {}
     else:
         parser.print_help()
+        return
+
+    store = getattr(args, 'store', None)
+    if store and action in STORE_ACTIONS and history is None:
+        answer, supported = STORE_ACTIONS[action]
+        if all(key in supported or not option for key, option in options.items()):
+            store = open_store(store, getattr(args, 'refresh_interval', 60), rebuild_cache)
+            with stage(f"action.{action}"):
+                answer(value, store, **{key: option for key, option in options.items() if key in supported})
+            return
+
+    shared = getattr(args, 'shared', None)
+    if shared and not rebuild_cache and history is None:
+        data = open_shared(shared, 2 * getattr(args, 'refresh_interval', 60))
+        if data is not None:
+            build_indexes(data)
+            with stage(f"action.{action}"):
+                ACTIONS[action](value, data, **options)
+            return
+
+    if not getattr(args, 'no_daemon', False) and not rebuild_cache and history is None:
+        if daemon.request(address, action, value, write=sys.stdout.write, **options) is not None:
+            return
+
+    # A snapshot is only trusted for as long as --cache-ttl would share the availability behind it.
+    cache_ttl = getattr(args, 'cache_ttl', None)
+    snapshot = None
+    if cache_ttl and not rebuild_cache and history is None:
+        snapshot = LookupSnapshot(LOOKUP_SNAPSHOT_PATH, STATIC_DATA_PATH)
+        if action in ('query', 'view') and options['output_format'] == 'text' and snapshot.load() is not None:
+            answer_from_snapshot(action, value, snapshot)
+            return
+
+    api_fetcher = availability_fetcher(cache_ttl, getattr(args, 'stale_while_revalidate', False))
+    data = load_data(rebuild_cache=rebuild_cache, api_fetcher=api_fetcher, compact=compact, history=history)
+    # The snapshot expires with the cached availability it was built from, not a full TTL from now.
+    if snapshot is not None and snapshot.load() is None:
+        try:
+            snapshot.write(data, api_fetcher.served_until)
+        except OSError as e:
+            print(f"Warning: could not write the lookup snapshot ({e}).", file=sys.stderr)
+    with stage(f"action.{action}"):
+        ACTIONS[action](value, data, **options)
 
 if __name__ == "__main__":
     main()
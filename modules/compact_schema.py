@@ -0,0 +1,73 @@
+import pandas as pd
+
+# Low-cardinality text columns repeated on every row.
+CATEGORICAL_COLUMNS = (
+    'car_park_type', 'type_of_parking_system', 'short_term_parking', 'free_parking',
+    'night_parking', 'car_park_basement', 'lot_type',
+)
+# Lot counts stay Int32 so incremental merges can write any plausible count.
+NARROW_DTYPES = {
+    'car_park_decks': 'Int8',
+    'gantry_height': 'float32',
+    'total_lots': 'Int32',
+    'lots_available': 'Int32',
+}
+
+RECORD_FIELDS = (
+    'car_park_no', 'address', 'x_coord', 'y_coord', 'car_park_type', 'type_of_parking_system',
+    'short_term_parking', 'free_parking', 'night_parking', 'car_park_decks', 'gantry_height',
+    'car_park_basement', 'update_datetime', 'total_lots', 'lot_type', 'lots_available', 'feed_timestamp',
+)
+
+
+def compact_frame(data):
+    """ Return a copy of data using categoricals and narrow nullable dtypes where they apply. """
+    dtypes = {column: 'category' for column in CATEGORICAL_COLUMNS if column in data.columns}
+    for column, dtype in NARROW_DTYPES.items():
+        if column in data.columns:
+            dtypes[column] = dtype
+    compact = data.copy()
+    for column, dtype in dtypes.items():
+        values = compact[column]
+        if dtype.startswith('Int'):
+            values = pd.to_numeric(values, errors='coerce')
+        compact[column] = values.astype(dtype)
+    return compact
+
+
+def memory_report(before, after):
+    """ Bytes per column before and after compaction, as a printable table. """
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    lines = [f"{'Column':<24} {'Before':>12} {'After':>12} {'Dtype':>10}"]
+    for column in before.columns:
+        lines.append(f"{column:<24} {before_bytes[column]:>12,} {after_bytes[column]:>12,} {str(after[column].dtype):>10}")
+    lines.append(f"{'Total':<24} {before_bytes.sum():>12,} {after_bytes.sum():>12,}")
+    return "\n".join(lines)
+
+
+class CarparkRecord:
+    """ A single merged row with fixed attributes and no per-instance __dict__. """
+
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_frame(cls, data, position):
+        """ Build the record for one row position without materializing a row Series. """
+        return cls(**{field: data[field].iat[position] for field in cls.__slots__ if field in data.columns})
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __repr__(self):
+        return f"CarparkRecord(car_park_no={self.car_park_no!r}, address={self.address!r})"
@@ -0,0 +1,188 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from .instrumentation import count, stage
+
+DEFAULT_ADDRESS = 'data/.carpark.sock' if hasattr(socket, 'AF_UNIX') else '127.0.0.1:8765'
+# Replies are sent in pieces of about this many characters, so a large --batch never waits on one big reply.
+CHUNK_SIZE = 1 << 16
+
+
+def parse_address(address):
+    """ Split 'host:port' into a TCP address; anything else is a Unix socket path. """
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return 'tcp', (host or '127.0.0.1', int(port))
+    return 'unix', address
+
+
+class _ChunkWriter(io.TextIOBase):
+    """ Stands in for stdout during a request, sending what the action prints as it reaches CHUNK_SIZE. """
+
+    def __init__(self, wfile, chunk_size=CHUNK_SIZE):
+        self.wfile = wfile
+        self.chunk_size = chunk_size
+        self.written = 0
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        self.written += len(text)
+        if self._size >= self.chunk_size:
+            self.send(more=True)
+        return len(text)
+
+    def tell(self):
+        return self.written
+
+    def send(self, more=False):
+        response = {'ok': True, 'output': ''.join(self._parts)}
+        if more:
+            response['more'] = True
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        self._parts, self._size = [], 0
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        writer = _ChunkWriter(self.wfile, CHUNK_SIZE)
+        try:
+            request = json.loads(line)
+            self.server.query_server.stream_request(
+                writer, request['action'], request.get('value'), **request.get('options', {}))
+        except Exception as e:
+            response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        else:
+            writer.send()
+
+
+class _TCPServer(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+class QueryServer:
+    """ Keeps merged data in memory and answers CLI actions over a local socket. """
+
+    def __init__(self, address, actions, refresh, refresh_interval=60):
+        self.address = address
+        self.actions = actions
+        self.refresh = refresh
+        self.refresh_interval = refresh_interval
+        self.data = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+
+    def handle_request(self, action, value, **options):
+        buffer = io.StringIO()
+        self.stream_request(buffer, action, value, **options)
+        return buffer.getvalue()
+
+    def stream_request(self, stream, action, value, **options):
+        """ Perform an action, writing what it prints to stream. """
+        if action not in self.actions:
+            raise ValueError(f"Unknown action: {action}")
+        # redirect_stdout is process-wide, so requests are answered one at a time.
+        with self._lock, contextlib.redirect_stdout(stream), stage(f"action.{action}"):
+            self.actions[action](value, self.data, **options)
+        count(f"action.{action}", bytes=stream.tell())
+
+    def refresh_data(self):
+        """ Build the next data outside the lock, then swap it in between requests. """
+        data = self.refresh()
+        with self._lock:
+            self.data = data
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh_data()
+            except Exception as e:
+                print(f"Error refreshing availability data: {e}")
+
+    def start(self):
+        self.data = self.refresh()
+        kind, address = parse_address(self.address)
+        if kind == 'unix':
+            if os.path.exists(address):
+                os.remove(address)
+            self._server = socketserver.UnixStreamServer(address, _RequestHandler)
+        else:
+            self._server = _TCPServer(address, _RequestHandler)
+        self._server.query_server = self
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+
+    def serve_forever(self):
+        if self._server is None:
+            self.start()
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def shutdown(self):
+        self._server.shutdown()
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.server_close()
+            kind, address = parse_address(self.address)
+            if kind == 'unix' and os.path.exists(address):
+                os.remove(address)
+            self._server = None
+
+
+def request(address, action, value, timeout=5.0, write=None, **options):
+    """ Ask a running daemon to perform an action; returns None when no daemon is reachable or it fails to answer.
+
+    The reply arrives in chunks, and timeout bounds the wait for each one rather than the whole reply. With
+    write, every chunk is passed to it as it arrives and '' is returned; otherwise the whole output is.
+    """
+    kind, target = parse_address(address)
+    if kind == 'unix' and not os.path.exists(target):
+        return None
+    family = socket.AF_UNIX if kind == 'unix' else socket.AF_INET
+    parts = []
+    written = False
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(target)
+            sock.sendall(json.dumps({'action': action, 'value': value, 'options': options}).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as stream:
+                while True:
+                    line = stream.readline()
+                    if not line:
+                        raise ConnectionError("The daemon closed the connection before the reply ended.")
+                    response = json.loads(line)
+                    if not response['ok']:
+                        if written:
+                            raise RuntimeError(f"Daemon error: {response['error']}")
+                        # Nothing is out yet, so the caller can still answer without the daemon.
+                        print(f"Warning: daemon error ({response['error']}); answering without it.", file=sys.stderr)
+                        return None
+                    if write is None:
+                        parts.append(response['output'])
+                    elif response['output']:
+                        write(response['output'])
+                        written = True
+                    if not response.get('more'):
+                        break
+    except OSError as e:
+        # Once part of the reply is out, falling back would print it twice.
+        if written:
+            raise RuntimeError(f"Daemon reply interrupted: {e}") from e
+        return None
+    return ''.join(parts)
@@ -1,15 +1,125 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+from .snapshot_cache import SnapshotCache
+from .compact_schema import compact_frame
+from .instrumentation import count, timed
+from .schema import Column, Schema, reason_counts
+
+# Rows sampled to tell mostly distinct text columns from repetitive ones.
+SAMPLE_ROWS = 1_000
+REQUIRED_COLUMNS = {
+    'car_park_no', 'address', 'x_coord', 'y_coord', 'car_park_type',
+    'type_of_parking_system', 'short_term_parking', 'free_parking',
+    'night_parking', 'car_park_decks', 'gantry_height', 'car_park_basement'
+}
+# Numeric columns are left for the schema to parse, so a malformed value quarantines its row instead of failing the read.
+CATALOGUE_SCHEMA = Schema({
+    'car_park_no': Column('text', nullable=False),
+    'address': Column('text', nullable=False),
+    'x_coord': Column('number', min=0),
+    'y_coord': Column('number', min=0),
+    'car_park_type': Column('text'),
+    'type_of_parking_system': Column('text'),
+    'short_term_parking': Column('text'),
+    'free_parking': Column('text'),
+    'night_parking': Column('text', pattern='YES|NO'),
+    'car_park_decks': Column('integer', nullable=False, min=0),
+    'gantry_height': Column('number', min=0),
+    'car_park_basement': Column('text', pattern='Y|N'),
+})
+
+
+def _strip(value):
+    """ A stripped string; empty strings and missing values become NA. """
+    if isinstance(value, str):
+        return value.strip() if value else pd.NA
+    return pd.NA if pd.isna(value) else value
+
+
+def _clean_text(values):
+    """ Apply _strip to a text column, stripping each distinct value only once when values repeat. """
+    if (len(pd.unique(values[:SAMPLE_ROWS])) > SAMPLE_ROWS // 2
+            and pd.api.types.infer_dtype(values, skipna=True) == 'string'):
+        # Mostly distinct text: strip the whole column at once rather than factorizing it.
+        return values.str.strip().mask(values.isna() | values.eq(''), pd.NA)
+    codes, uniques = pd.factorize(values)
+    # Code -1 (missing) picks the trailing NA.
+    cleaned = np.array([_strip(value) for value in uniques] + [pd.NA], dtype=object)
+    return pd.Series(cleaned[codes], index=values.index, name=values.name)
+
+
+def clean_frame(data):
+    """ The cleaning DataLoader applies, as a plain function so worker processes can run it on chunks. """
+    data.columns = data.columns.str.strip()
+    for col in data.select_dtypes(include=['object']).columns:
+        data[col] = _clean_text(data[col])
+    return data
+
+
+def validation_errors(data):
+    """ Problems that fail a whole frame rather than some of its rows. """
+    if not REQUIRED_COLUMNS.issubset(data.columns):
+        missing = REQUIRED_COLUMNS - set(data.columns)
+        return [f"Missing required columns: {missing}"]
+    return []
+
+
+def _concat_chunks(chunks):
+    """ Concatenate chunks, keeping categorical columns categorical when their categories differ. """
+    if len(chunks) == 1:
+        return chunks[0]
+    data = pd.concat(chunks, ignore_index=True)
+    for column, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(data[column].dtype, pd.CategoricalDtype):
+            data[column] = pd.api.types.union_categoricals([chunk[column] for chunk in chunks], sort_categories=True)
+    return data
+
 
 class DataLoader:
-    def __init__(self, file_path):
+    """ Loads and cleans the static car park catalogue.
+
+    With chunk_rows the CSV is read and cleaned chunk by chunk, and with workers the chunks are cleaned
+    in that many processes. Only a few chunks are in flight at a time, so memory beyond the result stays bounded.
+    Rows breaking CATALOGUE_SCHEMA are left out and kept in quarantine, indexed by their row in the file.
+    """
+
+    def __init__(self, file_path, cache_dir=None, compact=False, chunk_rows=None, workers=None):
         self.file_path = file_path
+        self.cache = SnapshotCache(cache_dir, file_path) if cache_dir else None
+        self.compact = compact
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+        self.quarantine = None
+
+    @timed('load')
+    def load_data(self, rebuild_cache=False):
+        data = self._load(rebuild_cache)
+        count('load', rows=len(data))
+        return data
 
-    def load_data(self):
+    def _load(self, rebuild_cache):
+        if self.cache is not None:
+            if rebuild_cache:
+                self.cache.invalidate()
+            else:
+                cached = self.cache.load()
+                if cached is not None:
+                    self.quarantine = self.cache.load_quarantine()
+                    if self.quarantine is not None:
+                        count('load.quarantine', rows=len(self.quarantine))
+                    return compact_frame(cached) if self.compact else cached
         try:
-            data = pd.read_csv(self.file_path)
-            data = self.clean_data(data)
-            self.validate_data(data)
-            return data
+            # With no snapshot to save, chunks are compacted as they arrive.
+            compacted = bool(self.chunk_rows) and self.compact and self.cache is None
+            if self.chunk_rows:
+                data = self._load_chunked(compact=compacted)
+            else:
+                data = self.clean_data(pd.read_csv(self.file_path))
+                self.validate_data(data)
+                data, self.quarantine = CATALOGUE_SCHEMA.validate(data)
+                self._check_rows([data])
         except FileNotFoundError:
             print(f"Error: The file at {self.file_path} was not found.")
             raise
@@ -19,39 +129,59 @@ class DataLoader:
         except pd.errors.ParserError:
             print("Error: There was an issue parsing the file.")
             raise
+        if self.cache is not None:
+            self.cache.save(data, self.quarantine)
+        return compact_frame(data) if self.compact and not compacted else data
 
-    def clean_data(self, data):
-        data.columns = data.columns.str.strip()
-        data.replace("", pd.NA, inplace=True)
+    def iter_chunks(self, chunk_rows=None):
+        """ Yield cleaned, validated chunks of the CSV in file order, then set self.quarantine to their bad rows. """
+        chunk_rows = chunk_rows or self.chunk_rows or 100_000
+        reader = pd.read_csv(self.file_path, chunksize=chunk_rows)
+        quarantined = []
+        for chunk in self._cleaned(reader):
+            self.validate_data(chunk)
+            chunk, quarantine = CATALOGUE_SCHEMA.validate(chunk)
+            quarantined.append(quarantine)
+            yield chunk
+        if quarantined:
+            self.quarantine = pd.concat(quarantined)
 
-        for col in data.select_dtypes(include=['object']).columns:
-            data[col] = data[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
-        data = data.where(pd.notnull(data), pd.NA)
-        try:
-            data['x_coord'] = data['x_coord'].astype(float)
-            data['y_coord'] = data['y_coord'].astype(float)
-            data['car_park_decks'] = data['car_park_decks'].astype(int)
-            data['gantry_height'] = data['gantry_height'].astype(float)
-        except Exception as e:
-            print("Error converting numeric fields:", e)
-            raise
-        return data
+    def _cleaned(self, chunks):
+        if not self.workers:
+            yield from map(self.clean_data, chunks)
+            return
+        # Executor.map would read the whole file up front; keep two chunks per worker in flight instead.
+        with ProcessPoolExecutor(self.workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(clean_frame, chunk))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
-    def validate_data(self, data):
-        required_columns = {
-            'car_park_no', 'address', 'x_coord', 'y_coord', 'car_park_type',
-            'type_of_parking_system', 'short_term_parking', 'free_parking',
-            'night_parking', 'car_park_decks', 'gantry_height', 'car_park_basement'
-        }
-        if not required_columns.issubset(data.columns):
-            missing = required_columns - set(data.columns)
-            raise ValueError(f"Missing required columns: {missing}")
-        
-        if data['car_park_decks'].min() < 0:
-            raise ValueError("Car park decks must be non-negative.")
-        if data['gantry_height'].min() < 0:
-            raise ValueError("Gantry height must be non-negative.")
+    def _load_chunked(self, compact=False):
+        """ Read the CSV chunk by chunk, quarantining each chunk's bad rows. """
+        chunks = [compact_frame(chunk) if compact else chunk for chunk in self.iter_chunks()]
+        if not chunks:
+            raise pd.errors.EmptyDataError("No rows to load.")
+        self._check_rows(chunks)
+        return _concat_chunks(chunks)
+
+    def _check_rows(self, chunks):
+        rejected = len(self.quarantine)
+        count('load.quarantine', rows=rejected)
+        if rejected and not any(len(chunk) for chunk in chunks):
+            counts = ", ".join(f"{reason} ({rows})" for reason, rows in reason_counts(self.quarantine).items())
+            raise ValueError(f"No valid rows in {self.file_path}: {counts}")
 
+    def clean_data(self, data):
+        return clean_frame(data)
+
+    def validate_data(self, data):
+        errors = validation_errors(data)
+        if errors:
+            raise ValueError("; ".join(errors))
 
 if __name__ == "__main__":
     loader = DataLoader('data/HDBCarparkInformation.csv')
@@ -1,19 +1,118 @@
+import numpy as np
 import pandas as pd
+from .compact_schema import compact_frame
+from .instrumentation import count, timed
+from .schema import Column, Schema
+
+AVAILABILITY_FIELDS = ('update_datetime', 'total_lots', 'lots_available')
+KEY_SCHEMA = Schema({'car_park_no': Column('text', nullable=False)})
+
+def snapshot_keys(data):
+    return ['car_park_no', 'lot_type'] if 'lot_type' in data.columns else ['car_park_no']
+
+def changed_rows(previous, current, fields=AVAILABILITY_FIELDS):
+    """ Boolean mask of rows whose fields differ between two snapshots with the same row layout. """
+    changed = np.zeros(len(current), dtype=bool)
+    for field in fields:
+        if field in current.columns:
+            before, after = previous[field].to_numpy(), current[field].to_numpy()
+            differs = np.flatnonzero(before != after)
+            # NaN never equals itself, so only the differing rows need a missing-value check.
+            both_missing = pd.isna(before[differs]) & pd.isna(after[differs])
+            changed[differs[~both_missing]] = True
+    return changed
 
 class DataMerger:
-    def __init__(self):
-        pass
+    def __init__(self, compact=False):
+        self.compact = compact
+        self.quarantine = None
+        self._static_data = None
+        self._static_keys = None
+        self._previous = None
+        self._merged = None
+        self._spare = None
+        self._written_rows = None
+        self._snapshot_rows = None
 
+    @timed('merge')
     def merge_data(self, static_data, real_time_data):
         if 'car_park_no' not in static_data.columns or 'car_park_no' not in real_time_data.columns:
             raise ValueError("Missing necessary car park number columns in datasets.")
 
-        if not static_data['car_park_no'].apply(lambda x: isinstance(x, str)).all():
+        # Rows of either side with an invalid key are quarantined rather than failing the merge.
+        valid_static, static_quarantine = KEY_SCHEMA.validate(static_data)
+        real_time_data, feed_quarantine = KEY_SCHEMA.validate(real_time_data)
+        self.quarantine = pd.concat([static_quarantine.assign(source='static'),
+                                     feed_quarantine.assign(source='availability')])
+        count('merge.quarantine', rows=len(self.quarantine))
+        if valid_static.empty and not static_data.empty:
             raise ValueError("Invalid format in merge key 'car_park_no'.")
 
-        merged_data = pd.merge(static_data, real_time_data, on='car_park_no', how='left')
+        merged_data = pd.merge(valid_static, real_time_data, on='car_park_no', how='left')
         merged_data.fillna({'lots_available': 0}, inplace=True)
-        return merged_data
+        count('merge', rows=len(merged_data))
+        return compact_frame(merged_data) if self.compact else merged_data
+
+    @timed('merge.incremental')
+    def merge_incremental(self, static_data, real_time_data):
+        """ Merge a new availability snapshot by writing only changed rows into a spare merged frame.
+
+        Returns the merged frame and the car park numbers whose availability changed. Two frames are
+        written in turn, so the frame returned by the previous call is never written and readers that
+        let go of a frame before the next refresh see one consistent snapshot. The first call, a new
+        static frame, or a change in which car parks and lot types the feed lists (or their order)
+        falls back to a full merge.
+        """
+        keys = snapshot_keys(real_time_data)
+        previous = self._previous
+        # Feeds list car parks in a stable order, so snapshots normally compare row by row.
+        if (self._snapshot_rows is None or static_data is not self._static_data
+                or list(real_time_data.columns) != list(previous.columns)
+                or len(real_time_data) != len(previous)
+                or not all(np.array_equal(real_time_data[k].to_numpy(), previous[k].to_numpy()) for k in keys)):
+            return self._full_merge(static_data, real_time_data, keys)
+
+        changed = changed_rows(previous, real_time_data)
+        rows = self._snapshot_rows[changed]
+        # Car parks missing from the static data have no merged row (-1) to update.
+        updates = real_time_data[changed][rows >= 0].fillna({'lots_available': 0})
+        rows = rows[rows >= 0]
+        columns = real_time_data.columns.difference(keys)
+        if self._spare is None:
+            # Only the first refresh after a full merge copies the whole frame.
+            merged = self._merged.copy()
+        else:
+            # The spare frame is one refresh behind: catch it up with the rows the previous call wrote.
+            merged = self._spare
+            for column in columns:
+                merged.iloc[self._written_rows, merged.columns.get_loc(column)] = (
+                    self._merged[column].to_numpy()[self._written_rows])
+        for column in columns:
+            merged.iloc[rows, merged.columns.get_loc(column)] = updates[column].to_numpy()
+        # The feed timestamp moves on every poll, even for car parks that did not change.
+        if 'feed_timestamp' in real_time_data.columns and len(real_time_data):
+            reported = self._snapshot_rows[self._snapshot_rows >= 0]
+            merged.iloc[reported, merged.columns.get_loc('feed_timestamp')] = real_time_data['feed_timestamp'].iloc[0]
+        self._spare, self._merged = self._merged, merged
+        self._written_rows = rows
+        self._previous = real_time_data.copy()
+        return merged, pd.Index(updates['car_park_no'].unique())
+
+    def _full_merge(self, static_data, real_time_data, keys):
+        merged_data = self.merge_data(static_data, real_time_data)
+        self._static_data = static_data
+        self._previous = real_time_data.copy()
+        self._merged = merged_data
+        self._spare = None
+        # Map every snapshot row to the merged row that holds it.
+        reported = merged_data[keys[-1]].notna().to_numpy() if len(keys) > 1 else np.ones(len(merged_data), dtype=bool)
+        merged_keys = pd.MultiIndex.from_frame(merged_data.loc[reported, keys])
+        if merged_keys.is_unique:
+            found = merged_keys.get_indexer(pd.MultiIndex.from_frame(real_time_data[keys]))
+            self._snapshot_rows = np.where(found >= 0, np.flatnonzero(reported)[found], -1)
+        else:
+            self._snapshot_rows = None
+        return merged_data, pd.Index(real_time_data['car_park_no'].unique())
 
     def validate_data(self, df):
         essential_columns = {'car_park_no', 'address', 'total_lots', 'lots_available'}
@@ -0,0 +1,207 @@
+from itertools import repeat
+
+SEPARATOR = "-------------------------------------------------"
+CHUNK_ROWS = 1_000
+FORMATS = ('text', 'json', 'ndjson', 'csv', 'table')
+
+# Text layouts as (template, columns) pairs; absent optional columns render as N/A.
+DETAIL_LINES = (
+    ("Car Park Details:", ()),
+    ("Car Park No: {}", ('car_park_no',)),
+    ("Address: {}", ('address',)),
+    ("Operating Hours: {}", ('operating_hours',)),
+    ("Rules: {}", ('rules',)),
+    ("Parking System: {}", ('type_of_parking_system',)),
+    ("Capacity: Total lots: {}, Lots available: {}", ('total_lots', 'lots_available')),
+    ("Coordinates: (x: {}, y: {})", ('x_coord', 'y_coord')),
+    ("Update Time: {}", ('update_datetime',)),
+    ("Feed Timestamp: {}", ('feed_timestamp',)),
+)
+CAPACITY_LINES = (
+    ("Capacity ({}): Total lots: {}, Lots available: {}", ('lot_type', 'total_lots', 'lots_available')),
+)
+LAST_UPDATE_LINES = (("Last Update Time: {}", ('update_datetime',)),)
+DISTANCE_LINES = DETAIL_LINES + (("Distance: {:.0f} m", ('distance',)),)
+DETAIL_REQUIRED = ('car_park_no', 'address')
+
+
+def render_lines(lines, record, required=DETAIL_REQUIRED):
+    """ The text lines of one record held as a plain dict, in the same layout as TextFormatter. """
+    return [template.format(*(record[name] if name in record or name in required else 'N/A' for name in names))
+            for template, names in lines]
+
+
+class Formatter:
+    """ Renders frames chunk by chunk; begin and end wrap the whole output. """
+
+    def __init__(self, columns=None):
+        self.columns = columns
+
+    def _select(self, frame):
+        if self.columns is None:
+            return frame
+        return frame[[column for column in self.columns if column in frame.columns]]
+
+    def begin(self):
+        return ""
+
+    def rows(self, frame):
+        raise NotImplementedError
+
+    def end(self):
+        return ""
+
+
+class TextFormatter(Formatter):
+    """ Labelled lines per row, built column by column from the frame's arrays. """
+
+    def __init__(self, lines=DETAIL_LINES, required=DETAIL_REQUIRED, separator=False):
+        super().__init__()
+        self.lines = lines
+        self.required = required
+        self.separator = separator
+
+    def _values(self, frame, column):
+        if column in frame.columns or column in self.required:
+            return frame[column].tolist()
+        return repeat('N/A', len(frame))
+
+    def blocks(self, frame):
+        """ The rendered lines of every row, one newline-terminated string per row. """
+        columns = {column: self._values(frame, column) for _, names in self.lines for column in names}
+        rendered = [
+            [template.format(*values) for values in zip(*(columns[name] for name in names))]
+            if names else repeat(template, len(frame))
+            for template, names in self.lines
+        ]
+        if self.separator:
+            rendered.append(repeat(SEPARATOR, len(frame)))
+        return ["\n".join(block) + "\n" for block in zip(*rendered)]
+
+    def rows(self, frame):
+        return "".join(self.blocks(frame))
+
+
+class NDJSONFormatter(Formatter):
+    def rows(self, frame):
+        if frame.empty:
+            return ""
+        text = self._select(frame).to_json(orient='records', lines=True, date_format='iso')
+        return text if text.endswith("\n") else text + "\n"
+
+
+class JSONFormatter(NDJSONFormatter):
+    """ One JSON array; each record is held back until the next one shows whether it needs a comma. """
+
+    def __init__(self, columns=None):
+        super().__init__(columns)
+        self._pending = None
+
+    def begin(self):
+        return "[\n"
+
+    def rows(self, frame):
+        records = super().rows(frame).splitlines()
+        if not records:
+            return ""
+        if self._pending is not None:
+            records.insert(0, self._pending)
+        self._pending = records.pop()
+        return "".join(f"{record},\n" for record in records)
+
+    def end(self):
+        pending, self._pending = self._pending, None
+        return ("" if pending is None else pending + "\n") + "]\n"
+
+
+class CSVFormatter(Formatter):
+    def __init__(self, columns=None):
+        super().__init__(columns)
+        self._header = True
+
+    def rows(self, frame):
+        if frame.empty and not self._header:
+            return ""
+        text = self._select(frame).to_csv(index=False, header=self._header)
+        self._header = False
+        return text
+
+
+class TableFormatter(Formatter):
+    """ Fixed-width columns sized from the first chunk. """
+
+    def __init__(self, columns=None):
+        super().__init__(columns)
+        self._widths = None
+
+    def rows(self, frame):
+        frame = self._select(frame)
+        cells = {column: frame[column].astype(str).tolist() for column in frame.columns}
+        lines = []
+        if self._widths is None:
+            self._widths = [max([len(str(column))] + [len(cell) for cell in cells[column]]) for column in frame.columns]
+            lines.append("  ".join(str(column).ljust(width) for column, width in zip(frame.columns, self._widths)).rstrip())
+            lines.append("  ".join("-" * width for width in self._widths))
+        for row in zip(*cells.values()):
+            lines.append("  ".join(cell.ljust(width) for cell, width in zip(row, self._widths)).rstrip())
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def formatter_for(output_format, columns=None, **text_options):
+    """ The formatter for an output format name; text_options configure the text layout. """
+    if output_format == 'text':
+        return TextFormatter(**text_options)
+    formatters = {'json': JSONFormatter, 'ndjson': NDJSONFormatter, 'csv': CSVFormatter, 'table': TableFormatter}
+    if output_format not in formatters:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return formatters[output_format](columns)
+
+
+class OutputWriter:
+    """ Collects rendered text and prints it in large pieces instead of line by line. """
+
+    def __init__(self, flush_size=1 << 16):
+        self.flush_size = flush_size
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        if text:
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size >= self.flush_size:
+                self.flush()
+
+    def flush(self):
+        text = "".join(self._parts)
+        self._parts, self._size = [], 0
+        if text.endswith("\n"):
+            print(text[:-1])
+        elif text:
+            print(text, end="")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+def paginate(positions, offset=0, limit=None):
+    """ The slice of result positions for one page, taken before any rows are materialized. """
+    offset = offset or 0
+    return positions[offset:None if limit is None else offset + limit]
+
+
+def take_chunks(data, positions, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(positions), chunk_rows):
+        yield data.take(positions[start:start + chunk_rows])
+
+
+def write_frames(frames, formatter):
+    """ Render frames through a formatter into one buffered writer. """
+    with OutputWriter() as writer:
+        writer.write(formatter.begin())
+        for frame in frames:
+            writer.write(formatter.rows(frame))
+        writer.write(formatter.end())
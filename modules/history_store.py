@@ -0,0 +1,270 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from .availability_cache import FileLock
+
+LOCAL_TIMEZONE = 'Asia/Singapore'
+SEGMENT_VERSION = 1
+HISTORY_COLUMNS = ('car_park_no', 'lot_type', 'lots_available', 'total_lots', 'update_time', 'feed_time')
+ENCODED_FIELDS = (
+    'carparks', 'carpark_codes', 'lot_types', 'lot_type_codes', 'time_base', 'time_delta',
+    'update_lag', 'lots_available', 'total_lots',
+)
+
+
+def _epoch_seconds(values):
+    """ Timestamps as int64 epoch seconds; naive values are read as Singapore local time. """
+    times = pd.to_datetime(pd.Series(values), errors='coerce')
+    if times.dt.tz is None:
+        times = times.dt.tz_localize(LOCAL_TIMEZONE)
+    return times.dt.tz_convert('UTC').to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _from_epoch_seconds(values):
+    return pd.to_datetime(values.astype(np.int64), unit='s', utc=True).dt.tz_convert(LOCAL_TIMEZONE)
+
+
+def _count_dtype(values):
+    return np.uint16 if len(values) == 0 or (values.min() >= 0 and values.max() < 2 ** 16) else np.int32
+
+
+def _row_group_cuts(numbers, group_rows):
+    """ Positions splitting sorted car park numbers into groups of about group_rows rows. """
+    cuts, start = [], 0
+    # Groups end on a car park boundary so one car park's rows are rarely split.
+    for boundary in np.flatnonzero(numbers[1:] != numbers[:-1]) + 1:
+        if boundary - start >= group_rows:
+            cuts.append(boundary)
+            start = boundary
+    return cuts
+
+
+def _encode(frame):
+    """ Column arrays for one row group: dictionary-coded keys, narrow counts, delta-coded times. """
+    carparks, carpark_codes = np.unique(frame['car_park_no'].to_numpy(dtype=str), return_inverse=True)
+    lot_types, lot_type_codes = np.unique(frame['lot_type'].to_numpy(dtype=str), return_inverse=True)
+    feed_time = frame['feed_time'].to_numpy(dtype=np.int64)
+    lots_available = frame['lots_available'].to_numpy(dtype=np.int64)
+    total_lots = frame['total_lots'].to_numpy(dtype=np.int64)
+    # Rows run car park by car park, so consecutive feed times mostly differ by one poll interval.
+    return {
+        'carparks': carparks,
+        'carpark_codes': carpark_codes.astype(np.uint16 if len(carparks) < 2 ** 16 else np.uint32),
+        'lot_types': lot_types,
+        'lot_type_codes': lot_type_codes.astype(np.uint8),
+        'time_base': np.array(feed_time[0], dtype=np.int64),
+        'time_delta': np.diff(feed_time, prepend=feed_time[:1]).astype(np.int32),
+        'update_lag': (feed_time - frame['update_time'].to_numpy(dtype=np.int64)).astype(np.int32),
+        'lots_available': lots_available.astype(_count_dtype(lots_available)),
+        'total_lots': total_lots.astype(_count_dtype(total_lots)),
+    }
+
+
+def _decode(arrays, car_park_no=None, lot_type=None, start_time=None, end_time=None):
+    """ Rows of one row group matching the filters; keys are matched on their codes before decoding. """
+    feed_time = int(arrays['time_base']) + np.cumsum(arrays['time_delta'], dtype=np.int64)
+    carparks, carpark_codes = arrays['carparks'], arrays['carpark_codes']
+    lot_types, lot_type_codes = arrays['lot_types'], arrays['lot_type_codes']
+    keep = np.ones(len(feed_time), dtype=bool)
+    for value, values, codes in ((car_park_no, carparks, carpark_codes), (lot_type, lot_types, lot_type_codes)):
+        if value is not None:
+            found = np.flatnonzero(values == value)
+            keep &= (codes == found[0]) if len(found) else False
+    if start_time is not None:
+        keep &= feed_time >= start_time
+    if end_time is not None:
+        keep &= feed_time <= end_time
+    rows = np.flatnonzero(keep)
+    return pd.DataFrame({
+        'car_park_no': carparks[carpark_codes[rows]].astype(object),
+        'lot_type': lot_types[lot_type_codes[rows]].astype(object),
+        'lots_available': arrays['lots_available'][rows].astype(np.int64),
+        'total_lots': arrays['total_lots'][rows].astype(np.int64),
+        'update_time': feed_time[rows] - arrays['update_lag'][rows],
+        'feed_time': feed_time[rows],
+    })
+
+
+def _history_frame(decoded):
+    return pd.DataFrame({
+        'car_park_no': decoded['car_park_no'],
+        'lot_type': decoded['lot_type'],
+        'lots_available': decoded['lots_available'],
+        'total_lots': decoded['total_lots'],
+        'update_datetime': _from_epoch_seconds(decoded['update_time']),
+        'feed_timestamp': _from_epoch_seconds(decoded['feed_time']),
+    })
+
+
+def _overlaps(entry, car_park_no, start_time, end_time):
+    if start_time is not None and entry['max_time'] < start_time:
+        return False
+    if end_time is not None and entry['min_time'] > end_time:
+        return False
+    if car_park_no is not None and 'first' in entry and not entry['first'] <= car_park_no <= entry['last']:
+        return False
+    return True
+
+
+class HistoryStore:
+    """ Append-only availability history kept as compressed columnar segment files.
+
+    Each segment is an .npz file of row groups sorted by car park, lot type and feed time. The
+    manifest records the time and car park range of every segment and row group, so a query
+    only decompresses the row groups it can match.
+    """
+
+    def __init__(self, directory, compact_rows=5_000_000, group_rows=131_072, compact_segments=64):
+        self.directory = directory
+        self.compact_rows = compact_rows
+        # append() compacts once more than this many segments are under compact_rows.
+        self.compact_segments = compact_segments
+        self.group_rows = group_rows
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.lock_path = os.path.join(directory, 'history.lock')
+        os.makedirs(directory, exist_ok=True)
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': SEGMENT_VERSION, 'next_segment': 0, 'last_feed_time': None, 'segments': []}
+
+    def _write_manifest(self, manifest):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _write_segment(self, manifest, frame):
+        name = f"segment-{manifest['next_segment']:08d}.npz"
+        manifest['next_segment'] += 1
+        frame = frame.sort_values(['car_park_no', 'lot_type', 'feed_time'], kind='stable', ignore_index=True)
+        members, groups = {}, []
+        cuts = _row_group_cuts(frame['car_park_no'].to_numpy(), self.group_rows)
+        for number, rows in enumerate(np.split(np.arange(len(frame)), cuts)):
+            part = frame.iloc[rows]
+            for field, values in _encode(part).items():
+                members[f"{field}_{number}"] = values
+            groups.append({
+                'rows': len(part),
+                'first': str(part['car_park_no'].iat[0]),
+                'last': str(part['car_park_no'].iat[-1]),
+                'min_time': int(part['feed_time'].min()),
+                'max_time': int(part['feed_time'].max()),
+            })
+        np.savez_compressed(os.path.join(self.directory, name), **members)
+        return {
+            'file': name,
+            'rows': len(frame),
+            'min_time': min(group['min_time'] for group in groups),
+            'max_time': max(group['max_time'] for group in groups),
+            'groups': groups,
+        }
+
+    @property
+    def segments(self):
+        return self._read_manifest()['segments']
+
+    def _holds(self, manifest, feed_time):
+        """ Whether a stored row group already holds rows with this feed time. """
+        if manifest['last_feed_time'] is None or feed_time > manifest['last_feed_time']:
+            return False
+        for segment in manifest['segments']:
+            if not segment['min_time'] <= feed_time <= segment['max_time']:
+                continue
+            with np.load(os.path.join(self.directory, segment['file'])) as segment_file:
+                for number, group in enumerate(segment['groups']):
+                    if group['min_time'] <= feed_time <= group['max_time']:
+                        times = int(segment_file[f"time_base_{number}"]) + np.cumsum(
+                            segment_file[f"time_delta_{number}"], dtype=np.int64)
+                        if (times == feed_time).any():
+                            return True
+        return False
+
+    def append(self, snapshot):
+        """ Store one availability snapshot as returned by APIFetcher.fetch_data.
+
+        A snapshot whose feed time is already stored is skipped; older ones fill gaps in the history.
+        Each snapshot is written as its own segment, so small segments are compacted once
+        compact_segments of them have built up.
+        """
+        key = 'car_park_no' if 'car_park_no' in snapshot.columns else 'carpark_number'
+        frame = pd.DataFrame({
+            'car_park_no': snapshot[key].to_numpy(),
+            'lot_type': snapshot['lot_type'].to_numpy() if 'lot_type' in snapshot.columns else 'C',
+            'lots_available': pd.to_numeric(snapshot['lots_available'], errors='coerce').to_numpy(),
+            'total_lots': pd.to_numeric(snapshot['total_lots'], errors='coerce').to_numpy(),
+            'update_time': _epoch_seconds(snapshot['update_datetime']),
+            'feed_time': _epoch_seconds(snapshot['feed_timestamp']),
+        }).dropna()
+        if frame.empty:
+            return False
+        with FileLock(self.lock_path):
+            manifest = self._read_manifest()
+            feed_time = int(frame['feed_time'].max())
+            if self._holds(manifest, feed_time):
+                return False
+            manifest['segments'].append(self._write_segment(manifest, frame))
+            manifest['last_feed_time'] = max(feed_time, manifest['last_feed_time'] or feed_time)
+            self._write_manifest(manifest)
+            small = sum(segment['rows'] < self.compact_rows for segment in manifest['segments'])
+        if small > self.compact_segments:
+            self.compact()
+        return True
+
+    def _read_segment(self, segment, car_park_no=None, lot_type=None, start_time=None, end_time=None):
+        parts = []
+        with np.load(os.path.join(self.directory, segment['file'])) as segment_file:
+            for number, group in enumerate(segment['groups']):
+                if _overlaps(group, car_park_no, start_time, end_time):
+                    arrays = {field: segment_file[f"{field}_{number}"] for field in ENCODED_FIELDS}
+                    parts.append(_decode(arrays, car_park_no, lot_type, start_time, end_time))
+        return parts
+
+    def iter_query(self, car_park_no=None, start=None, end=None, lot_type=None):
+        """ Yield the rows query() would return one segment at a time, so memory stays bounded. """
+        start_time = None if start is None else int(_epoch_seconds([start])[0])
+        end_time = None if end is None else int(_epoch_seconds([end])[0])
+        for segment in self.segments:
+            if _overlaps(segment, None, start_time, end_time):
+                parts = self._read_segment(segment, car_park_no, lot_type, start_time, end_time)
+                if parts:
+                    yield _history_frame(pd.concat(parts, ignore_index=True))
+
+    def query(self, car_park_no=None, start=None, end=None, lot_type=None):
+        """ Rows between start and end (inclusive) in feed time order. """
+        empty = pd.DataFrame({column: pd.Series(dtype=object if column in ('car_park_no', 'lot_type') else np.int64)
+                              for column in HISTORY_COLUMNS})
+        result = pd.concat([_history_frame(empty), *self.iter_query(car_park_no, start, end, lot_type)],
+                           ignore_index=True)
+        return result.sort_values(['feed_timestamp', 'car_park_no', 'lot_type'], kind='stable', ignore_index=True)
+
+    def compact(self):
+        """ Merge runs of small segments into segments of up to compact_rows rows; returns how many were merged. """
+        with FileLock(self.lock_path):
+            manifest = self._read_manifest()
+            kept, batch, replaced = [], [], []
+
+            def flush():
+                if len(batch) > 1:
+                    frame = pd.concat([part for segment in batch for part in self._read_segment(segment)],
+                                      ignore_index=True)
+                    kept.append(self._write_segment(manifest, frame))
+                    replaced.extend(batch)
+                else:
+                    kept.extend(batch)
+                batch.clear()
+
+            for segment in manifest['segments']:
+                if batch and sum(s['rows'] for s in batch) + segment['rows'] > self.compact_rows:
+                    flush()
+                batch.append(segment)
+            flush()
+            manifest['segments'] = kept
+            self._write_manifest(manifest)
+        for segment in replaced:
+            os.remove(os.path.join(self.directory, segment['file']))
+        return len(replaced)
@@ -0,0 +1,309 @@
+import functools
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+METRIC_PREFIX = 'carpark_stage'
+SAMPLE_INTERVAL = 0.005
+
+
+def _rss_bytes():
+    """ Current resident set size, or the process's peak where only that is available. """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    return None
+
+
+class StageStats:
+    """ Totals for one pipeline stage across every time it ran. """
+
+    __slots__ = ('calls', 'wall', 'cpu', 'rows', 'bytes', 'peak_rss')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.peak_rss = None
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class _MemorySampler:
+    """ Samples RSS in a background thread and tracks the peak within every open stage. """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._windows = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = _rss_bytes()
+            with self._lock:
+                for window in self._windows:
+                    window[0] = max(window[0], rss)
+
+    def open(self):
+        window = [_rss_bytes()]
+        with self._lock:
+            self._windows.append(window)
+        return window
+
+    def close(self, window):
+        with self._lock:
+            self._windows.remove(window)
+        return max(window[0], _rss_bytes())
+
+    def stop(self):
+        self._stop.set()
+
+
+class _NoStage:
+    """ What stage() returns while instrumentation is off: entering and leaving it does nothing. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class _Stage:
+    __slots__ = ('_instrumentation', '_name', '_window', '_profiler', '_wall', '_cpu')
+
+    def __init__(self, instrumentation, name):
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self):
+        instrumentation = self._instrumentation
+        sampler = instrumentation._sampler
+        self._window = sampler.open() if sampler is not None else None
+        self._profiler = instrumentation._start_profile(self._name)
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall, cpu = time.perf_counter() - self._wall, time.process_time() - self._cpu
+        instrumentation = self._instrumentation
+        if self._profiler is not None:
+            instrumentation._stop_profile(self._profiler)
+        peak = instrumentation._sampler.close(self._window) if self._window is not None else None
+        instrumentation._record(self._name, wall, cpu, peak)
+        return False
+
+
+class Instrumentation:
+    """ Per-stage wall and CPU timers, row and byte counters, and sampled peak memory.
+
+    Off until enable(); while off, stage() hands back a shared do-nothing context and add() returns at once.
+    With profile_dir, each outermost stage also runs under cProfile and dump_profiles() writes one
+    <stage>.prof file per stage.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.profile_dir = None
+        self.started = None
+        self._sampler = None
+        self._profiles = {}
+        self._profiling = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self, memory=False, profile_dir=None):
+        self.enabled = True
+        self.started = time.perf_counter()
+        self.profile_dir = profile_dir
+        if memory and self._sampler is None and _rss_bytes() is not None:
+            self._sampler = _MemorySampler()
+
+    def disable(self):
+        self.enabled = False
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self._profiles = {}
+        self.started = time.perf_counter()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NO_STAGE
+        return _Stage(self, name)
+
+    def add(self, name, rows=0, bytes=0):
+        """ Count rows and bytes handled by a stage. """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.stages.setdefault(name, StageStats())
+            stats.rows += rows
+            stats.bytes += bytes
+
+    def _record(self, name, wall, cpu, peak):
+        with self._lock:
+            stats = self.stages.setdefault(name, StageStats())
+            stats.calls += 1
+            stats.wall += wall
+            stats.cpu += cpu
+            if peak is not None:
+                stats.peak_rss = peak if stats.peak_rss is None else max(stats.peak_rss, peak)
+
+    def _start_profile(self, name):
+        # Only one profiler can be active per thread, so stages nested in a profiled stage are profiled with it.
+        if self.profile_dir is None or getattr(self._profiling, 'active', False):
+            return None
+        import cProfile
+        with self._lock:
+            profiler = self._profiles.setdefault(name, cProfile.Profile())
+        self._profiling.active = True
+        profiler.enable()
+        return profiler
+
+    def _stop_profile(self, profiler):
+        profiler.disable()
+        self._profiling.active = False
+
+    def dump_profiles(self):
+        """ Write the cProfile statistics of each profiled stage; returns the paths written. """
+        if self.profile_dir is None:
+            return []
+        os.makedirs(self.profile_dir, exist_ok=True)
+        paths = []
+        with self._lock:
+            profiles = list(self._profiles.items())
+        for name, profiler in profiles:
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def _snapshot(self):
+        with self._lock:
+            return {name: StageStats.to_dict(stats) for name, stats in self.stages.items()}
+
+    def to_json(self):
+        total = None if self.started is None else time.perf_counter() - self.started
+        return json.dumps({'total_wall': total, 'stages': self._snapshot()}, indent=2)
+
+    def summary(self):
+        """ The stage totals as a printable table. """
+        lines = [f"{'Stage':<20} {'Calls':>6} {'Wall ms':>10} {'CPU ms':>10} {'Rows':>10} {'Bytes':>12} {'Peak RSS MB':>12}"]
+        for name, stats in self._snapshot().items():
+            peak = '' if stats['peak_rss'] is None else f"{stats['peak_rss'] / 1e6:.1f}"
+            lines.append(f"{name:<20} {stats['calls']:>6} {stats['wall'] * 1e3:>10.1f} {stats['cpu'] * 1e3:>10.1f} "
+                         f"{stats['rows']:>10,} {stats['bytes']:>12,} {peak:>12}")
+        if self.started is not None:
+            lines.append(f"{'total':<20} {'':>6} {(time.perf_counter() - self.started) * 1e3:>10.1f}")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """ The stage totals in the Prometheus text exposition format. """
+        metrics = [
+            ('calls_total', 'counter', 'Times each pipeline stage ran.', 'calls'),
+            ('wall_seconds_total', 'counter', 'Wall-clock seconds spent in each stage.', 'wall'),
+            ('cpu_seconds_total', 'counter', 'CPU seconds spent in each stage.', 'cpu'),
+            ('rows_total', 'counter', 'Rows handled by each stage.', 'rows'),
+            ('bytes_total', 'counter', 'Bytes handled by each stage.', 'bytes'),
+            ('peak_rss_bytes', 'gauge', 'Highest resident memory sampled while each stage ran.', 'peak_rss'),
+        ]
+        stages = self._snapshot()
+        lines = []
+        for suffix, kind, description, field in metrics:
+            name = f"{METRIC_PREFIX}_{suffix}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, stats in stages.items():
+                if stats[field] is not None:
+                    lines.append(f'{name}{{stage="{stage}"}} {stats[field]}')
+        return "\n".join(lines) + "\n"
+
+
+instruments = Instrumentation()
+
+
+def stage(name):
+    """ Time a block as one run of a stage of the default instrumentation. """
+    return instruments.stage(name)
+
+
+def count(name, rows=0, bytes=0):
+    instruments.add(name, rows=rows, bytes=bytes)
+
+
+def timed(name):
+    """ Decorator timing every call of a function as a stage of the default instrumentation. """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not instruments.enabled:
+                return function(*args, **kwargs)
+            with instruments.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class MetricsServer:
+    """ Serves the instrumentation's Prometheus text on http://HOST:PORT/metrics from a background thread. """
+
+    def __init__(self, address, instrumentation=instruments):
+        # http.server is imported here rather than at the top, as it would add to every CLI call's startup.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = self.server.instrumentation.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        host, _, port = address.rpartition(':')
+        self._server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.instrumentation = instrumentation
+
+    @property
+    def server_address(self):
+        return self._server.server_address
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, args=(0.1,), daemon=True).start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
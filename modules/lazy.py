@@ -0,0 +1,29 @@
+import importlib
+
+
+class LazyImport:
+    """ Stand-in for a module, or a name in a module, that is only imported on first use. """
+
+    def __init__(self, module, name=None, package=None):
+        self._module = module
+        self._name = name
+        self._package = package
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            module = importlib.import_module(self._module, self._package)
+            self._target = module if self._name is None else getattr(module, self._name)
+        return self._target
+
+    def __getattr__(self, attribute):
+        if attribute.startswith('__') and attribute.endswith('__'):
+            raise AttributeError(attribute)
+        return getattr(self._resolve(), attribute)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        target = self._module if self._name is None else f"{self._module}.{self._name}"
+        return f"<lazy {target}>"
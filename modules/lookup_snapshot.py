@@ -0,0 +1,68 @@
+import json
+import os
+import time
+from .formatters import CAPACITY_LINES, DETAIL_LINES, LAST_UPDATE_LINES
+
+LOOKUP_VERSION = 1
+LOOKUP_COLUMNS = tuple(dict.fromkeys(
+    column for _, names in DETAIL_LINES + CAPACITY_LINES + LAST_UPDATE_LINES for column in names))
+
+
+class LookupSnapshot:
+    """ Merged rows per car park as pre-rendered strings, so single lookups need neither pandas nor the feed. """
+
+    def __init__(self, path, source_path):
+        self.path = path
+        self.source_path = source_path
+        self._payload = None
+
+    def _source_signature(self):
+        stat = os.stat(self.source_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def load(self, now=None):
+        """ The snapshot payload, or None when it is missing, expired or built from another static file. """
+        if self._payload is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                current = self._source_signature()
+            except (OSError, ValueError):
+                return None
+            if payload.get('version') == LOOKUP_VERSION and payload.get('source') == current:
+                self._payload = payload
+        if self._payload is None or (time.time() if now is None else now) >= self._payload['expires_at']:
+            return None
+        return self._payload
+
+    def records(self, carpark_number):
+        """ Rows of one car park as dicts of rendered values, in merged order; empty when unknown. """
+        payload = self.load()
+        columns = payload['columns']
+        return [dict(zip(columns, row)) for row in payload['carparks'].get(carpark_number, ())]
+
+    def write(self, data, expires_at):
+        """ Store the lookup columns of merged data, valid until the epoch time expires_at.
+
+        Pass the expiry of the availability behind data, so the snapshot never outlives it.
+        """
+        columns = [column for column in LOOKUP_COLUMNS if column in data.columns]
+        carparks = {}
+        # str() gives the text that str.format would produce for the same value.
+        values = zip(*([str(value) for value in data[column].tolist()] for column in columns))
+        for number, row in zip(data['car_park_no'].tolist(), values):
+            carparks.setdefault(str(number), []).append(row)
+        payload = {
+            'version': LOOKUP_VERSION,
+            'source': self._source_signature(),
+            'expires_at': expires_at,
+            'columns': columns,
+            'carparks': carparks,
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Each writer has its own temp file, so concurrent cold lookups never replace each other's.
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self._payload = payload
@@ -0,0 +1,157 @@
+import csv
+import datetime
+import functools
+import os
+import re
+import weakref
+import numpy as np
+import pandas as pd
+from .carpark_index import cached_index
+
+# Singapore keeps UTC+8 all year, so schedules are read on a fixed offset.
+LOCAL_TIME = datetime.timezone(datetime.timedelta(hours=8))
+DAYS = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN', 'PH')
+DAY_BITS = {day: 1 << bit for bit, day in enumerate(DAYS)}
+ALL_DAYS = (1 << len(DAYS)) - 1
+DAY_ALIASES = {'MONDAY': 'MON', 'TUES': 'TUE', 'TUESDAY': 'TUE', 'WEDNESDAY': 'WED', 'THUR': 'THU',
+               'THURS': 'THU', 'THURSDAY': 'THU', 'FRIDAY': 'FRI', 'SATURDAY': 'SAT', 'SUNDAY': 'SUN',
+               'PUBLIC HOLIDAY': 'PH', 'PUBLIC HOLIDAYS': 'PH'}
+NEVER = ('NO', 'NIL', 'NONE', '')
+WHOLE_DAY = ('WHOLE DAY', '24 HOURS', '24 HRS')
+
+_CLAUSE = re.compile(r'^(?:(?P<days>.+?)\s+(?:FR|FROM)\s+)?(?P<hours>.+)$')
+_HOURS = re.compile(r'^(?P<start>\d{1,2}(?:[.:]\d{2})?\s*[AP]M)\s*(?:-|TO)\s*(?P<end>\d{1,2}(?:[.:]\d{2})?\s*[AP]M)$')
+_TIME = re.compile(r'^(\d{1,2})(?:[.:](\d{2}))?\s*([AP]M)$')
+
+
+def _minutes(text):
+    hour, minute, half = _TIME.match(text).groups()
+    hour, minute = int(hour), int(minute or 0)
+    if not 1 <= hour <= 12 or minute >= 60:
+        raise ValueError(f"Invalid time of day: {text}")
+    return (hour % 12 + (12 if half == 'PM' else 0)) * 60 + minute
+
+
+def _days(text):
+    mask = 0
+    for part in re.split(r'\s*(?:&|,|\bAND\b)\s*', text):
+        first, _, last = (DAY_ALIASES.get(day.strip(), day.strip()) for day in part.partition('-'))
+        if first not in DAY_BITS or (last and last not in DAY_BITS):
+            raise ValueError(f"Unknown days: {part}")
+        if not last:
+            mask |= DAY_BITS[first]
+            continue
+        if 'PH' in (first, last):
+            raise ValueError(f"Public holidays cannot bound a range of days: {part}")
+        start, end = DAYS.index(first), DAYS.index(last)
+        # Ranges may wrap past Sunday, as in FRI-MON.
+        for day in range(start, start + (end - start) % 7 + 1):
+            mask |= DAY_BITS[DAYS[day % 7]]
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def compile_schedule(text):
+    """ Compile a schedule string into (days bitmask, start minute, end minute) windows.
+
+    Bit i of the days bitmask is DAYS[i]. A window runs from its start minute up to, but not including, its end;
+    one that passes midnight ends after 1440 and carries on into the next day. Raises ValueError for text it
+    cannot read.
+    """
+    text = ' '.join(str(text).upper().split())
+    if text in NEVER:
+        return ()
+    windows = []
+    for clause in text.split(';'):
+        match = _CLAUSE.match(clause.strip())
+        days = _days(match['days']) if match['days'] else ALL_DAYS
+        hours = match['hours']
+        if hours in WHOLE_DAY:
+            windows.append((days, 0, 1440))
+            continue
+        times = _HOURS.match(hours)
+        if times is None:
+            raise ValueError(f"Cannot read the schedule: {text}")
+        start, end = _minutes(times['start']), _minutes(times['end'])
+        windows.append((days, start, end if end > start else end + 1440))
+    return tuple(windows)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_holidays(path, mtime_ns):
+    with open(path, newline='', encoding='utf-8') as f:
+        lines = [line for line in f if line.strip() and not line.lstrip().startswith('#')]
+    if lines and 'date' in lines[0].lower().split(','):
+        dates = [row['date'] for row in csv.DictReader(lines, skipinitialspace=True)]
+    else:
+        dates = [line.split(',')[0] for line in lines]
+    return frozenset(datetime.date.fromisoformat(date.strip()) for date in dates)
+
+
+def load_holidays(path):
+    """ Public holiday dates from a file of ISO dates, one per line, or a CSV with a date column. """
+    return _read_holidays(path, os.stat(path).st_mtime_ns)
+
+
+def local_time(value=None):
+    """ value (a datetime or ISO string, now when None) as a Singapore local time. """
+    if value is None:
+        return datetime.datetime.now(LOCAL_TIME)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value.replace(tzinfo=LOCAL_TIME) if value.tzinfo is None else value.astimezone(LOCAL_TIME)
+
+
+def day_bits(date, holidays=()):
+    return DAY_BITS[DAYS[date.weekday()]] | (DAY_BITS['PH'] if date in holidays else 0)
+
+
+class ScheduleTable:
+    """ The schedules of one column compiled once per distinct string, evaluated for every row at once.
+
+    Rows holding strings that cannot be read never count as active; those strings are listed in unparsed.
+    """
+
+    def __init__(self, data, column):
+        self._data_ref = weakref.ref(data)
+        self.column = column
+        codes, uniques = pd.factorize(data[column].to_numpy(dtype=object))
+        # Unknown strings and missing values share the extra code len(uniques), which is never active.
+        self._codes = np.where(codes >= 0, codes, len(uniques))
+        self.unparsed = []
+        windows = []
+        for code, text in enumerate(uniques):
+            try:
+                windows.extend((code, *window) for window in compile_schedule(text))
+            except ValueError:
+                self.unparsed.append(text)
+        windows = np.array(windows, dtype=np.int64).reshape(-1, 4)
+        self._schedule, self._days, self._start, self._end = windows.T
+        self._schedules = len(uniques) + 1
+
+    @property
+    def data(self):
+        data = self._data_ref()
+        if data is None:
+            raise ReferenceError("The indexed data frame no longer exists.")
+        return data
+
+    def active_schedules(self, at=None, holidays=()):
+        """ Whether each distinct schedule is active at a time, with one slot at the end for unread rows. """
+        at = local_time(at)
+        minute = at.hour * 60 + at.minute
+        today = day_bits(at.date(), holidays)
+        yesterday = day_bits(at.date() - datetime.timedelta(days=1), holidays)
+        hit = (((self._days & today) != 0) & (self._start <= minute) & (minute < self._end)
+               | ((self._days & yesterday) != 0) & (minute + 1440 < self._end))
+        active = np.zeros(self._schedules, dtype=bool)
+        active[self._schedule[hit]] = True
+        return active
+
+    def active(self, at=None, holidays=()):
+        """ Boolean row mask of the rows whose schedule is active at a time (now when None). """
+        return self.active_schedules(at, holidays)[self._codes]
+
+
+def schedule_table_for(data, column):
+    return cached_index(data, ScheduleTable, column)
@@ -0,0 +1,135 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+def _parse_numbers(values):
+    """ Parse a column to a numeric array in one C-level pass, coercing per value only when some are malformed. """
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biuf':
+        return values.to_numpy()
+    if values.dtype == object:
+        try:
+            joined = " ".join(values.tolist())
+        except TypeError:
+            joined = ""
+        # Only unsigned integers with no spaces of their own parse straight through.
+        if joined.count(" ") == len(values) - 1 and joined.replace(" ", "").isdigit():
+            parsed = np.fromstring(joined, dtype=np.int64, sep=" ")
+            if len(parsed) == len(values):
+                return parsed
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+class Column:
+    """ Rules for one column: its kind ('text', 'integer' or 'number'), whether it may be missing, an inclusive
+    range for numbers and a pattern text must match in full.
+    """
+
+    def __init__(self, kind='text', nullable=True, min=None, max=None, pattern=None):
+        self.kind = kind
+        self.nullable = nullable
+        self.min = min
+        self.max = max
+        self.pattern = pattern
+
+    def check(self, values):
+        """ The column cast to its kind (None for text, which is kept as it is), and (problem, mask) pairs for the
+        rows breaking a rule.
+        """
+        if self.kind == 'text':
+            return None, self._check_text(values)
+        parsed = _parse_numbers(values)
+        failures = []
+        if parsed.dtype.kind == 'f':
+            missing = values.isna().to_numpy()
+            blank = np.isnan(parsed)
+            failures.append(('not a number', blank & ~missing))
+            if self.kind == 'integer':
+                failures.append(('not an integer', (parsed % 1 != 0) & ~blank))
+            if not self.nullable:
+                failures.append(('missing', missing))
+        with np.errstate(invalid='ignore'):
+            if self.min is not None:
+                failures.append((f'below {self.min}', parsed < self.min))
+            if self.max is not None:
+                failures.append((f'above {self.max}', parsed > self.max))
+        return parsed, failures
+
+    def _check_text(self, values):
+        # Fast path: every value is a string and nothing else needs checking.
+        if self.pattern is None and pd.api.types.infer_dtype(values, skipna=self.nullable) == 'string' \
+                and (self.nullable or not (values.to_numpy() == '').any()):
+            return []
+        # Checked once per distinct value, as text columns repeat heavily.
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype=object)
+        text = uniques.map(type).to_numpy() == str
+        failures = [('not text', np.append(~text, False)[codes])]
+        if not self.nullable:
+            empty = np.append((uniques == '').to_numpy(), True)
+            failures.append(('missing', empty[codes]))
+        if self.pattern is not None and not _all_match(self.pattern, uniques[text].tolist()):
+            matches = uniques[text].str.fullmatch(self.pattern).reindex(uniques.index, fill_value=True)
+            failures.append((f'does not match {self.pattern}', np.append(~matches.to_numpy(dtype=bool), False)[codes]))
+        return failures
+
+
+def _all_match(pattern, values):
+    """ Whether every value matches pattern in full, tried with one regex over all of them joined by newlines. """
+    if not values:
+        return True
+    joined = "\n".join(values)
+    if joined.count("\n") != len(values) - 1:
+        return False
+    return re.fullmatch(f"(?:{pattern})(?:\n(?:{pattern}))*", joined) is not None
+
+
+class Schema:
+    """ Column rules checked with whole-column operations.
+
+    validate() keeps the rows meeting every rule, cast to their columns' kinds, and quarantines the others with
+    the reasons they failed, so one malformed row costs that row rather than the whole table.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def validate(self, data):
+        """ Split data into valid rows and a quarantine frame of the rest, with a 'reason' column.
+
+        When every row is valid and nothing needs casting, data itself is returned as the valid rows.
+        """
+        reasons = np.full(len(data), '', dtype=object)
+        cast = {}
+        for name, column in self.columns.items():
+            if name not in data.columns:
+                continue
+            values, failures = column.check(data[name])
+            if values is not None:
+                cast[name] = values
+            for problem, mask in failures:
+                rows = np.flatnonzero(mask)
+                if len(rows):
+                    current = reasons[rows]
+                    reasons[rows] = np.where(current == '', '', current + '; ') + f"{name} {problem}"
+        bad = reasons != ''
+        quarantine = data[bad].assign(reason=reasons[bad])
+        if not cast and not bad.any():
+            return data, quarantine
+        valid = data.assign(**cast)
+        if bad.any():
+            valid = valid[~bad].reset_index(drop=True)
+        for name, column in self.columns.items():
+            if name not in cast:
+                continue
+            dtype = np.float64 if column.kind == 'number' or valid[name].isna().any() else np.int64
+            if valid[name].dtype != dtype:
+                valid[name] = valid[name].astype(dtype)
+        return valid, quarantine
+
+
+def reason_counts(quarantine):
+    """ How many quarantined rows failed each reason. """
+    if quarantine.empty:
+        return pd.Series(dtype=np.int64, name='rows')
+    return quarantine['reason'].str.split('; ').explode().value_counts().rename('rows')
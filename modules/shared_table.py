@@ -0,0 +1,193 @@
+import json
+import mmap
+import os
+import struct
+import time
+import numpy as np
+import pandas as pd
+from .instrumentation import count, timed
+
+# requirements.txt pins pandas 1.x, whose internals let one 2-D block per dtype sit straight on the mapping, so
+# the frame starts out consolidated and pandas never copies it to consolidate. pandas 2 deprecates building a
+# DataFrame from a BlockManager, so later versions take the public constructor: still zero-copy when attached,
+# but pandas may later consolidate same-dtype columns into private memory.
+_BLOCK_INTERNALS = int(pd.__version__.split('.')[0]) < 2
+if _BLOCK_INTERNALS:
+    from pandas.core.internals import BlockManager
+    from pandas.core.internals.api import make_block
+
+MAGIC = b'CPTABLE1'
+# Magic, header length, generation and publish time, ahead of the JSON column layout.
+HEADER = struct.Struct('<8sQQd')
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _column_buffers(series):
+    """ The layout entry and the arrays that hold one column.
+
+    Numeric columns are written as they are, nullable integers as values and mask, and every other column
+    dictionary-encoded as categorical codes with its distinct values kept in the layout.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.api.types.CategoricalDtype):
+        values = series.array
+    elif isinstance(dtype, pd.core.arrays.integer.IntegerDtype):
+        return ({'kind': 'masked', 'dtype': dtype.name},
+                [series.to_numpy(dtype=dtype.numpy_dtype, na_value=0), series.isna().to_numpy()])
+    elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return {'kind': 'numpy', 'dtype': dtype.str}, [series.to_numpy()]
+    else:
+        values = pd.Categorical(series)
+    return ({'kind': 'categorical', 'dtype': values.codes.dtype.str, 'categories': values.categories.tolist(),
+             'ordered': bool(values.ordered)}, [values.codes])
+
+
+def _frame_from_blocks(names, rows, blocks):
+    """ A DataFrame over (values, column positions) pairs without copying them; 2-D values hold one row per column. """
+    if _BLOCK_INTERNALS:
+        axes = [pd.Index(names), pd.RangeIndex(rows)]
+        manager = BlockManager([make_block(values, placement=positions, ndim=2) for values, positions in blocks],
+                               axes, verify_integrity=False)
+        return pd.DataFrame(manager)
+    columns = {}
+    for values, positions in blocks:
+        if isinstance(values, np.ndarray) and values.ndim == 2:
+            columns.update(zip(positions, values))
+        else:
+            columns[positions[0]] = values
+    return pd.DataFrame({names[position]: columns[position] for position in range(len(names))},
+                        index=pd.RangeIndex(rows), copy=False)
+
+
+class SharedTable:
+    """ A merged frame published to a memory-mapped file that any number of processes read without copying.
+
+    One process publishes each refresh as a new version of the file, written aside and renamed into place.
+    Readers map the current version read-only and switch to a newer one the next time they ask for the
+    frame; a version they still hold stays mapped until they drop it, so reading takes no locks. On a
+    tmpfs such as /dev/shm the table never touches disk and every reader shares the same pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._frame = None
+        self._identity = None
+        self._generation = None
+
+    def publish(self, data):
+        """ Write data as the next version of the table and make it current. """
+        layout, arrays = self._layout(data)
+        previous = self.read_header()
+        generation = 1 if previous is None else previous[0] + 1
+        # Buffer offsets count from the first aligned byte after the header.
+        offsets, end = [], 0
+        for array in arrays:
+            offsets.append(end)
+            end = _align(end + array.nbytes)
+        layout['offsets'] = offsets
+        header = json.dumps(layout).encode('utf-8')
+        start = _align(HEADER.size + len(header))
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(header), generation, time.time()))
+            f.write(header)
+            for offset, array in zip(offsets, arrays):
+                f.write(b'\0' * (start + offset - f.tell()))
+                f.write(np.ascontiguousarray(array).data)
+        os.replace(tmp_path, self.path)
+        count('publish', rows=len(data), bytes=os.path.getsize(self.path))
+        return generation
+
+    def _layout(self, data):
+        columns, arrays, blocks = [], [], {}
+        for position, name in enumerate(data.columns):
+            entry, buffers = _column_buffers(data.iloc[:, position])
+            entry['name'] = name
+            columns.append(entry)
+            if entry['kind'] == 'numpy':
+                # Same-dtype columns share one 2-D block, as pandas itself would hold them.
+                blocks.setdefault(entry['dtype'], []).append((position, buffers[0]))
+            else:
+                entry['buffers'] = list(range(len(arrays), len(arrays) + len(buffers)))
+                arrays.extend(buffers)
+        layout = {'rows': len(data), 'columns': columns, 'blocks': []}
+        for dtype, members in blocks.items():
+            layout['blocks'].append({'dtype': dtype, 'columns': [position for position, _ in members],
+                                     'buffer': len(arrays)})
+            arrays.append(np.vstack([values for _, values in members]))
+        return layout, arrays
+
+    def read_header(self):
+        """ The current version's generation and publish time, or None before anything is published. """
+        try:
+            with open(self.path, 'rb') as f:
+                magic, _, generation, published_at = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return None
+        return (generation, published_at) if magic == MAGIC else None
+
+    def age(self, now=None):
+        """ Seconds since the current version was published, or None before anything is published. """
+        header = self.read_header()
+        return None if header is None else (time.time() if now is None else now) - header[1]
+
+    @property
+    def generation(self):
+        """ The generation of the frame last returned by frame(). """
+        return self._generation
+
+    def frame(self):
+        """ The current version as a read-only DataFrame over the mapped file, or None before anything is published.
+
+        The same frame is returned until a newer version is published.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if (stat.st_dev, stat.st_ino) != self._identity:
+            self._attach()
+        return self._frame
+
+    @timed('attach')
+    def _attach(self):
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length, generation, _ = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a shared car park table.")
+        layout = json.loads(bytes(mapped[HEADER.size:HEADER.size + length]))
+        rows, start = layout['rows'], _align(HEADER.size + length)
+        offsets = [start + offset for offset in layout['offsets']]
+
+        def buffer(index, dtype, shape=None):
+            dtype = np.dtype(dtype)
+            size = rows if shape is None else shape[0] * shape[1]
+            values = np.frombuffer(mapped, dtype=dtype, count=size, offset=offsets[index])
+            return values if shape is None else values.reshape(shape)
+
+        blocks = [(buffer(block['buffer'], block['dtype'], (len(block['columns']), rows)), block['columns'])
+                  for block in layout['blocks']]
+        for position, column in enumerate(layout['columns']):
+            if column['kind'] == 'masked':
+                data, mask = column['buffers']
+                values = pd.arrays.IntegerArray(buffer(data, pd.api.types.pandas_dtype(column['dtype']).numpy_dtype),
+                                                buffer(mask, bool))
+            elif column['kind'] == 'categorical':
+                dtype = pd.CategoricalDtype(column['categories'], ordered=column['ordered'])
+                values = pd.Categorical.from_codes(buffer(column['buffers'][0], column['dtype']), dtype=dtype)
+            else:
+                continue
+            blocks.append((values, [position]))
+        self._frame = _frame_from_blocks([column['name'] for column in layout['columns']], rows, blocks)
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._generation = generation
+        count('attach', rows=rows, bytes=stat.st_size)
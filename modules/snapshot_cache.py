@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from .availability_cache import FileLock
+
+# Bump whenever cleaning, parsing or validation changes the cleaned frame's columns, dtypes or values,
+# so snapshots written by older code are rebuilt instead of served.
+SNAPSHOT_VERSION = 2
+
+
+class SnapshotCache:
+    """ On-disk columnar snapshot of a cleaned frame, keyed on its source file. """
+
+    def __init__(self, cache_dir, source_path):
+        self.cache_dir = cache_dir
+        self.source_path = source_path
+        name = os.path.basename(source_path)
+        self.snapshot_dir = os.path.join(cache_dir, f"{name}.snapshot")
+        self.lock_path = os.path.join(cache_dir, f"{name}.snapshot.lock")
+        self.meta_path = os.path.join(self.snapshot_dir, "meta.json")
+        self.quarantine_path = os.path.join(self.snapshot_dir, "quarantine.pkl")
+
+    def source_signature(self, with_hash=True):
+        stat = os.stat(self.source_path)
+        signature = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        if with_hash:
+            signature["sha256"] = self._hash_source()
+        return signature
+
+    def _hash_source(self):
+        digest = hashlib.sha256()
+        with open(self.source_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != SNAPSHOT_VERSION:
+            return None
+        return meta
+
+    def is_valid(self):
+        """ Check the snapshot against the source file's mtime, size and content hash. """
+        meta = self._read_meta()
+        if meta is None:
+            return False
+        try:
+            current = self.source_signature(with_hash=False)
+        except OSError:
+            return False
+        cached = meta["source"]
+        if current["mtime_ns"] == cached["mtime_ns"] and current["size"] == cached["size"]:
+            return True
+        if current["size"] != cached["size"] or self._hash_source() != cached["sha256"]:
+            return False
+        # Touched but unchanged: refresh the stored mtime so later checks skip the hash.
+        meta["source"]["mtime_ns"] = current["mtime_ns"]
+        try:
+            self._write_meta(meta, self.snapshot_dir)
+        except OSError:
+            pass
+        return True
+
+    def load(self):
+        """ Return the cached frame, or None when the snapshot is missing or stale. """
+        if not self.is_valid():
+            return None
+        meta = self._read_meta()
+        if meta is None:
+            return None
+        columns = {}
+        try:
+            for i, column in enumerate(meta["columns"]):
+                values = np.load(os.path.join(self.snapshot_dir, f"{i}.npy"), mmap_mode="r")
+                if column["kind"] == "object":
+                    mask = np.load(os.path.join(self.snapshot_dir, f"{i}.mask.npy"))
+                    values = values.astype(object)
+                    values[mask] = pd.NA
+                columns[column["name"]] = values
+        except (OSError, ValueError):
+            # Another process swapped the snapshot while it was read.
+            return None
+        return pd.DataFrame(columns, index=pd.RangeIndex(meta["rows"]))
+
+    def load_quarantine(self):
+        """ The rows quarantined while building the snapshot, or None when it has none stored. """
+        try:
+            return pd.read_pickle(self.quarantine_path)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def save(self, data, quarantine=None):
+        """ Write the frame as one .npy file per column, and its quarantined rows, replacing any previous snapshot.
+
+        Each process writes into its own temporary directory and swaps it in under a file lock, so concurrent
+        cold loads never share files. Returns whether the snapshot was written; a failed write is only a miss.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(self.snapshot_dir) + ".", suffix=".tmp",
+                                       dir=self.cache_dir)
+        except OSError:
+            return False
+        try:
+            self._write_columns(data, quarantine, tmp_dir)
+            old_dir = tmp_dir + ".old"
+            with FileLock(self.lock_path):
+                if os.path.isdir(self.snapshot_dir):
+                    os.replace(self.snapshot_dir, old_dir)
+                os.replace(tmp_dir, self.snapshot_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            return True
+        except OSError:
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _write_columns(self, data, quarantine, directory):
+        columns = []
+        for i, name in enumerate(data.columns):
+            series = data[name]
+            if series.dtype == object:
+                mask = series.isna().to_numpy()
+                values = np.where(mask, "", series.to_numpy()).astype(str)
+                np.save(os.path.join(directory, f"{i}.mask.npy"), mask)
+                kind = "object"
+            else:
+                values = series.to_numpy()
+                kind = "numeric"
+            np.save(os.path.join(directory, f"{i}.npy"), values)
+            columns.append({"name": name, "kind": kind, "dtype": str(series.dtype)})
+        if quarantine is not None:
+            quarantine.to_pickle(os.path.join(directory, "quarantine.pkl"))
+
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "source": self.source_signature(),
+            "rows": len(data),
+            "columns": columns,
+        }
+        self._write_meta(meta, directory)
+
+    def invalidate(self):
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+
+    def _write_meta(self, meta, directory):
+        path = os.path.join(directory, "meta.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
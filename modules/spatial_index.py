@@ -0,0 +1,140 @@
+import weakref
+import numpy as np
+from .carpark_index import cached_index
+
+# SVY21 is a Transverse Mercator projection on the WGS84 ellipsoid.
+_A = 6378137.0
+_F = 1 / 298.257223563
+_E2 = 2 * _F - _F * _F
+_ORIGIN_LAT = np.radians(1.366666)
+_ORIGIN_LON = np.radians(103.833333)
+_FALSE_NORTHING = 38744.572
+_FALSE_EASTING = 28001.642
+_K = 1.0
+
+
+def _meridian_distance(lat):
+    e4 = _E2 * _E2
+    e6 = e4 * _E2
+    a0 = 1 - _E2 / 4 - 3 * e4 / 64 - 5 * e6 / 256
+    a2 = 3 / 8 * (_E2 + e4 / 4 + 15 * e6 / 128)
+    a4 = 15 / 256 * (e4 + 3 * e6 / 4)
+    a6 = 35 * e6 / 3072
+    return _A * (a0 * lat - a2 * np.sin(2 * lat) + a4 * np.sin(4 * lat) - a6 * np.sin(6 * lat))
+
+
+def wgs84_to_svy21(lat, lon):
+    """ Convert WGS84 latitude/longitude in degrees to SVY21 (x, y) metres; accepts arrays. """
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    t = np.tan(lat)
+    t2, t4, t6 = t ** 2, t ** 4, t ** 6
+    nu = _A / np.sqrt(1 - _E2 * sin_lat ** 2)
+    rho = _A * (1 - _E2) / (1 - _E2 * sin_lat ** 2) ** 1.5
+    psi = nu / rho
+    w = lon - _ORIGIN_LON
+
+    n1 = w ** 2 / 2 * nu * sin_lat * cos_lat
+    n2 = w ** 4 / 24 * nu * sin_lat * cos_lat ** 3 * (4 * psi ** 2 + psi - t2)
+    n3 = w ** 6 / 720 * nu * sin_lat * cos_lat ** 5 * (
+        8 * psi ** 4 * (11 - 24 * t2) - 28 * psi ** 3 * (1 - 6 * t2) + psi ** 2 * (1 - 32 * t2) - 2 * psi * t2 + t4)
+    n4 = w ** 8 / 40320 * nu * sin_lat * cos_lat ** 7 * (1385 - 3111 * t2 + 543 * t4 - t6)
+    y = _FALSE_NORTHING + _K * (_meridian_distance(lat) - _meridian_distance(_ORIGIN_LAT) + n1 + n2 + n3 + n4)
+
+    e1 = w ** 2 / 6 * cos_lat ** 2 * (psi - t2)
+    e2 = w ** 4 / 120 * cos_lat ** 4 * (4 * psi ** 3 * (1 - 6 * t2) + psi ** 2 * (1 + 8 * t2) - 2 * psi * t2 + t4)
+    e3 = w ** 6 / 5040 * cos_lat ** 6 * (61 - 479 * t2 + 179 * t4 - t6)
+    x = _FALSE_EASTING + _K * nu * w * cos_lat * (1 + e1 + e2 + e3)
+    return x, y
+
+
+class GridIndex:
+    """ Uniform grid over SVY21 coordinates for nearest-neighbour and radius queries. """
+
+    def __init__(self, data, x_column='x_coord', y_column='y_coord', cell_size=500.0):
+        self._data_ref = weakref.ref(data)
+        self.cell_size = cell_size
+        self.x = data[x_column].to_numpy(dtype=float, na_value=np.nan)
+        self.y = data[y_column].to_numpy(dtype=float, na_value=np.nan)
+        rows = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        if len(rows):
+            self.x0, self.y0 = self.x[rows].min(), self.y[rows].min()
+        else:
+            self.x0 = self.y0 = 0.0
+        cx, cy = self._cell(self.x[rows], self.y[rows])
+        self.nx = int(cx.max()) + 1 if len(rows) else 1
+        self.ny = int(cy.max()) + 1 if len(rows) else 1
+        cell_ids = cy * self.nx + cx
+        order = np.argsort(cell_ids, kind='stable')
+        self._rows = rows[order]
+        self._cell_starts = np.searchsorted(cell_ids[order], np.arange(self.nx * self.ny + 1))
+
+    @property
+    def data(self):
+        data = self._data_ref()
+        if data is None:
+            raise ReferenceError("The indexed data frame no longer exists.")
+        return data
+
+    def _cell(self, x, y):
+        cx = np.floor((x - self.x0) / self.cell_size).astype(np.int64)
+        cy = np.floor((y - self.y0) / self.cell_size).astype(np.int64)
+        return cx, cy
+
+    def _ring_rows(self, cx, cy, r):
+        """ Rows in cells at Chebyshev distance r from (cx, cy), clipped to the grid. """
+        if r == 0:
+            xs, ys = np.array([cx]), np.array([cy])
+        else:
+            side = np.arange(-r, r + 1)
+            xs = np.concatenate([side, side, np.full(2 * r - 1, -r), np.full(2 * r - 1, r)]) + cx
+            ys = np.concatenate([np.full(2 * r + 1, -r), np.full(2 * r + 1, r), side[1:-1], side[1:-1]]) + cy
+        inside = (xs >= 0) & (xs < self.nx) & (ys >= 0) & (ys < self.ny)
+        cells = ys[inside] * self.nx + xs[inside]
+        starts, ends = self._cell_starts[cells], self._cell_starts[cells + 1]
+        if not len(cells) or not (ends - starts).any():
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([self._rows[s:e] for s, e in zip(starts, ends)])
+
+    def nearest(self, x, y, k=5, radius=None, mask=None):
+        """ Row positions and distances of the k nearest points, optionally within radius and mask. """
+        # Off the grid, rings start from the nearest edge cell; off_x/off_y are the query's distance to the grid.
+        cx, cy = (int(c) for c in self._cell(np.float64(x), np.float64(y)))
+        cx, cy = min(max(cx, 0), self.nx - 1), min(max(cy, 0), self.ny - 1)
+        off_x = max(self.x0 - x, x - (self.x0 + self.nx * self.cell_size), 0.0)
+        off_y = max(self.y0 - y, y - (self.y0 + self.ny * self.cell_size), 0.0)
+        max_ring = max(cx, self.nx - 1 - cx, cy, self.ny - 1 - cy, 0)
+        if radius is not None:
+            max_ring = min(max_ring, int(np.ceil(radius / self.cell_size)) + 1)
+        found = []
+        count = 0
+        kth = np.inf if radius is None else radius
+        for r in range(max_ring + 1):
+            rows = self._ring_rows(cx, cy, r)
+            if mask is not None and len(rows):
+                rows = rows[mask[rows]]
+            if len(rows):
+                distances = np.hypot(self.x[rows] - x, self.y[rows] - y)
+                if radius is not None:
+                    keep = distances <= radius
+                    rows, distances = rows[keep], distances[keep]
+                found.append((rows, distances))
+                count += len(rows)
+                if k is not None and count >= k:
+                    kth = np.partition(np.concatenate([d for _, d in found]), k - 1)[k - 1]
+            # Points outside rings 0..r are r cell widths further along x or y than the grid edge.
+            reach = r * self.cell_size
+            if kth <= min(np.hypot(reach + off_x, off_y), np.hypot(off_x, reach + off_y)):
+                break
+        if not found:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        rows = np.concatenate([rows for rows, _ in found])
+        distances = np.concatenate([d for _, d in found])
+        order = np.argsort(distances, kind='stable')[:k]
+        return rows[order], distances[order]
+
+
+def spatial_index_for(data, cell_size=500.0):
+    return cached_index(data, GridIndex, 'x_coord', 'y_coord', cell_size)
@@ -0,0 +1,234 @@
+import contextlib
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from .address_index import normalize_tokens, prefix_forms
+
+SCHEMA_VERSION = 1
+STATIC_COLUMNS = ('car_park_no', 'address', 'x_coord', 'y_coord', 'car_park_type', 'type_of_parking_system',
+                  'short_term_parking', 'free_parking', 'night_parking', 'car_park_decks', 'gantry_height',
+                  'car_park_basement')
+AVAILABILITY_COLUMNS = ('update_datetime', 'total_lots', 'lot_type', 'lots_available', 'feed_timestamp')
+NEAREST_START_RADIUS = 500.0
+# A refresh claimed longer ago than this is taken to have died with its process.
+REFRESH_CLAIM_TIMEOUT = 120.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS carparks (
+    id INTEGER PRIMARY KEY,
+    car_park_no TEXT NOT NULL UNIQUE,
+    address TEXT, x_coord REAL, y_coord REAL, car_park_type TEXT, type_of_parking_system TEXT,
+    short_term_parking TEXT, free_parking TEXT, night_parking TEXT, car_park_decks INTEGER,
+    gantry_height REAL, car_park_basement TEXT
+);
+CREATE TABLE IF NOT EXISTS availability (
+    car_park_no TEXT NOT NULL,
+    lot_type TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    update_datetime TEXT, total_lots INTEGER, lots_available INTEGER, feed_timestamp TEXT,
+    PRIMARY KEY (car_park_no, lot_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS availability_position ON availability (car_park_no, position);
+CREATE VIRTUAL TABLE IF NOT EXISTS carpark_search USING fts5(tokens);
+CREATE VIRTUAL TABLE IF NOT EXISTS carpark_location USING rtree(id, min_x, max_x, min_y, max_y);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID;
+"""
+
+# The merged frame's columns: each car park's lot type rows in feed order, and lots_available 0 without a feed row.
+_SELECT = f"""
+SELECT {', '.join(f'c.{column}' for column in STATIC_COLUMNS)}, a.update_datetime, a.total_lots, a.lot_type,
+       COALESCE(a.lots_available, 0) AS lots_available, a.feed_timestamp
+FROM carparks c LEFT JOIN availability a ON a.car_park_no = c.car_park_no
+"""
+# Only each car park's first lot type row, as the address and location listings show it.
+_FIRST_ROW = """
+(a.position IS NULL OR a.position = (SELECT MIN(position) FROM availability WHERE car_park_no = c.car_park_no))
+"""
+
+
+def _values(series):
+    """ Column values as Python objects sqlite3 can bind, with None for missing values. """
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+class SQLiteStore:
+    """ The static catalogue and the latest availability in one SQLite database that many processes can share.
+
+    Car parks are keyed on car_park_no, addresses are searched through an FTS5 index of their normalized tokens,
+    and coordinates through an R-tree. The database runs in WAL mode, so readers keep answering while one
+    process writes a refresh, and refresh() lets only one process fetch when the availability goes stale.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        with self.connect() as connection:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                connection.executescript(SCHEMA + f"PRAGMA user_version = {SCHEMA_VERSION};")
+
+    @contextlib.contextmanager
+    def connect(self):
+        # Autocommit mode; writes open their own transactions.
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            yield connection
+        finally:
+            connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self, connection):
+        # IMMEDIATE takes the write lock up front, so a second writer waits rather than failing mid-way.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _meta(self, connection, key):
+        row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, connection, key, value):
+        connection.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                           "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, value))
+
+    def catalogue_source(self):
+        """ The source signature stored with the catalogue, or None before one is loaded. """
+        with self.connect() as connection:
+            return self._meta(connection, 'catalogue_source')
+
+    def load_catalogue(self, static_data, source=None):
+        """ Replace the catalogue and its address and location indexes with a cleaned static frame. """
+        rows = list(zip(range(1, len(static_data) + 1), *(_values(static_data[column]) for column in STATIC_COLUMNS)))
+        tokens = [(i, ' '.join(normalize_tokens(address)) if address is not None else '')
+                  for i, address in zip(range(1, len(rows) + 1), _values(static_data['address']))]
+        x = static_data['x_coord'].to_numpy(dtype=float, na_value=np.nan)
+        y = static_data['y_coord'].to_numpy(dtype=float, na_value=np.nan)
+        located = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        boxes = [(int(i) + 1, x[i], x[i], y[i], y[i]) for i in located]
+        with self.connect() as connection, self._transaction(connection):
+            for table in ('carparks', 'carpark_search', 'carpark_location'):
+                connection.execute(f"DELETE FROM {table}")
+            connection.executemany(f"INSERT INTO carparks (id, {', '.join(STATIC_COLUMNS)}) "
+                                   f"VALUES ({', '.join('?' * (len(STATIC_COLUMNS) + 1))})", rows)
+            connection.executemany("INSERT INTO carpark_search (rowid, tokens) VALUES (?, ?)", tokens)
+            connection.executemany("INSERT INTO carpark_location VALUES (?, ?, ?, ?, ?)", boxes)
+            self._set_meta(connection, 'catalogue_source', source)
+
+    def _upsert(self, connection, real_time_data, fetched_at):
+        frame = real_time_data.rename(columns={'carpark_number': 'car_park_no'})
+        columns = ('car_park_no', 'lot_type', 'update_datetime', 'total_lots', 'lots_available', 'feed_timestamp')
+        generation = (self._meta(connection, 'availability_generation') or 0) + 1
+        rows = list(zip(*(_values(frame[column]) for column in columns), range(len(frame)),
+                        [generation] * len(frame)))
+        connection.executemany(f"""
+            INSERT INTO availability ({', '.join(columns)}, position, generation)
+            VALUES ({', '.join('?' * (len(columns) + 2))})
+            ON CONFLICT (car_park_no, lot_type) DO UPDATE SET
+                update_datetime = excluded.update_datetime, total_lots = excluded.total_lots,
+                lots_available = excluded.lots_available, feed_timestamp = excluded.feed_timestamp,
+                position = excluded.position, generation = excluded.generation
+        """, rows)
+        # Lot types the new snapshot no longer lists kept an older generation.
+        connection.execute("DELETE FROM availability WHERE generation != ?", (generation,))
+        self._set_meta(connection, 'availability_generation', generation)
+        self._set_meta(connection, 'availability_fetched_at', time.time() if fetched_at is None else fetched_at)
+        connection.execute("DELETE FROM meta WHERE key = 'refreshing_at'")
+
+    def upsert_availability(self, real_time_data, fetched_at=None):
+        """ Bulk upsert an APIFetcher.fetch_data frame as the latest availability. """
+        with self.connect() as connection, self._transaction(connection):
+            self._upsert(connection, real_time_data, fetched_at)
+
+    def age(self, now=None):
+        """ Seconds since the availability was last written, or None when it never was. """
+        with self.connect() as connection:
+            fetched_at = self._meta(connection, 'availability_fetched_at')
+        return None if fetched_at is None else (time.time() if now is None else now) - fetched_at
+
+    def refresh(self, fetch, max_age, now=None):
+        """ Upsert fetch()'s frame when the availability is older than max_age seconds; returns whether it fetched.
+
+        A short write transaction checks the staleness and claims the refresh with a refreshing_at row, so of
+        several processes finding the store stale at once, only the first fetches and the others answer from the
+        data already stored. The fetch runs outside any transaction, and the upsert takes a second one, so the
+        write lock is never held across the network call. A failed fetch releases the claim and raises.
+        """
+        current = time.time() if now is None else now
+        with self.connect() as connection:
+            with self._transaction(connection):
+                fetched_at = self._meta(connection, 'availability_fetched_at')
+                if fetched_at is not None and current - fetched_at < max_age:
+                    return False
+                claimed_at = self._meta(connection, 'refreshing_at')
+                if claimed_at is not None and current - claimed_at < REFRESH_CLAIM_TIMEOUT:
+                    return False
+                self._set_meta(connection, 'refreshing_at', current)
+            try:
+                frame = fetch()
+            except BaseException:
+                with self._transaction(connection):
+                    connection.execute("DELETE FROM meta WHERE key = 'refreshing_at'")
+                raise
+            with self._transaction(connection):
+                self._upsert(connection, frame, current)
+        return True
+
+    def _query(self, sql, params=()):
+        with self.connect() as connection:
+            cursor = connection.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            frame = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        # Missing values read back as None; show them as NaN, as the merged frame does.
+        return frame.fillna(np.nan)
+
+    def lookup(self, car_park_no, limit=None):
+        """ The merged rows of a car park, one per lot type. """
+        return self._query(_SELECT + "WHERE c.car_park_no = ? ORDER BY a.position LIMIT ?",
+                           (car_park_no, -1 if limit is None else limit))
+
+    def search(self, address, limit=None, offset=0):
+        """ Car parks whose address holds every token of address, the last as a prefix, in catalogue order. """
+        tokens, last, abbreviations = prefix_forms(address)
+        if last is None:
+            return self._query(_SELECT + "WHERE 0")
+        last_match = ' OR '.join([f'"{last}"*'] + [f'"{token}"' for token in abbreviations])
+        match = ' AND '.join([f'"{token}"' for token in tokens] + [f'({last_match})'])
+        return self._query(_SELECT + f"WHERE c.id IN (SELECT rowid FROM carpark_search WHERE carpark_search MATCH ?) "
+                                     f"AND {_FIRST_ROW} ORDER BY c.id LIMIT ? OFFSET ?",
+                           (match, -1 if limit is None else limit, offset))
+
+    def within(self, x, y, radius):
+        """ Car parks within radius of (x, y), nearest first, with their distance. """
+        found = self._query(_SELECT + "JOIN carpark_location l ON l.id = c.id "
+                                      f"WHERE l.min_x <= ? AND l.max_x >= ? AND l.min_y <= ? AND l.max_y >= ? "
+                                      f"AND {_FIRST_ROW}", (x + radius, x - radius, y + radius, y - radius))
+        distance = np.hypot(found['x_coord'].to_numpy(dtype=float) - x, found['y_coord'].to_numpy(dtype=float) - y)
+        found = found.assign(distance=distance)[distance <= radius]
+        return found.sort_values('distance', kind='stable').reset_index(drop=True)
+
+    def nearest(self, x, y, k=5, radius=None, available=False):
+        """ The k car parks nearest to (x, y), optionally within radius and only those with lots available.
+
+        Without a radius the R-tree search box doubles until it holds k car parks or covers every one.
+        """
+        with self.connect() as connection:
+            bounds = connection.execute("SELECT MIN(min_x), MAX(max_x), MIN(min_y), MAX(max_y) "
+                                        "FROM carpark_location").fetchone()
+        if bounds[0] is None:
+            return self._query(_SELECT + "WHERE 0")
+        reach = np.hypot(max(abs(x - bounds[0]), abs(x - bounds[1])), max(abs(y - bounds[2]), abs(y - bounds[3])))
+        search = radius if radius is not None else min(NEAREST_START_RADIUS, reach)
+        while True:
+            found = self.within(x, y, search)
+            if available:
+                found = found[pd.to_numeric(found['lots_available'], errors='coerce') > 0]
+            if radius is not None or (k is not None and len(found) >= k) or search >= reach:
+                return (found if k is None else found.head(k)).reset_index(drop=True)
+            search = min(search * 2, reach)
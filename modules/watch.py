@@ -0,0 +1,226 @@
+import os
+import queue
+import socketserver
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from .daemon import parse_address
+from .data_merger import AVAILABILITY_FIELDS, changed_rows, snapshot_keys
+from .formatters import NDJSONFormatter
+from .instrumentation import count, stage
+
+DELTA_COLUMNS = ('car_park_no', 'lot_type', 'change', 'lots_available', 'previous_lots_available',
+                 'total_lots', 'update_datetime', 'feed_timestamp')
+SUBSCRIBER_BACKLOG = 1_000
+
+
+def diff_snapshots(previous, current, fields=AVAILABILITY_FIELDS):
+    """ Records that were added, changed or removed between two availability snapshots.
+
+    Rows are matched on car park number and lot type, so the snapshots may list them in any order.
+    """
+    keys = snapshot_keys(current)
+    previous = previous.drop_duplicates(keys, keep='last')
+    found = pd.MultiIndex.from_frame(previous[keys]).get_indexer(pd.MultiIndex.from_frame(current[keys]))
+    matched = np.flatnonzero(found >= 0)
+    before = previous.iloc[found[matched]]
+    changed = matched[changed_rows(before, current.iloc[matched], fields)]
+    removed = np.setdiff1d(np.arange(len(previous)), found[matched])
+    available = previous['lots_available'].to_numpy()
+    parts = [
+        current.iloc[changed].assign(change='changed', previous_lots_available=available[found[changed]]),
+        current.iloc[np.flatnonzero(found < 0)].assign(change='added', previous_lots_available=np.nan),
+        previous.iloc[removed].assign(change='removed', previous_lots_available=available[removed],
+                                      lots_available=np.nan),
+    ]
+    deltas = pd.concat(parts, ignore_index=True)
+    # Nullable integers keep counts integral next to the missing side of added and removed records.
+    for column in ('lots_available', 'previous_lots_available'):
+        deltas[column] = pd.to_numeric(deltas[column], errors='coerce').astype('Int64')
+    return deltas[[column for column in DELTA_COLUMNS if column in deltas.columns]]
+
+
+class DeltaFilter:
+    """ Keeps deltas for the listed car parks, and those whose availability fell below a threshold. """
+
+    def __init__(self, carparks=None, below=None):
+        self.carparks = None if carparks is None else pd.Index(carparks)
+        self.below = below
+
+    def __call__(self, deltas):
+        keep = np.ones(len(deltas), dtype=bool)
+        if self.carparks is not None:
+            keep &= deltas['car_park_no'].isin(self.carparks).to_numpy()
+        if self.below is not None:
+            # Crossed below: at or above the threshold before, under it now.
+            now = deltas['lots_available'].to_numpy(dtype=float, na_value=np.nan)
+            before = deltas['previous_lots_available'].to_numpy(dtype=float, na_value=np.nan)
+            keep &= (before >= self.below) & (now < self.below)
+        return deltas[keep]
+
+
+class StdoutSink:
+    def publish(self, lines):
+        print("\n".join(lines))
+        sys.stdout.flush()
+
+
+class _SubscriberHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        publisher = self.server.publisher
+        if publisher.sse:
+            # Read and ignore the HTTP request; every path streams the same events.
+            while self.rfile.readline().strip():
+                pass
+            self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                             b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+            self.wfile.flush()
+        backlog = publisher.subscribe()
+        try:
+            while (message := backlog.get()) is not None:
+                self.wfile.write(message)
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            publisher.unsubscribe(backlog)
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class DeltaPublisher:
+    """ Streams deltas to every connected subscriber, as NDJSON lines or as server-sent events when sse.
+
+    address is a Unix socket path or host:port, as for the query daemon. A subscriber that falls
+    SUBSCRIBER_BACKLOG messages behind is disconnected rather than slowing the others down.
+    """
+
+    def __init__(self, address, sse=False):
+        self.address = address
+        self.sse = sse
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def server_address(self):
+        return self._server.server_address
+
+    def start(self):
+        kind, address = parse_address(self.address)
+        if kind == 'unix':
+            if os.path.exists(address):
+                os.remove(address)
+            self._server = _ThreadingUnixServer(address, _SubscriberHandler)
+        else:
+            self._server = _ThreadingTCPServer(address, _SubscriberHandler)
+        self._server.publisher = self
+        threading.Thread(target=self._server.serve_forever, args=(0.1,), daemon=True).start()
+        return self
+
+    def subscribe(self):
+        backlog = queue.Queue(SUBSCRIBER_BACKLOG)
+        with self._lock:
+            self._subscribers.add(backlog)
+        return backlog
+
+    def unsubscribe(self, backlog):
+        with self._lock:
+            self._subscribers.discard(backlog)
+
+    @property
+    def subscribers(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, lines):
+        if self.sse:
+            message = "".join(f"event: delta\ndata: {line}\n\n" for line in lines).encode('utf-8')
+        else:
+            message = "".join(line + "\n" for line in lines).encode('utf-8')
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for backlog in subscribers:
+            try:
+                backlog.put_nowait(message)
+            except queue.Full:
+                self._drop(backlog)
+
+    def _drop(self, backlog):
+        self.unsubscribe(backlog)
+        # Make room for the sentinel that ends the subscriber's stream.
+        while True:
+            try:
+                backlog.get_nowait()
+            except queue.Empty:
+                break
+        backlog.put_nowait(None)
+
+    def close(self):
+        with self._lock:
+            subscribers, self._subscribers = list(self._subscribers), set()
+        for backlog in subscribers:
+            self._drop(backlog)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            kind, address = parse_address(self.address)
+            if kind == 'unix' and os.path.exists(address):
+                os.remove(address)
+            self._server = None
+
+
+class AvailabilityWatcher:
+    """ Polls availability on a schedule and publishes only the records that changed since the last poll.
+
+    The first poll sets the baseline and publishes nothing.
+    """
+
+    def __init__(self, fetch, sinks=(), delta_filter=None, interval=60):
+        self.fetch = fetch
+        self.sinks = list(sinks)
+        self.delta_filter = delta_filter
+        self.interval = interval
+        self._previous = None
+        self._stop = threading.Event()
+
+    def poll(self):
+        """ Fetch one snapshot and publish its deltas; returns them as a frame. """
+        current = self.fetch()
+        previous, self._previous = self._previous, current
+        if previous is None:
+            return diff_snapshots(current, current)
+        with stage('watch.diff'):
+            deltas = diff_snapshots(previous, current)
+            if self.delta_filter is not None:
+                deltas = self.delta_filter(deltas)
+        count('watch.diff', rows=len(deltas))
+        if len(deltas):
+            lines = NDJSONFormatter().rows(deltas).splitlines()
+            for sink in self.sinks:
+                sink.publish(lines)
+        return deltas
+
+    def run(self, polls=None):
+        """ Poll every interval seconds until stop() or, when given, polls polls. """
+        done = 0
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error polling availability data: {e}", file=sys.stderr)
+            done += 1
+            if polls is not None and done >= polls:
+                break
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
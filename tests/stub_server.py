@@ -0,0 +1,86 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.active += 1
+            stub.max_active = max(stub.max_active, stub.active)
+        try:
+            if stub.delay:
+                time.sleep(stub.delay)
+            self._respond(stub)
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+    def _respond(self, stub):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with stub.lock:
+            stub.requests.append({'path': url.path, 'params': params, 'headers': dict(self.headers)})
+            failing = stub.failures_left > 0
+            if failing:
+                stub.failures_left -= 1
+        if failing:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if stub.etag and self.headers.get('If-None-Match') == stub.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        payload = stub.payload(params) if callable(stub.payload) else stub.payload
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        if stub.etag:
+            self.send_header('ETag', stub.etag)
+        if stub.last_modified:
+            self.send_header('Last-Modified', stub.last_modified)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubFeedServer:
+    """ Serves canned availability payloads on localhost; payload may be a callable of the query params. """
+
+    def __init__(self, payload, etag='"v1"', last_modified='Sat, 08 Mar 2025 15:16:36 GMT', fail_first=0, delay=0):
+        self.payload = payload
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.etag = etag
+        self.last_modified = last_modified
+        self.failures_left = fail_first
+        self.requests = []
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1/transport/carpark-availability"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
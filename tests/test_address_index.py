@@ -0,0 +1,55 @@
+import unittest
+import pandas as pd
+from modules.address_index import AddressIndex, normalize_tokens
+
+class TestAddressIndex(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACM', 'AM14', 'BE3', 'X1'],
+            'address': [
+                'BLK 270/271 ALBERT CENTRE BASEMENT CAR PARK',
+                'BLK 98A ALJUNIED CRESCENT',
+                'BLK 314/315 ANG MO KIO STREET 31',
+                'BLK 101 BEDOK NORTH ROAD',
+                pd.NA,
+            ],
+        })
+        self.index = AddressIndex(self.data)
+
+    def test_normalize_tokens_folds_abbreviations(self):
+        self.assertEqual(normalize_tokens('Block 101, Bedok North Rd'), ['BLK', '101', 'BEDOK', 'NTH', 'RD'])
+
+    def test_multi_token_and_query(self):
+        self.assertEqual(self.index.search('ang mo kio street').tolist(), [2])
+        self.assertEqual(self.index.search('BLK').tolist(), [0, 1, 2, 3])
+
+    def test_long_and_short_forms_match(self):
+        self.assertEqual(self.index.search('Bedok North Road').tolist(), [3])
+        self.assertEqual(self.index.search('ALJUNIED CRES').tolist(), [1])
+
+    def test_prefix_matching_on_last_token(self):
+        self.assertEqual(self.index.search('alj').tolist(), [1])
+        self.assertEqual(self.index.search('alj', prefix=False).tolist(), [])
+        self.assertEqual(self.index.search('BLK 27').tolist(), [0])
+
+    def test_type_ahead_on_partly_typed_long_forms(self):
+        self.assertEqual(self.index.search('BEDOK NOR').tolist(), [3])
+        self.assertEqual(self.index.search('BEDOK NORTH').tolist(), [3])
+        self.assertEqual(self.index.search('ALJUNIED CRESC').tolist(), [1])
+        self.assertEqual(self.index.search('ang mo kio stree').tolist(), [2])
+        self.assertEqual(self.index.search('BLOC 98').tolist(), [])
+        self.assertEqual(self.index.search('BLO').tolist(), [0, 1, 2, 3])
+
+    def test_limit(self):
+        self.assertEqual(self.index.search('BLK', limit=2).tolist(), [0, 1])
+
+    def test_no_match(self):
+        self.assertEqual(len(self.index.search('ORCHARD')), 0)
+        self.assertEqual(len(self.index.search('  ')), 0)
+
+    def test_fuzzy_search_ranks_misspellings(self):
+        self.assertEqual(self.index.search_fuzzy('aljunid crescnt').tolist()[0], 1)
+        self.assertEqual(self.index.search_fuzzy('bedock').tolist(), [3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+import pandas as pd
+from modules.analytics import OccupancyAnalytics, busiest, occupancy
+
+def weekday_history(days=14, end=None):
+    """ ACM fills to half between 08:00 and 18:00; ACB stays 90% full. """
+    feed = pd.date_range('2025-03-03', periods=days * 24 * 60, freq='min', tz='Asia/Singapore')
+    if end is not None:
+        feed = feed[feed < pd.Timestamp(end, tz='Asia/Singapore')]
+    daytime = np.asarray((feed.hour >= 8) & (feed.hour < 18))
+    return pd.DataFrame({
+        'car_park_no': np.repeat(['ACM', 'ACB'], len(feed)),
+        'lot_type': 'C',
+        'lots_available': np.concatenate([np.where(daytime, 50, 100), np.full(len(feed), 10)]),
+        'total_lots': 100,
+        'feed_timestamp': np.tile(feed, 2),
+    })
+
+class TestOccupancy(unittest.TestCase):
+    def test_occupancy_handles_missing_and_zero_totals(self):
+        data = pd.DataFrame({'total_lots': [100, 0, None, 50], 'lots_available': [25, 0, 3, 60]})
+        rate = occupancy(data).tolist()
+        self.assertEqual(rate[0], 0.75)
+        self.assertTrue(np.isnan(rate[1]) and np.isnan(rate[2]))
+        self.assertEqual(rate[3], 0.0)
+
+    def test_busiest_lists_each_car_park_once(self):
+        data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACB', 'ACM', 'AH1'],
+            'lot_type': ['C', 'Y', 'C', 'C'],
+            'total_lots': [100, 10, 150, 200],
+            'lots_available': [50, 0, 100, 10],
+        })
+        self.assertEqual(busiest(data, top=2)['car_park_no'].tolist(), ['AH1', 'ACB'])
+
+    def test_busiest_ranks_car_lots_of_multi_lot_type_car_parks(self):
+        # ACB's motorcycle lots are full, but its car lots are half empty.
+        data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACB', 'ACM', 'AH1', 'AH1'],
+            'lot_type': ['Y', 'C', 'C', 'H', 'C'],
+            'total_lots': [10, 100, 150, 5, 200],
+            'lots_available': [0, 50, 15, 0, 10],
+        })
+        result = busiest(data)
+        self.assertEqual(result['car_park_no'].tolist(), ['AH1', 'ACM', 'ACB'])
+        self.assertEqual(result['lots_available'].tolist(), [10, 15, 50])
+        self.assertEqual(busiest(data, lot_type='Y')['car_park_no'].tolist(), ['ACB'])
+
+class TestOccupancyAnalytics(unittest.TestCase):
+    def test_hour_of_week_profile(self):
+        profile = OccupancyAnalytics.from_frame(weekday_history()).hour_of_week_profile()
+        self.assertEqual(profile.loc[('ACM', 'C'), 7], 0.0)
+        self.assertEqual(profile.loc[('ACM', 'C'), 8], 0.5)
+        self.assertAlmostEqual(profile.loc[('ACB', 'C'), 8], 0.9)
+        self.assertEqual(profile.loc[('ACM', 'C'), 24 + 9], 0.5)
+
+    def test_rolling_average_spans_window(self):
+        analytics = OccupancyAnalytics.from_frame(weekday_history(days=1), freq='30min')
+        rolling = analytics.rolling_average('1h').loc[('ACM', 'C')]
+        self.assertEqual(rolling[pd.Timestamp('2025-03-03 08:00', tz='Asia/Singapore')], 0.25)
+        self.assertEqual(rolling[pd.Timestamp('2025-03-03 08:30', tz='Asia/Singapore')], 0.5)
+
+    def test_chunks_match_single_pass(self):
+        history = weekday_history(days=3)
+        whole = OccupancyAnalytics.from_frame(history)
+        chunked = OccupancyAnalytics(history['feed_timestamp'].min(), history['feed_timestamp'].max())
+        for chunk in np.array_split(history.sample(frac=1, random_state=0), 4):
+            chunked.add(chunk)
+        pd.testing.assert_frame_equal(whole.resampled().sort_index(), chunked.resampled().sort_index())
+        pd.testing.assert_frame_equal(whole.current().sort_index(), chunked.current().sort_index())
+
+    def test_forecast_follows_profile(self):
+        analytics = OccupancyAnalytics.from_frame(weekday_history(end='2025-03-16 07:45'))
+        forecast = analytics.forecast(minutes=30)
+        self.assertEqual(forecast.loc[('ACM', 'C'), 'forecast_lots_available'], 50)
+        self.assertEqual(forecast.loc[('ACB', 'C'), 'forecast_lots_available'], 10)
+        self.assertEqual(str(forecast.loc[('ACM', 'C'), 'forecast_timestamp']), '2025-03-16 08:14:00+08:00')
+
+    def test_bucket_must_divide_an_hour(self):
+        with self.assertRaises(ValueError):
+            OccupancyAnalytics('2025-03-03', '2025-03-04', freq='7min')
+
+if __name__ == '__main__':
+    unittest.main()
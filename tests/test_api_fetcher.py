@@ -1,15 +1,22 @@
+import json
 import unittest
 from unittest.mock import patch
 import requests
 import pandas as pd
-from modules.api_fetcher import APIFetcher
+from modules import api_fetcher
+from modules.api_fetcher import APIFetcher, parse_feed, pivot_lot_types
+from tests.stub_server import StubFeedServer
 
 class TestAPIFetcher(unittest.TestCase):
     def setUp(self):
         self.api_url = 'https://api.example.com/hdb_carpark_availability'
         self.fetcher = APIFetcher(self.api_url)
+        # These tests mock response.json(), so decode through requests even when orjson is installed.
+        orjson_patcher = patch.object(api_fetcher, 'orjson', None)
+        orjson_patcher.start()
+        self.addCleanup(orjson_patcher.stop)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_fetch_data_success(self, mock_get):
         mock_response = mock_get.return_value
         mock_response.raise_for_status = unittest.mock.Mock()
@@ -55,20 +62,23 @@ class TestAPIFetcher(unittest.TestCase):
         result_df = self.fetcher.fetch_data()
         pd.testing.assert_frame_equal(result_df, expected_df)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_fetch_data_http_error(self, mock_get):
         mock_response = mock_get.return_value
         mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError("Error 404: Not Found")
         with self.assertRaises(requests.exceptions.HTTPError):
             self.fetcher.fetch_data()
 
-    @patch('requests.get')
-    def test_fetch_data_connection_error(self, mock_get):
+    @patch('modules.api_fetcher.time.sleep')
+    @patch('requests.Session.get')
+    def test_fetch_data_connection_error(self, mock_get, mock_sleep):
         mock_get.side_effect = requests.exceptions.ConnectionError("Failed to connect")
         with self.assertRaises(requests.exceptions.ConnectionError):
             self.fetcher.fetch_data()
+        self.assertEqual(mock_get.call_count, self.fetcher.retries + 1)
+        self.assertEqual(mock_sleep.call_count, self.fetcher.retries)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_fetch_data_invalid_json(self, mock_get):
         mock_response = mock_get.return_value
         mock_response.raise_for_status = unittest.mock.Mock()
@@ -76,7 +86,7 @@ class TestAPIFetcher(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.fetcher.fetch_data()
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_fetch_data_incomplete_data(self, mock_get):
         mock_response = mock_get.return_value
         mock_response.raise_for_status = unittest.mock.Mock()
@@ -97,5 +107,127 @@ class TestAPIFetcher(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.fetcher.fetch_data()
 
+class TestParsePayload(unittest.TestCase):
+    def setUp(self):
+        self.payload = {
+            "items": [
+                {
+                    "timestamp": "2025-03-08T23:16:36+08:00",
+                    "carpark_data": [
+                        {
+                            "carpark_number": "A11",
+                            "update_datetime": "2025-03-08T23:16:32",
+                            "carpark_info": [
+                                {"total_lots": "410", "lot_type": "C", "lots_available": "236"},
+                                {"total_lots": "20", "lot_type": "Y", "lots_available": "7"}
+                            ]
+                        },
+                        {
+                            "carpark_number": "TR1",
+                            "update_datetime": "2025-03-08T23:15:05",
+                            "carpark_info": [
+                                {"total_lots": "391", "lot_type": "C", "lots_available": "n/a"},
+                                {"total_lots": "12", "lot_type": "H", "lots_available": "3"}
+                            ]
+                        },
+                        {"carpark_number": "", "update_datetime": "2025-03-08T23:15:05", "carpark_info": []}
+                    ]
+                }
+            ]
+        }
+
+    def test_parse_all_lot_types(self):
+        result = APIFetcher.parse_payload(self.payload)
+        self.assertEqual(result['carpark_number'].tolist(), ['A11', 'A11', 'TR1'])
+        self.assertEqual(result['lot_type'].tolist(), ['C', 'Y', 'H'])
+        self.assertEqual(result['lots_available'].tolist(), [236, 7, 3])
+        self.assertEqual(result['total_lots'].dtype, 'int64')
+        self.assertTrue((result['feed_timestamp'] == "2025-03-08T23:16:36+08:00").all())
+
+    def test_malformed_rows_are_quarantined(self):
+        records = self.payload['items'][0]['carpark_data']
+        records.append({"carpark_number": "BE3", "update_datetime": "yesterday",
+                        "carpark_info": [{"total_lots": "-5", "lot_type": "C", "lots_available": "1"}]})
+        result, quarantine = parse_feed(self.payload)
+        self.assertEqual(result['carpark_number'].tolist(), ['A11', 'A11', 'TR1'])
+        self.assertEqual(quarantine.index.tolist(), [2, 4])
+        self.assertEqual(quarantine['lots_available'].tolist(), ['n/a', '1'])
+        self.assertEqual(quarantine['reason'].tolist(), [
+            'lots_available not a number',
+            r'update_datetime does not match \d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}; total_lots below 0',
+        ])
+
+    def test_pivot_lot_types(self):
+        wide = pivot_lot_types(APIFetcher.parse_payload(self.payload))
+        self.assertEqual(wide['carpark_number'].tolist(), ['A11', 'TR1'])
+        self.assertEqual(wide['lots_available_Y'].tolist(), [7, pd.NA])
+        self.assertEqual(wide['total_lots_H'].tolist(), [pd.NA, 12])
+        self.assertEqual(wide['update_datetime'].tolist(), ["2025-03-08T23:16:32", "2025-03-08T23:15:05"])
+
+    @unittest.skipIf(api_fetcher.orjson is None, 'orjson not installed')
+    @patch('requests.Session.get')
+    def test_fetch_data_with_orjson(self, mock_get):
+        mock_get.return_value.content = json.dumps(self.payload).encode('utf-8')
+        result = APIFetcher('https://api.example.com').fetch_data(wide=True)
+        self.assertEqual(result['total_lots_C'].tolist(), [410, pd.NA])
+
+class TestAPIFetcherHTTP(unittest.TestCase):
+    payload = {
+        "items": [{
+            "timestamp": "2025-03-08T23:16:36+08:00",
+            "carpark_data": [{
+                "carpark_number": "A11",
+                "update_datetime": "2025-03-08T23:16:32",
+                "carpark_info": [{"total_lots": "410", "lot_type": "C", "lots_available": "236"}]
+            }]
+        }]
+    }
+
+    def test_conditional_request_skips_parsing_on_304(self):
+        with StubFeedServer(self.payload) as server:
+            fetcher = APIFetcher(server.url)
+            first = fetcher.fetch_data()
+            self.assertFalse(fetcher.not_modified)
+            with patch.object(APIFetcher, 'parse_payload') as mock_parse:
+                second = fetcher.fetch_data()
+                mock_parse.assert_not_called()
+        self.assertTrue(fetcher.not_modified)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertNotIn('If-None-Match', server.requests[0]['headers'])
+        self.assertEqual(server.requests[1]['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(server.requests[1]['headers']['If-Modified-Since'], 'Sat, 08 Mar 2025 15:16:36 GMT')
+
+    def test_response_is_gzip_negotiated(self):
+        with StubFeedServer(self.payload) as server:
+            APIFetcher(server.url).fetch_data()
+        self.assertIn('gzip', server.requests[0]['headers']['Accept-Encoding'])
+
+    def test_retries_server_errors(self):
+        with StubFeedServer(self.payload, fail_first=2) as server:
+            fetcher = APIFetcher(server.url, retries=2, backoff_factor=0.01)
+            result = fetcher.fetch_data()
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(result['carpark_number'].tolist(), ['A11'])
+
+    def test_gives_up_after_retries(self):
+        with StubFeedServer(self.payload, fail_first=5) as server:
+            fetcher = APIFetcher(server.url, retries=1, backoff_factor=0.01)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                fetcher.fetch_data()
+        self.assertEqual(len(server.requests), 2)
+
+    def test_historical_snapshot(self):
+        def payload(params):
+            item = dict(self.payload['items'][0], timestamp=params.get('date_time', 'live'))
+            return {"items": [item]}
+
+        with StubFeedServer(payload) as server:
+            fetcher = APIFetcher(server.url)
+            fetcher.fetch_data()
+            result = fetcher.fetch_data(date_time='2025-03-01T08:00:00')
+        self.assertEqual(server.requests[1]['params'], {'date_time': '2025-03-01T08:00:00'})
+        self.assertNotIn('If-None-Match', server.requests[1]['headers'])
+        self.assertEqual(result['feed_timestamp'].tolist(), ['2025-03-01T08:00:00'])
+
 if __name__ == '__main__':
     unittest.main()
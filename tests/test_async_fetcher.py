@@ -0,0 +1,97 @@
+import time
+import unittest
+import pandas as pd
+import requests
+from modules import async_fetcher
+from modules.api_fetcher import APIFetcher
+from modules.async_fetcher import AsyncFetcher, FeedRequest, snapshot_times
+from tests.stub_server import StubFeedServer
+
+TRANSPORTS = ['threads'] + (['aiohttp'] if async_fetcher.aiohttp is not None else [])
+
+def feed_payload(params):
+    """ One car park whose availability encodes the requested snapshot minute. """
+    date_time = params.get('date_time', '2025-03-08T23:16:00')
+    return {'items': [{'timestamp': date_time + '+08:00', 'carpark_data': [{
+        'carpark_number': 'ACB', 'update_datetime': date_time,
+        'carpark_info': [{'total_lots': '100', 'lot_type': 'C', 'lots_available': date_time[-5:-3]}],
+    }]}]}
+
+def operator_payload(data):
+    """ Parser for a feed with a flat layout, normalized to the HDB frame schema. """
+    return pd.DataFrame({
+        'carpark_number': [lot['id'] for lot in data['lots']],
+        'update_datetime': data['updated'],
+        'total_lots': [lot['capacity'] for lot in data['lots']],
+        'lot_type': 'C',
+        'lots_available': [lot['free'] for lot in data['lots']],
+        'feed_timestamp': data['updated'],
+    })
+
+class TestAsyncFetcher(unittest.TestCase):
+    def test_fetches_many_feeds_into_one_schema(self):
+        operator = {'updated': '2025-03-08T23:16:00', 'lots': [{'id': 'M1', 'capacity': 50, 'free': 7}]}
+        with StubFeedServer(feed_payload) as hdb, StubFeedServer(operator) as other:
+            expected = APIFetcher(hdb.url).fetch_data()
+            for transport in TRANSPORTS:
+                with self.subTest(transport=transport):
+                    results = AsyncFetcher(transport=transport).fetch_all([
+                        hdb.url, FeedRequest(other.url, parser=operator_payload),
+                        FeedRequest(hdb.url, {'date_time': '2025-03-08T09:42:00'}),
+                    ])
+                    pd.testing.assert_frame_equal(results[0], expected)
+                    self.assertEqual(list(results[1].columns), list(expected.columns))
+                    self.assertEqual(results[1]['carpark_number'].tolist(), ['M1'])
+                    self.assertEqual(results[2]['lots_available'].tolist(), [42])
+
+    def test_limits_concurrent_requests(self):
+        with StubFeedServer(feed_payload, delay=0.1) as server:
+            results = AsyncFetcher(limit=2, rate=None).fetch_all([server.url] * 6)
+        self.assertEqual(len([r for r in results if isinstance(r, pd.DataFrame)]), 6)
+        self.assertEqual(server.max_active, 2)
+
+    def test_rate_limits_each_host(self):
+        with StubFeedServer(feed_payload) as server:
+            began = time.perf_counter()
+            AsyncFetcher(rate=20).fetch_all([server.url] * 5)
+            elapsed = time.perf_counter() - began
+        self.assertGreaterEqual(elapsed, 4 / 20)
+
+    def test_retries_server_errors(self):
+        with StubFeedServer(feed_payload, fail_first=2) as server:
+            fetcher = AsyncFetcher(limit=1, backoff_factor=0)
+            results = fetcher.fetch_all([server.url])
+        self.assertIsInstance(results[0], pd.DataFrame)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_failures_are_returned_in_place(self):
+        with StubFeedServer(feed_payload, fail_first=10) as server:
+            results = AsyncFetcher(retries=0).fetch_all([server.url])
+        self.assertIsInstance(results[0], requests.exceptions.HTTPError)
+
+    def test_timeout_budget_bounds_the_whole_fetch(self):
+        with StubFeedServer(feed_payload, delay=0.5) as server:
+            began = time.perf_counter()
+            results = AsyncFetcher(limit=1, rate=None, budget=0.3).fetch_all([server.url] * 3)
+            elapsed = time.perf_counter() - began
+        self.assertTrue(all(isinstance(r, TimeoutError) for r in results))
+        self.assertLess(elapsed, 0.5)
+
+    def test_backfill_keeps_snapshot_order(self):
+        with StubFeedServer(feed_payload) as server:
+            fetcher = AsyncFetcher(rate=None)
+            frames = list(fetcher.backfill(server.url, '2025-03-08 09:00', '2025-03-08 09:09', batch=4))
+        self.assertEqual([frame['lots_available'].iloc[0] for frame in frames], list(range(10)))
+        self.assertEqual(fetcher.failures, [])
+        self.assertEqual(sorted(r['params']['date_time'] for r in server.requests),
+                         snapshot_times('2025-03-08 09:00', '2025-03-08 09:09'))
+
+    def test_backfill_yields_each_batch_before_fetching_the_next(self):
+        with StubFeedServer(feed_payload) as server:
+            frames = AsyncFetcher(rate=None).backfill(server.url, '2025-03-08 09:00', '2025-03-08 09:09', batch=4)
+            next(frames)
+            self.assertEqual(len(server.requests), 4)
+            self.assertEqual(len(list(frames)), 9)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+import pandas as pd
+from modules.attribute_index import AttributeIndex
+from modules.compact_schema import compact_frame
+
+class TestAttributeIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 1_003
+        self.data = pd.DataFrame({
+            'car_park_no': [f"C{i}" for i in range(n)],
+            'car_park_type': rng.choice(['SURFACE CAR PARK', 'MULTI-STOREY CAR PARK', 'BASEMENT CAR PARK'], n),
+            'night_parking': rng.choice(['YES', 'NO'], n),
+            'car_park_basement': rng.choice(['Y', 'N'], n),
+            'gantry_height': rng.choice([0.0, 1.8, 2.0, 2.1, 2.15, 4.5, np.nan], n),
+            'car_park_decks': rng.integers(0, 12, n),
+        })
+        self.index = AttributeIndex(self.data)
+
+    def test_compound_predicate_matches_pandas(self):
+        where = {'night_parking': 'yes', 'car_park_type': ['MULTI-STOREY CAR PARK', 'BASEMENT CAR PARK'],
+                 'gantry_height': [2.1, None], 'car_park_decks': [None, 6]}
+        expected = ((self.data['night_parking'] == 'YES')
+                    & self.data['car_park_type'].isin(['MULTI-STOREY CAR PARK', 'BASEMENT CAR PARK'])
+                    & (self.data['gantry_height'] >= 2.1) & (self.data['car_park_decks'] <= 6))
+        np.testing.assert_array_equal(self.index.mask(where), expected.to_numpy())
+
+    def test_ranges_are_inclusive_on_compact_frames(self):
+        expected = self.data['gantry_height'].between(2.1, 2.15).to_numpy()
+        for data in (self.data, compact_frame(self.data)):
+            np.testing.assert_array_equal(AttributeIndex(data).mask({'gantry_height': [2.1, 2.15]}), expected)
+
+    def test_unknown_value_matches_nothing(self):
+        self.assertEqual(len(self.index.positions({'car_park_type': 'ROOFTOP CAR PARK'})), 0)
+        self.assertEqual(len(self.index.positions({})), len(self.data))
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(ValueError):
+            self.index.mask({'free_parking': 'NO'})
+
+if __name__ == '__main__':
+    unittest.main()
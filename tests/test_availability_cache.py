@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from modules.availability_cache import AvailabilityCache
+
+class CountingFetcher:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch_data(self):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        return pd.DataFrame({
+            'carpark_number': ['A11'],
+            'lots_available': [calls],
+            'feed_timestamp': [pd.Timestamp.now(tz='Asia/Singapore').isoformat()],
+        })
+
+class TestAvailabilityCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_fresh_entry_is_shared(self):
+        fetcher = CountingFetcher()
+        first = AvailabilityCache(fetcher, self.cache_dir, ttl=60).fetch_data()
+        second = AvailabilityCache(fetcher, self.cache_dir, ttl=60).fetch_data()
+        self.assertEqual(fetcher.calls, 1)
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_expired_entry_is_refetched(self):
+        fetcher = CountingFetcher()
+        cache = AvailabilityCache(fetcher, self.cache_dir, ttl=60)
+        cache.fetch_data()
+        with patch('modules.availability_cache.time.time', return_value=time.time() + 120):
+            result = cache.fetch_data()
+        self.assertEqual(fetcher.calls, 2)
+        self.assertEqual(result['lots_available'].tolist(), [2])
+
+    def test_concurrent_stale_readers_refetch_once(self):
+        fetcher = CountingFetcher(delay=0.2)
+        results = []
+        def worker():
+            results.append(AvailabilityCache(fetcher, self.cache_dir, ttl=60).fetch_data())
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(fetcher.calls, 1)
+        self.assertEqual(len(results), 8)
+
+    def test_stale_while_revalidate(self):
+        fetcher = CountingFetcher(delay=0.1)
+        cache = AvailabilityCache(fetcher, self.cache_dir, ttl=60, stale_while_revalidate=True)
+        cache.fetch_data()
+        with patch('modules.availability_cache.time.time', return_value=time.time() + 120):
+            start = time.perf_counter()
+            stale = cache.fetch_data()
+            # The caller does not wait for the refetch.
+            self.assertLess(time.perf_counter() - start, fetcher.delay)
+            self.assertEqual(stale['lots_available'].tolist(), [1])
+        # The refetch ran in a detached process, which counts its own calls.
+        deadline = time.monotonic() + 5
+        while cache._read()['frame']['lots_available'].tolist() != [2]:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+        self.assertEqual(fetcher.calls, 1)
+        self.assertEqual(cache.fetch_data()['lots_available'].tolist(), [2])
+
+    def test_expiry_follows_feed_timestamp(self):
+        cache = AvailabilityCache(CountingFetcher(), self.cache_dir, ttl=60, min_refresh=5)
+        fetched_at = pd.Timestamp('2025-03-08T23:17:00+08:00').timestamp()
+        self.assertEqual(cache.expires_at(fetched_at, '2025-03-08T23:16:36+08:00'), fetched_at + 36)
+        self.assertEqual(cache.expires_at(fetched_at, '2025-03-08T22:00:00+08:00'), fetched_at + 5)
+        self.assertEqual(cache.expires_at(fetched_at, None), fetched_at + 60)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from benchmarks.suite import ReplaySession, compare, main
+from benchmarks.synthetic import scaled_catalogue, scaled_feed, synthetic_feed
+from modules.api_fetcher import APIFetcher
+
+def results(**seconds):
+    return {'meta': {'feed': 'synthetic'}, 'results': {name: {'min': value} for name, value in seconds.items()}}
+
+class TestScaling(unittest.TestCase):
+    def test_scaled_feed_matches_scaled_catalogue(self):
+        catalogue = pd.DataFrame({'car_park_no': ['ACB', 'ACM'], 'address': ['BLK 1', 'BLK 2']})
+        payload = synthetic_feed(catalogue['car_park_no'], lot_types=('C',))
+        body = json.dumps(scaled_feed(payload, 3)).encode('utf-8')
+        feed = APIFetcher('http://feed', session=ReplaySession(body)).fetch_data()
+        numbers = scaled_catalogue(catalogue, 3)['car_park_no']
+        self.assertEqual(numbers.tolist(), ['ACB', 'ACM', 'ACB-1', 'ACM-1', 'ACB-2', 'ACM-2'])
+        self.assertEqual(sorted(feed['carpark_number']), sorted(numbers))
+
+class TestCompare(unittest.TestCase):
+    def test_flags_cases_slower_than_the_threshold(self):
+        rows = compare(results(load=1.0, merge=1.0, gone=1.0), results(load=1.1, merge=1.5, new=1.0), 0.2)
+        self.assertEqual([(name, regressed) for name, *_, regressed in rows], [('load', False), ('merge', True)])
+
+    def test_compare_command_exits_with_status_1_on_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, seconds in [('baseline', 1.0), ('current', 2.0)]:
+                paths.append(os.path.join(tmp, f"{name}.json"))
+                with open(paths[-1], 'w') as f:
+                    json.dump(results(load=seconds), f)
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                self.assertEqual(main(['compare', *paths]), 1)
+                self.assertEqual(main(['compare', *paths, '--threshold', '1.5']), 0)
+        self.assertIn('REGRESSION', out.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+import pandas as pd
+from modules.carpark_index import CarparkIndex, index_for
+
+class TestCarparkIndex(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACM', 'ACB', None, 'AH1'],
+            'lot_type': ['C', 'C', 'Y', 'C', 'C'],
+            'lots_available': [50, 100, 5, 1, 150],
+        })
+        self.index = CarparkIndex(self.data)
+
+    def test_lookup_single(self):
+        result = self.index.lookup('ACM')
+        self.assertEqual(result['lots_available'].tolist(), [100])
+
+    def test_lookup_returns_all_rows_for_key(self):
+        result = self.index.lookup('ACB')
+        self.assertEqual(result['lot_type'].tolist(), ['C', 'Y'])
+        self.assertEqual(result.index.tolist(), [0, 2])
+
+    def test_lookup_unknown_key(self):
+        self.assertTrue(self.index.lookup('XYZ').empty)
+        self.assertNotIn('XYZ', self.index)
+        self.assertEqual(len(self.index), 3)
+
+    def test_lookup_many_preserves_request_order(self):
+        result = self.index.lookup_many(['AH1', 'XYZ', 'ACB', 'ACM'])
+        self.assertEqual(result['car_park_no'].tolist(), ['AH1', 'ACB', 'ACB', 'ACM'])
+
+    def test_lookup_many_empty(self):
+        self.assertEqual(len(self.index.positions_many([])), 0)
+        self.assertTrue(self.index.lookup_many(['XYZ']).empty)
+
+    def test_index_for_reuses_index(self):
+        self.assertIs(index_for(self.data), index_for(self.data))
+        other = self.data.copy()
+        self.assertIsNot(index_for(other), index_for(self.data))
+        np.testing.assert_array_equal(index_for(other).positions('ACB'), [0, 2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,18 @@ import unittest
 from unittest.mock import patch, MagicMock, call
 import pandas as pd
 import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 from modules import cli
+from modules.history_store import HistoryStore
+from modules.lookup_snapshot import LookupSnapshot
+from tests.stub_server import StubFeedServer
+from tests.test_async_fetcher import feed_payload
 
 class TestCLI(unittest.TestCase):
     def setUp(self):
@@ -122,5 +133,242 @@ class TestCLI(unittest.TestCase):
             printed_calls = mocked_print.call_args_list
             self.assertTrue(any("Total lots: one hundred" in str(c) for c in printed_calls))
 
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    @patch('modules.cli.DataMerger')
+    def test_find_nearest(self, MockMerger, MockFetcher, MockLoader, mock_args):
+        MockLoader.return_value.load_data.return_value = MagicMock()
+        MockFetcher.return_value.fetch_data.return_value = MagicMock()
+        MockMerger.return_value.merge_data.return_value = self.sample_merged_data
+        mock_args.return_value = argparse.Namespace(query=None, search=None, view=None, near=[2.9, 3.0],
+                                                    radius=None, k=2, available=False, latlon=False)
+
+        with patch('builtins.print') as mocked_print:
+            cli.main()
+            # Output is written in buffered blocks, so compare the printed lines.
+            printed = "\n".join(c.args[0] for c in mocked_print.call_args_list).splitlines()
+            numbers = [p for p in printed if "Car Park No:" in p]
+            self.assertEqual(len(numbers), 2)
+            self.assertIn("Car Park No: AH1", numbers[0])
+            self.assertIn("Car Park No: ACM", numbers[1])
+            self.assertTrue(any("Distance: 0 m" in p for p in printed))
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    def test_show_history(self, mock_args):
+        with tempfile.TemporaryDirectory() as history_dir:
+            HistoryStore(history_dir).append(pd.DataFrame({
+                'carpark_number': ['ACM', 'ACB'],
+                'update_datetime': ['2025-03-10T08:00:00', '2025-03-10T08:00:00'],
+                'total_lots': [100, 300],
+                'lot_type': ['C', 'C'],
+                'lots_available': [42, 7],
+                'feed_timestamp': ['2025-03-10T08:00:30+08:00', '2025-03-10T08:00:30+08:00'],
+            }))
+            mock_args.return_value = argparse.Namespace(query=None, search=None, view=None, history='ACM',
+                                                        history_dir=history_dir, start=None, end=None)
+            with patch('builtins.print') as mocked_print:
+                cli.main()
+            mocked_print.assert_called_once_with("2025-03-10 08:00:30 C: 42/100 lots available")
+
+    def test_backfill_records_snapshots(self):
+        with tempfile.TemporaryDirectory() as history_dir, StubFeedServer(feed_payload) as server:
+            history = HistoryStore(history_dir)
+            with patch.object(cli, 'API_URL', server.url), patch('builtins.print') as mocked_print:
+                cli.backfill_history('2025-03-10 08:00', '2025-03-10 08:02', history)
+            mocked_print.assert_called_once_with("Recorded 3 of 3 snapshots.")
+            self.assertEqual(history.query('ACB')['lots_available'].tolist(), [0, 1, 2])
+
+    def test_backfill_fills_gaps_before_live_history(self):
+        with tempfile.TemporaryDirectory() as history_dir, StubFeedServer(feed_payload) as server:
+            history = HistoryStore(history_dir)
+            # Live recording already stored a later snapshot and one inside the range.
+            history.append(cli.APIFetcher(server.url).fetch_data(date_time='2025-03-10T09:00:00'))
+            history.append(cli.APIFetcher(server.url).fetch_data(date_time='2025-03-10T08:01:00'))
+            with patch.object(cli, 'API_URL', server.url), patch('builtins.print') as mocked_print:
+                cli.backfill_history('2025-03-10 08:00', '2025-03-10 08:02', history)
+            mocked_print.assert_called_once_with("Recorded 2 of 3 snapshots.")
+            self.assertEqual(history.query('ACB')['lots_available'].tolist(), [0, 1, 2, 0])
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    @patch('modules.cli.DataMerger')
+    def test_busiest(self, MockMerger, MockFetcher, MockLoader, mock_args):
+        MockLoader.return_value.load_data.return_value = MagicMock()
+        MockFetcher.return_value.fetch_data.return_value = MagicMock()
+        MockMerger.return_value.merge_data.return_value = self.sample_merged_data
+        mock_args.return_value = argparse.Namespace(query=None, search=None, view=None, busiest=True, top=2,
+                                                    no_daemon=True)
+
+        with patch('builtins.print') as mocked_print:
+            cli.main()
+            mocked_print.assert_has_calls([
+                call("1. ACB 50% full (50/100 lots available) - Location A"),
+                call("2. ACM 33% full (100/150 lots available) - Location B"),
+            ])
+            self.assertEqual(mocked_print.call_count, 2)
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    @patch('modules.cli.DataMerger')
+    def test_batch_query_ndjson(self, MockMerger, MockFetcher, MockLoader, mock_args):
+        MockMerger.return_value.merge_data.return_value = self.sample_merged_data
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'numbers.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("AH1\nXYZ\n\nACB\n")
+            mock_args.return_value = argparse.Namespace(query=None, search=None, view=None, batch=path,
+                                                        format='ndjson', no_daemon=True)
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                cli.main()
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r['car_park_no'] for r in records], ['AH1', 'XYZ', 'ACB'])
+        self.assertEqual([r['found'] for r in records], [True, False, True])
+        self.assertEqual(records[0]['lots_available'], 150)
+
+    def test_batch_query_csv_and_text(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.batch_query(['ACM', 'NOPE'], self.sample_merged_data, output_format='csv')
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('car_park_no,address,'))
+        self.assertTrue(lines[1].startswith('ACM,Location B,150,100,'))
+        self.assertTrue(lines[2].startswith('NOPE,'))
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.batch_query(['NOPE', 'ACM'], self.sample_merged_data)
+        text = out.getvalue()
+        self.assertLess(text.index("No data found for car park number NOPE."), text.index("Car Park No: ACM"))
+
+    def test_search_pages_results(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.search_by_address('Location', self.sample_merged_data, limit=1, offset=1, output_format='ndjson')
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r['car_park_no'] for r in records], ['ACM'])
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    @patch('modules.cli.DataMerger')
+    def test_attribute_filters(self, MockMerger, MockFetcher, MockLoader, mock_args):
+        MockMerger.return_value.merge_data.return_value = self.sample_merged_data.assign(
+            night_parking=['YES', 'YES', 'NO'], gantry_height=[2.1, 1.8, 4.5],
+            car_park_type=['MULTI-STOREY CAR PARK', 'MULTI-STOREY CAR PARK', 'SURFACE CAR PARK'])
+        mock_args.return_value = argparse.Namespace(query=None, search=None, view=None, night_parking='YES',
+                                                    min_gantry=2.0, format='ndjson', no_daemon=True)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.main()
+        self.assertEqual([json.loads(line)['car_park_no'] for line in out.getvalue().splitlines()], ['ACB'])
+
+        # The same filters narrow address searches and nearest car parks.
+        mock_args.return_value = argparse.Namespace(query=None, search='Location', view=None, type=['surface car park'],
+                                                    available=False, format='ndjson', no_daemon=True)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.main()
+        self.assertEqual([json.loads(line)['car_park_no'] for line in out.getvalue().splitlines()], ['AH1'])
+        mock_args.return_value = argparse.Namespace(query=None, search=None, view=None, near=[2.9, 3.0], radius=None,
+                                                    k=2, available=False, latlon=False, max_gantry=2.5,
+                                                    format='ndjson', no_daemon=True)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.main()
+        self.assertEqual([json.loads(line)['car_park_no'] for line in out.getvalue().splitlines()], ['ACM', 'ACB'])
+
+    def test_free_now_filters(self):
+        data = self.sample_merged_data.assign(free_parking=['SUN & PH FR 7AM-10.30PM', 'NO', 'SUN & PH FR 1PM-10.30PM'],
+                                              short_term_parking=['WHOLE DAY', '7AM-7PM', 'NO'])
+        def listed(**flags):
+            args = argparse.Namespace(**flags)
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                cli.filter_carparks(None, data, output_format='ndjson', **cli.filter_options(args))
+            return [json.loads(line)['car_park_no'] for line in out.getvalue().splitlines()]
+
+        self.assertEqual(listed(free_now=True, at='2025-03-09T08:00'), ['ACB'])
+        self.assertEqual(listed(free_now=True, short_term_now=True, at='2025-03-09T18:00'), ['ACB'])
+        self.assertEqual(listed(short_term_now=True, at='2025-03-10T18:00'), ['ACB', 'ACM'])
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write("2025-03-10\n")
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(listed(free_now=True, at='2025-03-10T14:00', holidays=f.name), ['ACB', 'AH1'])
+
+    def test_lookup_snapshot_matches_full_path(self):
+        data = pd.concat([self.sample_merged_data.assign(lot_type='C'),
+                          self.sample_merged_data.iloc[:1].assign(lot_type='Y', total_lots=10, lots_available=2)],
+                         ignore_index=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'static.csv')
+            with open(source, 'w') as f:
+                f.write('car_park_no\n')
+            LookupSnapshot(os.path.join(tmp, 'lookup.json'), source).write(data, time.time() + 60)
+            snapshot = LookupSnapshot(os.path.join(tmp, 'lookup.json'), source)
+            for action, number in [('query', 'ACB'), ('query', 'AH1'), ('view', 'ACM'), ('query', 'NOPE')]:
+                with patch('sys.stdout', new_callable=io.StringIO) as fast:
+                    cli.answer_from_snapshot(action, number, snapshot)
+                with patch('sys.stdout', new_callable=io.StringIO) as full:
+                    cli.ACTIONS[action](number, data)
+                self.assertEqual(fast.getvalue(), full.getvalue())
+
+            self.assertIsNone(snapshot.load(now=time.time() + 120))
+            with open(source, 'a') as f:
+                f.write('ACB\n')
+            self.assertIsNone(LookupSnapshot(os.path.join(tmp, 'lookup.json'), source).load())
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    @patch('modules.cli.DataMerger')
+    def test_lookup_snapshot_expires_with_the_cached_availability(self, MockMerger, MockFetcher, MockLoader,
+                                                                   mock_args):
+        # The feed was published 50 s before the fetch, so a 60 s TTL leaves 10 s.
+        feed_time = pd.Timestamp.now(tz='Asia/Singapore') - pd.Timedelta(seconds=50)
+        MockFetcher.return_value.fetch_data.return_value = pd.DataFrame({
+            'carpark_number': ['ACB'], 'lots_available': [50], 'feed_timestamp': [feed_time.isoformat()]})
+        MockFetcher.return_value.etag = MockFetcher.return_value.last_modified = None
+        MockMerger.return_value.merge_data.return_value = self.sample_merged_data
+        mock_args.return_value = argparse.Namespace(query='ACB', search=None, view=None, cache_ttl=60,
+                                                    no_daemon=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            source, path = os.path.join(tmp, 'static.csv'), os.path.join(tmp, 'lookup.json')
+            with open(source, 'w') as f:
+                f.write('car_park_no\n')
+            with patch('modules.cli.CACHE_DIR', tmp), patch('modules.cli.STATIC_DATA_PATH', source), \
+                    patch('modules.cli.LOOKUP_SNAPSHOT_PATH', path), patch('sys.stdout', new_callable=io.StringIO):
+                cli.main()
+            with open(path) as f:
+                expires_at = json.load(f)['expires_at']
+        self.assertAlmostEqual(expires_at, feed_time.timestamp() + 60, delta=1)
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    @patch('modules.cli.DataMerger')
+    def test_failed_lookup_snapshot_write_still_answers(self, MockMerger, MockFetcher, MockLoader, mock_args):
+        MockFetcher.return_value.fetch_data.return_value = pd.DataFrame({
+            'carpark_number': ['ACB'], 'lots_available': [50]})
+        MockFetcher.return_value.etag = MockFetcher.return_value.last_modified = None
+        MockMerger.return_value.merge_data.return_value = self.sample_merged_data
+        mock_args.return_value = argparse.Namespace(query='ACB', search=None, view=None, cache_ttl=60,
+                                                    no_daemon=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'static.csv')
+            with open(source, 'w') as f:
+                f.write('car_park_no\n')
+            with patch('modules.cli.CACHE_DIR', tmp), patch('modules.cli.STATIC_DATA_PATH', source), \
+                    patch('modules.cli.LOOKUP_SNAPSHOT_PATH', os.path.join(tmp, 'lookup.json')), \
+                    patch.object(LookupSnapshot, 'write', side_effect=OSError('disk full')), \
+                    patch('sys.stderr', new_callable=io.StringIO) as mock_stderr, \
+                    patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+                cli.main()
+        self.assertIn('ACB', mock_stdout.getvalue())
+        self.assertIn('could not write the lookup snapshot', mock_stderr.getvalue())
+
+    def test_help_does_not_import_pandas(self):
+        code = ("import sys\nfrom modules import cli\nsys.argv = ['main.py', '--help']\n"
+                "try:\n    cli.main()\nexcept SystemExit:\n    pass\n"
+                "print(sorted(m for m in ('numpy', 'pandas', 'requests') if m in sys.modules))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertIn('--query', output.stdout)
+        self.assertEqual(output.stdout.splitlines()[-1], '[]')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import pandas as pd
+from modules.compact_schema import CarparkRecord, compact_frame, memory_report
+from modules.data_merger import DataMerger
+
+class TestCompactSchema(unittest.TestCase):
+    def setUp(self):
+        self.static_data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACM', 'AH1'],
+            'address': ['BLK 270/271 ALBERT CENTRE', 'BLK 98A ALJUNIED CRESCENT', 'BLK 101 JALAN DUSUN'],
+            'x_coord': [30314.7936, 33758.4143, 29257.7203],
+            'y_coord': [31490.4942, 33695.5198, 34500.3599],
+            'car_park_type': ['BASEMENT CAR PARK', 'MULTI-STOREY CAR PARK', 'SURFACE CAR PARK'],
+            'night_parking': ['YES', 'YES', pd.NA],
+            'car_park_decks': [1, 5, 0],
+            'gantry_height': [1.80, 2.10, 0.0],
+        })
+        self.real_time_data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACM'],
+            'total_lots': [100, 150],
+            'lot_type': ['C', 'C'],
+            'lots_available': [50, 100],
+        })
+
+    def test_compact_frame_dtypes(self):
+        compact = compact_frame(self.static_data)
+        self.assertEqual(compact['car_park_type'].dtype, 'category')
+        self.assertEqual(compact['car_park_decks'].dtype, 'Int8')
+        self.assertEqual(compact['gantry_height'].dtype, 'float32')
+        self.assertEqual(compact['x_coord'].dtype, 'float64')
+        self.assertTrue(pd.isna(compact.at[2, 'night_parking']))
+        self.assertEqual(compact['car_park_no'].tolist(), self.static_data['car_park_no'].tolist())
+
+    def test_compact_merge_keeps_missing_totals(self):
+        merged = DataMerger(compact=True).merge_data(self.static_data, self.real_time_data)
+        self.assertEqual(merged['total_lots'].dtype, 'Int32')
+        self.assertEqual(merged['lots_available'].tolist(), [50, 100, 0])
+        self.assertTrue(pd.isna(merged.at[2, 'total_lots']))
+        self.assertEqual(merged['lot_type'].dtype, 'category')
+
+    def test_memory_report(self):
+        data = pd.concat([self.static_data] * 200, ignore_index=True)
+        compact = compact_frame(data)
+        report = memory_report(data, compact)
+        self.assertIn('car_park_type', report)
+        self.assertTrue(report.splitlines()[-1].startswith('Total'))
+        self.assertLess(compact.memory_usage(deep=True).sum(), data.memory_usage(deep=True).sum())
+
+    def test_record_from_frame(self):
+        record = CarparkRecord.from_frame(compact_frame(self.static_data), 1)
+        self.assertEqual(record.car_park_no, 'ACM')
+        self.assertEqual(record['car_park_decks'], 5)
+        self.assertEqual(record.get('lots_available', 'N/A'), 'N/A')
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.operating_hours = '24 Hours'
+
+if __name__ == '__main__':
+    unittest.main()
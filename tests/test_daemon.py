@@ -0,0 +1,131 @@
+import argparse
+import io
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from modules import cli, daemon
+from modules.data_merger import DataMerger
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets not available')
+class TestQueryDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.address = os.path.join(self.tmp_dir, 'carpark.sock')
+        self.data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACM'],
+            'address': ['Location A', 'Location B'],
+            'total_lots': [100, 150],
+            'lots_available': [50, 100],
+            'update_datetime': ['2025-03-08T23:16:32', '2025-03-08T23:16:17'],
+        })
+        self.server = daemon.QueryServer(self.address, cli.ACTIONS, lambda: self.data, refresh_interval=3600)
+        self.server.start()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_request_query(self):
+        output = daemon.request(self.address, 'query', 'ACM')
+        self.assertIn("Car Park No: ACM", output)
+        self.assertIn("Lots available: 100", output)
+
+    def test_request_view(self):
+        output = daemon.request(self.address, 'view', 'ACB')
+        self.assertEqual(output, "Last Update Time: 2025-03-08T23:16:32\n")
+
+    def test_large_batch_is_streamed_in_chunks(self):
+        numbers = ['ACB', 'ACM', 'NOPE'] * 500
+        chunks = []
+        with patch('modules.daemon.CHUNK_SIZE', 4096):
+            self.assertEqual(daemon.request(self.address, 'batch', numbers, write=chunks.append), '')
+        self.assertGreater(len(chunks), 1)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.batch_query(numbers, self.data)
+        self.assertEqual(''.join(chunks), out.getvalue())
+
+    def test_timeout_bounds_each_chunk_not_the_whole_reply(self):
+        def slow(value, data):
+            for _ in range(4):
+                print('.' * 10)
+                time.sleep(0.2)
+        self.server.actions = dict(cli.ACTIONS, slow=slow)
+        with patch('modules.daemon.CHUNK_SIZE', 1):
+            self.assertEqual(daemon.request(self.address, 'slow', None, timeout=0.5), ('.' * 10 + '\n') * 4)
+
+    def test_daemon_error_falls_back(self):
+        with patch('sys.stderr', new_callable=io.StringIO) as mock_stderr:
+            self.assertIsNone(daemon.request(self.address, 'drop', 'ACB'))
+        self.assertIn('daemon error', mock_stderr.getvalue())
+
+    @patch('modules.cli.load_data')
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    def test_cli_uses_running_daemon(self, mock_args, mock_load_data):
+        mock_args.return_value = argparse.Namespace(query=None, search='Location', view=None, daemon=self.address)
+        with patch('sys.stdout.write') as mocked_write:
+            cli.main()
+        mock_load_data.assert_not_called()
+        self.assertIn("Address: Location B", mocked_write.call_args[0][0])
+
+class TestDaemonRefresh(unittest.TestCase):
+    def setUp(self):
+        self.static_data = pd.DataFrame({'car_park_no': ['ACB', 'ACM'], 'address': ['Location A', 'Location B']})
+        self.snapshot = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACM'],
+            'update_datetime': ['2025-03-08T23:16:32', '2025-03-08T23:16:17'],
+            'total_lots': [100, 150],
+            'lots_available': [50, 100],
+        })
+        self.merger = DataMerger()
+        self.refreshed = threading.Event()
+        self.reading = threading.Event()
+
+    def refresh(self):
+        merged, _ = self.merger.merge_incremental(self.static_data, self.snapshot)
+        self.refreshed.set()
+        return merged
+
+    def read_twice(self, value, data, **options):
+        # Reads the same car park before and after a refresh has merged its new snapshot.
+        print(data.loc[data['car_park_no'] == value, 'lots_available'].item())
+        self.reading.set()
+        self.refreshed.wait(timeout=5)
+        print(data.loc[data['car_park_no'] == value, 'lots_available'].item())
+
+    def test_query_during_refresh_sees_one_snapshot(self):
+        server = daemon.QueryServer(None, {'query': self.read_twice}, self.refresh)
+        server.data = self.refresh()
+        self.refreshed.clear()
+        self.snapshot = self.snapshot.assign(lots_available=[49, 100])
+        outputs = []
+        query = threading.Thread(target=lambda: outputs.append(server.handle_request('query', 'ACB')))
+        query.start()
+        self.reading.wait(timeout=5)
+        refresh = threading.Thread(target=server.refresh_data)
+        refresh.start()
+        query.join()
+        refresh.join()
+        self.assertTrue(self.refreshed.is_set())
+        self.assertEqual(outputs, ["50\n50\n"])
+        self.assertEqual(server.handle_request('query', 'ACB'), "49\n49\n")
+
+class TestDaemonClient(unittest.TestCase):
+    def test_request_without_daemon_returns_none(self):
+        self.assertIsNone(daemon.request('/nonexistent/carpark.sock', 'query', 'ACB'))
+        self.assertIsNone(daemon.request('127.0.0.1:1', 'query', 'ACB'))
+
+    def test_parse_address(self):
+        self.assertEqual(daemon.parse_address('127.0.0.1:8765'), ('tcp', ('127.0.0.1', 8765)))
+        self.assertEqual(daemon.parse_address('data/.carpark.sock'), ('unix', 'data/.carpark.sock'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open
+import numpy as np
 import pandas as pd
-from modules.data_loader import DataLoader
+from modules.data_loader import SAMPLE_ROWS, DataLoader
 
 class TestDataLoader(unittest.TestCase):
     def setUp(self):
@@ -99,5 +102,73 @@ class TestDataLoader(unittest.TestCase):
         with self.assertRaises(pd.errors.ParserError):
             self.loader.load_data()
 
+    def test_clean_data_handles_existing_missing_values(self):
+        # Mostly distinct and repetitive columns are cleaned by different paths; both meet pd.NA.
+        rows = SAMPLE_ROWS + 4
+        data = pd.DataFrame({
+            'distinct': [f' BLK {i} ' for i in range(rows - 4)] + [pd.NA, None, np.nan, ''],
+            'repeated': ['YES ', ' NO'] * (rows // 2 - 2) + [pd.NA, None, np.nan, ''],
+            'mixed': [f' BLK {i} ' for i in range(rows - 5)] + [7, pd.NA, None, np.nan, ''],
+        })
+        cleaned = self.loader.clean_data(data)
+        self.assertEqual(cleaned['mixed'].iloc[-5], 7)
+        for column in ('distinct', 'repeated', 'mixed'):
+            self.assertTrue(cleaned[column].iloc[-4:].isna().all())
+        self.assertEqual(cleaned['distinct'].iloc[0], 'BLK 0')
+        self.assertEqual(cleaned['repeated'].iloc[:2].tolist(), ['YES', 'NO'])
+
+class TestChunkedLoad(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'catalogue.csv')
+        rows = [f"C{i:03d}, BLK {i} STREET {i % 3} ,{1000.5 + i},{2000.5 + i}, SURFACE CAR PARK ,"
+                f"ELECTRONIC PARKING,WHOLE DAY,{'' if i % 4 else 'NO'},YES,{i % 3},2.1,N" for i in range(25)]
+        with open(self.path, 'w') as f:
+            f.write("car_park_no,address,x_coord,y_coord,car_park_type,type_of_parking_system,short_term_parking,"
+                    "free_parking,night_parking,car_park_decks,gantry_height,car_park_basement\n")
+            f.write("\n".join(rows) + "\n")
+
+    def test_chunked_and_pooled_loads_match_whole_load(self):
+        whole = DataLoader(self.path).load_data()
+        self.assertEqual(whole.loc[1, 'address'], 'BLK 1 STREET 1')
+        self.assertTrue(pd.isna(whole.loc[1, 'free_parking']))
+        self.assertEqual(whole.loc[0, 'free_parking'], 'NO')
+        pd.testing.assert_frame_equal(DataLoader(self.path, chunk_rows=7).load_data(), whole)
+        pd.testing.assert_frame_equal(DataLoader(self.path, chunk_rows=7, workers=2).load_data(), whole)
+        compact = DataLoader(self.path, chunk_rows=7, compact=True).load_data()
+        pd.testing.assert_frame_equal(compact, DataLoader(self.path, compact=True).load_data())
+
+    def test_iter_chunks_streams_in_order(self):
+        chunks = list(DataLoader(self.path).iter_chunks(chunk_rows=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertEqual(chunks[2]['car_park_no'].iloc[0], 'C020')
+
+    def test_bad_rows_are_quarantined_across_chunks(self):
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        for row in (3, 22):
+            lines[row] = lines[row].replace(',2.1,N', ',-2.1,N')
+        lines[12] = lines[12].replace(',YES,2,', ',YES,two,')
+        with open(self.path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        for loader in (DataLoader(self.path), DataLoader(self.path, chunk_rows=10)):
+            data = loader.load_data()
+            self.assertEqual(len(data), 22)
+            self.assertNotIn('C002', data['car_park_no'].tolist())
+            self.assertEqual(data['car_park_decks'].dtype, 'int64')
+            self.assertEqual(loader.quarantine.index.tolist(), [2, 11, 21])
+            self.assertEqual(loader.quarantine['reason'].tolist(),
+                             ['gantry_height below 0', 'car_park_decks not a number', 'gantry_height below 0'])
+
+    def test_all_rows_quarantined_is_an_error(self):
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        with open(self.path, 'w') as f:
+            f.write("\n".join([lines[0]] + [line.replace(',2.1,N', ',2.1,MAYBE') for line in lines[1:]]) + "\n")
+        with self.assertRaises(ValueError) as raised:
+            DataLoader(self.path, chunk_rows=10).load_data()
+        self.assertIn("car_park_basement does not match Y|N (25)", str(raised.exception))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import pandas as pd
 from modules.data_merger import DataMerger
 
@@ -50,9 +51,96 @@ class TestDataMerger(unittest.TestCase):
     def test_invalid_format_handling(self):
         self.static_data.at[0, 'car_park_no'] = 123  
         self.real_time_data.rename(columns={'carpark_number': 'car_park_no'}, inplace=True)
+        self.real_time_data.at[1, 'car_park_no'] = None
 
+        merged_df = self.merger.merge_data(self.static_data, self.real_time_data)
+        self.assertEqual(merged_df['car_park_no'].tolist(), ['B', 'C'])
+        self.assertTrue(pd.isna(merged_df.at[0, 'total_lots']))
+        self.assertEqual(self.merger.quarantine['source'].tolist(), ['static', 'availability'])
+        self.assertEqual(self.merger.quarantine['reason'].tolist(), ['car_park_no not text', 'car_park_no missing'])
+
+        self.static_data['car_park_no'] = [1, 2, 3]
         with self.assertRaises(ValueError):
             self.merger.merge_data(self.static_data, self.real_time_data)
 
+class TestIncrementalMerge(unittest.TestCase):
+    def setUp(self):
+        self.merger = DataMerger()
+        self.static_data = pd.DataFrame({
+            'car_park_no': ['A', 'B', 'C'],
+            'address': ['Location A', 'Location B', 'Location C'],
+        })
+        self.snapshot = pd.DataFrame({
+            'car_park_no': ['A', 'A', 'B', 'D'],
+            'lot_type': ['C', 'Y', 'C', 'C'],
+            'update_datetime': ['t0', 't0', 't0', 't0'],
+            'total_lots': [100, 10, 200, 300],
+            'lots_available': [50, 5, 180, 0],
+            'feed_timestamp': ['f0'] * 4,
+        })
+
+    def next_snapshot(self):
+        snapshot = self.snapshot.copy()
+        snapshot['feed_timestamp'] = 'f1'
+        snapshot.loc[1, ['update_datetime', 'lots_available']] = ['t1', 4]
+        snapshot.loc[3, ['update_datetime', 'lots_available']] = ['t1', 9]
+        return snapshot
+
+    def test_first_call_is_full_merge(self):
+        merged, changed = self.merger.merge_incremental(self.static_data, self.snapshot)
+        expected = self.merger.merge_data(self.static_data, self.snapshot)
+        pd.testing.assert_frame_equal(merged, expected)
+        self.assertEqual(sorted(changed), ['A', 'B', 'D'])
+
+    def test_only_changed_rows_are_written_to_a_copy(self):
+        merged, _ = self.merger.merge_incremental(self.static_data, self.snapshot)
+        before = merged.copy()
+        snapshot = self.next_snapshot()
+        updated, changed = self.merger.merge_incremental(self.static_data, snapshot)
+        self.assertIsNot(updated, merged)
+        pd.testing.assert_frame_equal(merged, before)
+        self.assertEqual(changed.tolist(), ['A'])
+        expected = self.merger.merge_data(self.static_data, snapshot)
+        pd.testing.assert_frame_equal(updated, expected, check_dtype=False)
+
+    def test_missing_availability_is_filled_like_a_full_merge(self):
+        self.merger.merge_incremental(self.static_data, self.snapshot)
+        snapshot = self.next_snapshot()
+        snapshot.loc[0, ['update_datetime', 'lots_available']] = ['t1', np.nan]
+        updated, _ = self.merger.merge_incremental(self.static_data, snapshot)
+        expected = self.merger.merge_data(self.static_data, snapshot)
+        pd.testing.assert_frame_equal(updated, expected, check_dtype=False)
+
+    def test_frames_are_reused_in_turn(self):
+        first, _ = self.merger.merge_incremental(self.static_data, self.snapshot)
+        second_snapshot = self.next_snapshot()
+        second, _ = self.merger.merge_incremental(self.static_data, second_snapshot)
+        before = second.copy()
+        third_snapshot = second_snapshot.copy()
+        third_snapshot['feed_timestamp'] = 'f2'
+        third_snapshot.loc[2, ['update_datetime', 'lots_available']] = ['t2', 170]
+        third, changed = self.merger.merge_incremental(self.static_data, third_snapshot)
+        # The frame two refreshes back is caught up in place; the previous one is left alone.
+        self.assertIs(third, first)
+        pd.testing.assert_frame_equal(second, before)
+        self.assertEqual(changed.tolist(), ['B'])
+        expected = self.merger.merge_data(self.static_data, third_snapshot)
+        pd.testing.assert_frame_equal(third, expected, check_dtype=False)
+
+    def test_unchanged_snapshot_reports_nothing(self):
+        self.merger.merge_incremental(self.static_data, self.snapshot)
+        _, changed = self.merger.merge_incremental(self.static_data, self.snapshot.copy())
+        self.assertEqual(len(changed), 0)
+
+    def test_new_lot_type_falls_back_to_full_merge(self):
+        merged, _ = self.merger.merge_incremental(self.static_data, self.snapshot)
+        snapshot = pd.concat([self.snapshot, pd.DataFrame({
+            'car_park_no': ['C'], 'lot_type': ['C'], 'update_datetime': ['t1'],
+            'total_lots': [40], 'lots_available': [2], 'feed_timestamp': ['f0'],
+        })], ignore_index=True)
+        updated, changed = self.merger.merge_incremental(self.static_data, snapshot)
+        self.assertIsNot(updated, merged)
+        self.assertEqual(updated.loc[updated['car_park_no'] == 'C', 'lots_available'].tolist(), [2])
+
 if __name__ == '__main__':
     unittest.main()
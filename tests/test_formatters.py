@@ -0,0 +1,75 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from modules.formatters import (
+    LAST_UPDATE_LINES, OutputWriter, TextFormatter, formatter_for, paginate, take_chunks, write_frames,
+)
+
+class TestFormatters(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'car_park_no': ['ACB', 'ACM', 'AH1'],
+            'address': ['Location A', 'Location B', 'Location C'],
+            'total_lots': [100, 150, 200],
+            'lots_available': [50, np.nan, 150],
+        })
+
+    def render(self, output_format, chunk_rows=2, **options):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            write_frames(take_chunks(self.data, np.arange(len(self.data)), chunk_rows),
+                         formatter_for(output_format, **options))
+        return out.getvalue()
+
+    def test_text_fills_missing_columns(self):
+        lines = self.render('text', separator=True).splitlines()
+        self.assertEqual(lines[1], "Car Park No: ACB")
+        self.assertEqual(lines[3], "Operating Hours: N/A")
+        self.assertIn("Capacity: Total lots: 150, Lots available: nan", lines)
+        self.assertEqual(lines.count("-------------------------------------------------"), 3)
+
+    def test_text_requires_address(self):
+        with self.assertRaises(KeyError):
+            TextFormatter().rows(self.data.drop(columns='address'))
+
+    def test_json_array_spans_chunks(self):
+        records = json.loads(self.render('json'))
+        self.assertEqual([r['car_park_no'] for r in records], ['ACB', 'ACM', 'AH1'])
+        self.assertIsNone(records[1]['lots_available'])
+        self.assertEqual(json.loads(self.render('json', chunk_rows=5)), records)
+
+    def test_ndjson_and_csv_write_one_header(self):
+        self.assertEqual(len(self.render('ndjson').splitlines()), 3)
+        lines = self.render('csv', columns=['car_park_no', 'total_lots']).splitlines()
+        self.assertEqual(lines, ['car_park_no,total_lots', 'ACB,100', 'ACM,150', 'AH1,200'])
+
+    def test_table_aligns_columns(self):
+        lines = self.render('table', columns=['car_park_no', 'address']).splitlines()
+        self.assertEqual(lines[0], 'car_park_no  address')
+        self.assertEqual(lines[2], 'ACB          Location A')
+
+    def test_writer_prints_in_one_call(self):
+        with patch('builtins.print') as mocked_print:
+            write_frames([self.data.iloc[:1]], TextFormatter(LAST_UPDATE_LINES, required=()))
+        mocked_print.assert_called_once_with("Last Update Time: N/A")
+        with patch('builtins.print') as mocked_print:
+            with OutputWriter(flush_size=10) as writer:
+                writer.write("0123456789\n")
+                writer.write("tail")
+        self.assertEqual(mocked_print.call_count, 2)
+
+    def test_paginate(self):
+        positions = np.arange(10)
+        self.assertEqual(paginate(positions, 2, 3).tolist(), [2, 3, 4])
+        self.assertEqual(paginate(positions, 8).tolist(), [8, 9])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            formatter_for('xml')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from modules.history_store import HistoryStore
+
+def snapshot(minute, available=(10, 20, 5)):
+    feed = pd.Timestamp('2025-03-10 08:00', tz='Asia/Singapore') + pd.Timedelta(minutes=minute)
+    return pd.DataFrame({
+        'carpark_number': ['ACM', 'ACM', 'ACB'],
+        'update_datetime': (feed - pd.Timedelta(seconds=30)).strftime('%Y-%m-%dT%H:%M:%S'),
+        'total_lots': [100, 40, 300],
+        'lot_type': ['C', 'Y', 'C'],
+        'lots_available': list(available),
+        'feed_timestamp': feed.isoformat(),
+    })
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = HistoryStore(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_append_and_query_round_trip(self):
+        self.store.append(snapshot(0))
+        self.store.append(snapshot(1, available=(11, 19, 6)))
+        result = self.store.query('ACM', lot_type='C')
+        self.assertEqual(result['lots_available'].tolist(), [10, 11])
+        self.assertEqual(result['total_lots'].tolist(), [100, 100])
+        self.assertEqual(str(result['feed_timestamp'].iloc[1]), '2025-03-10 08:01:00+08:00')
+        self.assertEqual(str(result['update_datetime'].iloc[0]), '2025-03-10 07:59:30+08:00')
+
+    def test_repeated_feed_timestamp_is_skipped(self):
+        self.assertTrue(self.store.append(snapshot(0)))
+        self.assertFalse(self.store.append(snapshot(0)))
+        self.assertEqual(len(self.store.segments), 1)
+
+    def test_older_snapshots_fill_gaps(self):
+        for minute in (0, 1, 4):
+            self.assertTrue(self.store.append(snapshot(minute, available=(minute, 0, 0))))
+        self.assertTrue(self.store.append(snapshot(2, available=(2, 0, 0))))
+        self.assertFalse(self.store.append(snapshot(1)))
+        self.store.compact()
+        self.assertFalse(self.store.append(snapshot(2)))
+        self.assertTrue(self.store.append(snapshot(3, available=(3, 0, 0))))
+        self.assertEqual(self.store.query('ACM', lot_type='C')['lots_available'].tolist(), [0, 1, 2, 3, 4])
+
+    def test_time_range_skips_segments(self):
+        for minute in range(5):
+            self.store.append(snapshot(minute, available=(minute, 0, 0)))
+        os.remove(os.path.join(self.directory, self.store.segments[0]['file']))
+        result = self.store.query('ACM', start='2025-03-10T08:02:00', end='2025-03-10T08:03:00', lot_type='C')
+        self.assertEqual(result['lots_available'].tolist(), [2, 3])
+
+    def test_unknown_car_park_returns_empty_frame(self):
+        self.store.append(snapshot(0))
+        result = self.store.query('XYZ')
+        self.assertTrue(result.empty)
+        self.assertIn('feed_timestamp', result.columns)
+
+    def test_compact_merges_segments(self):
+        for minute in range(6):
+            self.store.append(snapshot(minute, available=(minute, 0, 0)))
+        before = self.store.query()
+        self.assertEqual(self.store.compact(), 6)
+        self.assertEqual(len(self.store.segments), 1)
+        pd.testing.assert_frame_equal(self.store.query(), before)
+        self.assertEqual(len([f for f in os.listdir(self.directory) if f.endswith('.npz')]), 1)
+
+    def test_append_compacts_small_segments(self):
+        store = HistoryStore(self.directory, compact_segments=3)
+        for minute in range(3):
+            store.append(snapshot(minute, available=(minute, 0, 0)))
+        self.assertEqual(len(store.segments), 3)
+        store.append(snapshot(3, available=(3, 0, 0)))
+        self.assertEqual(len(store.segments), 1)
+        self.assertEqual(store.query('ACM', lot_type='C')['lots_available'].tolist(), [0, 1, 2, 3])
+        self.assertFalse(store.append(snapshot(2)))
+
+    def test_row_groups_are_skipped_by_car_park(self):
+        store = HistoryStore(self.directory, group_rows=2)
+        for minute in range(3):
+            store.append(snapshot(minute, available=(minute, 0, 7)))
+        store.compact()
+        groups = store.segments[0]['groups']
+        self.assertEqual([(g['first'], g['last']) for g in groups], [('ACB', 'ACB'), ('ACM', 'ACM')])
+        self.assertEqual(store.query('ACB')['lots_available'].tolist(), [7, 7, 7])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import argparse
+import io
+import json
+import os
+import pstats
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+import pandas as pd
+from modules import cli
+from modules.api_fetcher import APIFetcher
+from modules.instrumentation import Instrumentation, MetricsServer, instruments
+from tests.stub_server import StubFeedServer
+from tests.test_async_fetcher import feed_payload
+
+class TestInstrumentation(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        instrumentation = Instrumentation()
+        with instrumentation.stage('load'):
+            instrumentation.add('load', rows=10)
+        self.assertEqual(instrumentation.stages, {})
+
+    def test_stages_accumulate_timers_and_counters(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable(memory=True)
+        self.addCleanup(instrumentation.disable)
+        for _ in range(2):
+            with instrumentation.stage('merge'):
+                with instrumentation.stage('index'):
+                    sum(range(10_000))
+            instrumentation.add('merge', rows=5, bytes=100)
+        merge = instrumentation.stages['merge']
+        self.assertEqual((merge.calls, merge.rows, merge.bytes), (2, 10, 200))
+        self.assertGreaterEqual(merge.wall, instrumentation.stages['index'].wall)
+        self.assertGreater(merge.cpu, 0)
+        self.assertGreater(merge.peak_rss, 0)
+        self.assertEqual(json.loads(instrumentation.to_json())['stages']['index']['calls'], 2)
+        self.assertIn('merge', instrumentation.summary())
+
+    def test_prometheus_text(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable()
+        with instrumentation.stage('fetch.http'):
+            pass
+        instrumentation.add('fetch.http', bytes=512)
+        text = instrumentation.prometheus()
+        self.assertIn('# TYPE carpark_stage_wall_seconds_total counter', text)
+        self.assertIn('carpark_stage_calls_total{stage="fetch.http"} 1', text)
+        self.assertIn('carpark_stage_bytes_total{stage="fetch.http"} 512', text)
+        # Without memory sampling there is no peak to report.
+        self.assertNotIn('carpark_stage_peak_rss_bytes{', text)
+
+    def test_profiles_outermost_stages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            instrumentation = Instrumentation()
+            instrumentation.enable(profile_dir=tmp)
+            with instrumentation.stage('merge'):
+                with instrumentation.stage('index'):
+                    sorted(range(1000), reverse=True)
+            paths = instrumentation.dump_profiles()
+            self.assertEqual(paths, [os.path.join(tmp, 'merge.prof')])
+            self.assertGreater(pstats.Stats(paths[0]).total_calls, 0)
+
+    def test_metrics_server(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable()
+        with instrumentation.stage('load'):
+            pass
+        server = MetricsServer('127.0.0.1:0', instrumentation).start()
+        try:
+            host, port = server.server_address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+                self.assertIn('carpark_stage_calls_total{stage="load"} 1', response.read().decode())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5)
+        finally:
+            server.close()
+
+class TestPipelineStages(unittest.TestCase):
+    def setUp(self):
+        instruments.enable()
+        self.addCleanup(instruments.reset)
+        self.addCleanup(instruments.disable)
+
+    def test_fetch_records_http_json_and_parse_stages(self):
+        with StubFeedServer(feed_payload) as server:
+            APIFetcher(server.url).fetch_data()
+        self.assertGreater(instruments.stages['fetch.http'].bytes, 0)
+        self.assertEqual(instruments.stages['fetch.json'].calls, 1)
+        self.assertEqual(instruments.stages['fetch.parse'].rows, 1)
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    def test_profile_flag_reports_to_stderr(self, MockFetcher, MockLoader, mock_args):
+        MockLoader.return_value.load_data.return_value = pd.DataFrame({
+            'car_park_no': ['ACB'], 'address': ['Location A'], 'x_coord': [1.0], 'y_coord': [1.0]})
+        MockFetcher.return_value.fetch_data.return_value = pd.DataFrame({
+            'car_park_no': ['ACB'], 'total_lots': [100], 'lots_available': [50]})
+        mock_args.return_value = argparse.Namespace(query='ACB', search=None, view=None, profile='json',
+                                                    no_daemon=True)
+        with patch('sys.stdout', new_callable=io.StringIO) as out, \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            cli.main()
+        self.assertIn("Car Park No: ACB", out.getvalue())
+        stages = json.loads(err.getvalue())['stages']
+        self.assertEqual(stages['merge']['rows'], 1)
+        self.assertEqual(stages['action.query']['calls'], 1)
+        self.assertIn('index', stages)
+
+if __name__ == '__main__':
+    unittest.main()
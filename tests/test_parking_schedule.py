@@ -0,0 +1,72 @@
+import datetime
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.parking_schedule import ScheduleTable, compile_schedule, load_holidays, local_time
+
+class TestCompileSchedule(unittest.TestCase):
+    def test_catalogue_schedules(self):
+        self.assertEqual(compile_schedule('NO'), ())
+        self.assertEqual(compile_schedule('WHOLE DAY'), ((0b11111111, 0, 1440),))
+        self.assertEqual(compile_schedule('7AM-10.30PM'), ((0b11111111, 420, 1350),))
+        # Sunday is bit 6 and public holidays bit 7.
+        self.assertEqual(compile_schedule('SUN & PH FR 1PM-10.30PM'), ((0b11000000, 780, 1350),))
+
+    def test_day_ranges_and_overnight_windows(self):
+        self.assertEqual(compile_schedule('mon-fri fr 10pm-7am; sat fr 12pm-12am'),
+                         ((0b0011111, 1320, 1860), (0b0100000, 720, 1440)))
+        self.assertEqual(compile_schedule('FRI-MON FR 9AM-5PM'), ((0b1110001, 540, 1020),))
+
+    def test_unreadable_schedules(self):
+        for text in ('SOMETIMES', 'XMAS FR 7AM-7PM', '7AM-13PM', 'PH-SUN FR 7AM-7PM'):
+            with self.assertRaises(ValueError):
+                compile_schedule(text)
+
+class TestScheduleTable(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({'free_parking': np.tile(
+            ['SUN & PH FR 7AM-10.30PM', 'NO', 'MON-FRI FR 10PM-7AM', 'SOMETIMES', None], 200)})
+
+    def active(self, at, holidays=()):
+        return ScheduleTable(self.data, 'free_parking').active(at, holidays)[:5].tolist()
+
+    def test_evaluates_every_row(self):
+        self.assertEqual(self.active('2025-03-09T08:00'), [True, False, False, False, False])
+        self.assertEqual(self.active('2025-03-09T23:00'), [False, False, False, False, False])
+        # Friday's overnight window carries on into Saturday morning.
+        self.assertEqual(self.active('2025-03-15T06:59'), [False, False, True, False, False])
+        self.assertEqual(self.active('2025-03-15T07:00'), [False, False, False, False, False])
+        # Aware times are read in Singapore time.
+        self.assertEqual(self.active('2025-03-09T00:00:00+00:00'), [True, False, False, False, False])
+
+    def test_public_holidays(self):
+        holiday = datetime.date(2025, 3, 31)
+        self.assertEqual(self.active('2025-03-31T08:00'), [False, False, False, False, False])
+        self.assertEqual(self.active('2025-03-31T08:00', {holiday}), [True, False, False, False, False])
+
+    def test_compiles_each_distinct_schedule_once(self):
+        compile_schedule.cache_clear()
+        table = ScheduleTable(self.data, 'free_parking')
+        self.assertEqual(compile_schedule.cache_info().misses, 4)
+        self.assertEqual(table.unparsed, ['SOMETIMES'])
+
+class TestHolidays(unittest.TestCase):
+    def test_reads_date_lists_and_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            listed, table = os.path.join(tmp, 'holidays.txt'), os.path.join(tmp, 'holidays.csv')
+            with open(listed, 'w') as f:
+                f.write("# Singapore\n2025-03-31\n\n2025-04-18\n")
+            with open(table, 'w') as f:
+                f.write("date,day,holiday\n2025-03-31,Monday,Hari Raya Puasa\n2025-04-18,Friday,Good Friday\n")
+            expected = {datetime.date(2025, 3, 31), datetime.date(2025, 4, 18)}
+            self.assertEqual(load_holidays(listed), expected)
+            self.assertEqual(load_holidays(table), expected)
+
+    def test_local_time(self):
+        self.assertEqual(local_time('2025-03-09T08:00').utcoffset(), datetime.timedelta(hours=8))
+        self.assertEqual(local_time('2025-03-09T00:00+00:00').hour, 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import pandas as pd
+from modules.schema import Column, Schema, reason_counts
+
+SCHEMA = Schema({
+    'code': Column('text', nullable=False),
+    'flag': Column('text', pattern='Y|N'),
+    'count': Column('integer', nullable=False, min=0),
+    'height': Column('number', min=0, max=5),
+})
+
+class TestSchema(unittest.TestCase):
+    def test_bad_rows_are_quarantined_with_every_reason(self):
+        data = pd.DataFrame({
+            'code': ['A', '', 'C', 4, 'E', None],
+            'flag': ['Y', 'N', 'maybe', 'Y', None, 'N'],
+            'count': ['1', '2', '3', '4.5', 'n/a', '-1'],
+            'height': [1.5, np.nan, 2.0, 9.0, -1.0, 0.0],
+        })
+        valid, quarantine = SCHEMA.validate(data)
+        self.assertEqual(valid['code'].tolist(), ['A'])
+        self.assertEqual(valid['count'].dtype, 'int64')
+        self.assertEqual(quarantine.index.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(quarantine['count'].tolist(), ['2', '3', '4.5', 'n/a', '-1'])
+        self.assertEqual(quarantine['reason'].tolist(), [
+            'code missing',
+            'flag does not match Y|N',
+            'code not text; count not an integer; height above 5',
+            'count not a number; height below 0',
+            'code missing; count below 0',
+        ])
+        counts = reason_counts(quarantine)
+        self.assertEqual(counts['code missing'], 2)
+        self.assertEqual(counts.sum(), 9)
+
+    def test_clean_frames_pass_through(self):
+        data = pd.DataFrame({'code': ['A', 'B'], 'flag': ['Y', 'N'], 'count': [1, 2], 'height': [1.0, 2.0]})
+        valid, quarantine = SCHEMA.validate(data)
+        pd.testing.assert_frame_equal(valid, data)
+        self.assertTrue(quarantine.empty)
+        self.assertTrue(reason_counts(quarantine).empty)
+        valid, _ = Schema({'code': Column('text', nullable=False)}).validate(data)
+        self.assertIs(valid, data)
+
+    def test_numbers_are_cast_to_their_kind(self):
+        data = pd.DataFrame({'code': ['A', 'B'], 'count': ['10', '20'], 'height': [1, 2]})
+        valid, _ = SCHEMA.validate(data)
+        self.assertEqual(valid['count'].tolist(), [10, 20])
+        self.assertEqual(valid['count'].dtype, 'int64')
+        self.assertEqual(valid['height'].dtype, 'float64')
+        self.assertEqual(data['count'].tolist(), ['10', '20'])
+
+if __name__ == '__main__':
+    unittest.main()
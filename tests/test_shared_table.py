@@ -0,0 +1,144 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from modules import cli
+from modules.compact_schema import compact_frame
+from modules import shared_table
+from modules.shared_table import SharedTable
+
+STATIC = pd.DataFrame({
+    'car_park_no': ['ACB', 'ACM', 'AH1', 'BE3'],
+    'address': ['BLK 270/271 ALBERT CENTRE', 'BLK 98A ALJUNIED CRESCENT', 'BLK 101 JALAN DUSUN',
+                'BLK 14 BEDOK NORTH STREET 3'],
+    'x_coord': [30314.79, 33758.41, 29257.73, 38902.34],
+    'y_coord': [31490.49, 33695.52, 34500.99, 34225.14],
+    'car_park_type': ['BASEMENT CAR PARK', 'MULTI-STOREY CAR PARK', 'SURFACE CAR PARK', 'SURFACE CAR PARK'],
+    'type_of_parking_system': 'ELECTRONIC PARKING',
+    'short_term_parking': 'WHOLE DAY',
+    'free_parking': ['NO', 'SUN & PH FR 7AM-10.30PM', 'NO', 'NO'],
+    'night_parking': ['YES', 'YES', None, 'NO'],
+    'car_park_decks': [1, 5, 0, 0],
+    'gantry_height': [1.8, 2.1, 0.0, 0.0],
+    'car_park_basement': ['Y', 'N', 'N', 'N'],
+})
+FEED = pd.DataFrame({
+    'car_park_no': ['ACB', 'ACB', 'ACM', 'AH1'],
+    'update_datetime': '2025-03-08T23:16:32',
+    'total_lots': [100, 10, 150, 200],
+    'lot_type': ['C', 'Y', 'C', 'C'],
+    'lots_available': [50, 4, 0, 7],
+    'feed_timestamp': '2025-03-08T23:16:36+08:00',
+})
+
+def output(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        function(*args, **kwargs)
+    return out.getvalue()
+
+def column_total(path, column):
+    return float(SharedTable(path).frame()[column].sum())
+
+class TestSharedTable(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'carparks.table')
+        self.data = cli.DataMerger().merge_data(STATIC, FEED)
+
+    def test_round_trip_is_read_only_and_zero_copy(self):
+        for data in (self.data, compact_frame(self.data)):
+            SharedTable(self.path).publish(data)
+            frame = SharedTable(self.path).frame()
+            self.assertEqual(frame.columns.tolist(), data.columns.tolist())
+            for column in data.columns:
+                pd.testing.assert_series_equal(frame[column].astype(object), data[column].astype(object))
+            values = frame['x_coord'].to_numpy()
+            self.assertFalse(values.flags.writeable)
+            self.assertIsInstance(values.base, np.ndarray)
+            if shared_table._BLOCK_INTERNALS:
+                self.assertTrue(frame._mgr.is_consolidated())
+
+    def test_public_constructor_is_zero_copy_and_matches(self):
+        SharedTable(self.path).publish(self.data)
+        with patch('modules.shared_table._BLOCK_INTERNALS', False):
+            frame = SharedTable(self.path).frame()
+        pd.testing.assert_frame_equal(frame, SharedTable(self.path).frame())
+        values = frame['x_coord'].to_numpy()
+        self.assertFalse(values.flags.writeable)
+        self.assertIsInstance(values.base, np.ndarray)
+
+    def test_pandas_pin_keeps_the_block_internals(self):
+        # _attach builds its frame from pandas 1.x internals; raising the pin past 1.x must revisit it.
+        with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'requirements.txt')) as f:
+            pin = next(line.split('==')[1].strip() for line in f if line.startswith('pandas=='))
+        self.assertTrue(pin.startswith('1.'), f"pandas is pinned to {pin}: check SharedTable._attach, which builds "
+                                              "its frame from BlockManager internals on pandas 1.x only.")
+        self.assertTrue(shared_table._BLOCK_INTERNALS, f"pandas {pd.__version__} is installed, but {pin} is pinned.")
+
+    def test_answers_match_the_in_memory_path(self):
+        table = SharedTable(self.path)
+        table.publish(self.data)
+        frame = table.frame()
+        cli.build_indexes(frame)
+        for output_format in ('text', 'json', 'csv'):
+            for action, value, options in [
+                ('query', 'ACB', {}), ('view', 'AH1', {}), ('query', 'NOPE', {}),
+                ('search', 'blk', {'limit': 3}), ('search', 'aljunied cres', {}),
+                ('near', (30000, 32000), {'k': 3, 'available': True}),
+                ('filter', {'car_park_type': 'SURFACE CAR PARK'}, {}),
+                ('batch', ['ACM', 'NOPE', 'ACB'], {}),
+            ]:
+                self.assertEqual(output(cli.ACTIONS[action], value, frame, output_format=output_format, **options),
+                                 output(cli.ACTIONS[action], value, self.data, output_format=output_format, **options))
+        self.assertEqual(output(cli.show_busiest, 2, frame), output(cli.show_busiest, 2, self.data))
+
+    def test_readers_switch_versions_without_losing_the_old_one(self):
+        publisher, reader = SharedTable(self.path), SharedTable(self.path)
+        self.assertIsNone(reader.frame())
+        self.assertEqual(publisher.publish(self.data), 1)
+        first = reader.frame()
+        self.assertIs(reader.frame(), first)
+        self.assertEqual(publisher.publish(self.data.head(2)), 2)
+        second = reader.frame()
+        self.assertEqual((len(first), len(second), reader.generation), (len(self.data), 2, 2))
+        # The replaced version stays mapped for as long as a reader holds it.
+        self.assertEqual(first['car_park_no'].tolist(), self.data['car_park_no'].tolist())
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['carparks.table'])
+
+    def test_worker_processes_attach_to_the_published_table(self):
+        SharedTable(self.path).publish(self.data)
+        with multiprocessing.get_context('fork').Pool(2) as pool:
+            totals = pool.starmap(column_total, [(self.path, 'lots_available')] * 2)
+        self.assertEqual(totals, [float(self.data['lots_available'].sum())] * 2)
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    def test_cli_answers_from_a_fresh_table(self, MockFetcher, MockLoader, mock_args):
+        MockLoader.return_value.load_data.return_value = STATIC
+        MockFetcher.return_value.fetch_data.return_value = FEED.head(1)
+        SharedTable(self.path).publish(self.data)
+        mock_args.return_value = argparse.Namespace(query='ACM', search=None, view=None, shared=self.path,
+                                                    refresh_interval=60, no_daemon=True)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.main()
+        self.assertIn("Car Park No: ACM", out.getvalue())
+        MockLoader.return_value.load_data.assert_not_called()
+        MockFetcher.return_value.fetch_data.assert_not_called()
+
+        # A table its publisher stopped refreshing is passed over for a fresh fetch.
+        with patch('modules.shared_table.time.time', return_value=time.time() + 300), \
+                patch('sys.stdout', new_callable=io.StringIO):
+            cli.main()
+        MockFetcher.return_value.fetch_data.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
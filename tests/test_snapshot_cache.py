@@ -0,0 +1,107 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from modules.data_loader import DataLoader
+from modules.snapshot_cache import SNAPSHOT_VERSION, SnapshotCache
+
+CSV_TEXT = """car_park_no,address,x_coord,y_coord,car_park_type,type_of_parking_system,short_term_parking,free_parking,night_parking,car_park_decks,gantry_height,car_park_basement
+ACB,BLK 270/271 ALBERT CENTRE BASEMENT CAR PARK,30314.7936,31490.4942,BASEMENT CAR PARK,ELECTRONIC PARKING,WHOLE DAY,NO,YES,1,1.80,Y
+ACM, BLK 98A ALJUNIED CRESCENT ,33758.4143,33695.5198,MULTI-STOREY CAR PARK,ELECTRONIC PARKING,WHOLE DAY,SUN & PH FR 7AM-10.30PM,,5,2.10,N
+"""
+
+def _cold_load(csv_path, cache_dir):
+    return len(DataLoader(csv_path, cache_dir=cache_dir).load_data())
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmp_dir, 'carparks.csv')
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        with open(self.csv_path, 'w') as f:
+            f.write(CSV_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_warm_load_matches_cold_load(self):
+        cold = DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+        with patch('pandas.read_csv') as mock_read_csv:
+            warm = DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+            mock_read_csv.assert_not_called()
+        pd.testing.assert_frame_equal(warm, cold)
+        self.assertTrue(pd.isna(warm.at[1, 'night_parking']))
+        self.assertEqual(warm.at[1, 'address'], 'BLK 98A ALJUNIED CRESCENT')
+
+    def test_content_change_invalidates_snapshot(self):
+        DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+        with open(self.csv_path, 'w') as f:
+            f.write(CSV_TEXT.replace('ACB', 'ACX'))
+        data = DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+        self.assertEqual(data.at[0, 'car_park_no'], 'ACX')
+
+    def test_touch_without_change_keeps_snapshot(self):
+        DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+        stat = os.stat(self.csv_path)
+        os.utime(self.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        cache = SnapshotCache(self.cache_dir, self.csv_path)
+        self.assertTrue(cache.is_valid())
+
+    def test_rebuild_cache_rereads_csv(self):
+        DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+        with patch('pandas.read_csv', wraps=pd.read_csv) as mock_read_csv:
+            DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data(rebuild_cache=True)
+            mock_read_csv.assert_called_once()
+
+    def test_warm_load_keeps_the_quarantine(self):
+        with open(self.csv_path, 'a') as f:
+            f.write("BAD,BLK 1 NOWHERE,1,1,SURFACE CAR PARK,COUPON PARKING,NO,NO,NO,-2,0,N\n")
+        cold_loader = DataLoader(self.csv_path, cache_dir=self.cache_dir)
+        cold_loader.load_data()
+        warm_loader = DataLoader(self.csv_path, cache_dir=self.cache_dir)
+        with patch('pandas.read_csv') as mock_read_csv:
+            warm_loader.load_data()
+            mock_read_csv.assert_not_called()
+        pd.testing.assert_frame_equal(warm_loader.quarantine, cold_loader.quarantine)
+        self.assertEqual(warm_loader.quarantine['car_park_no'].tolist(), ['BAD'])
+
+    def test_snapshot_from_older_version_is_rebuilt(self):
+        cache = SnapshotCache(self.cache_dir, self.csv_path)
+        DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+        with open(cache.meta_path) as f:
+            meta = json.load(f)
+        meta['version'] = SNAPSHOT_VERSION - 1
+        with open(cache.meta_path, 'w') as f:
+            json.dump(meta, f)
+        self.assertIsNone(cache.load())
+        with patch('pandas.read_csv', wraps=pd.read_csv) as mock_read_csv:
+            DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+            mock_read_csv.assert_called_once()
+
+    def test_invalidate(self):
+        cache = SnapshotCache(self.cache_dir, self.csv_path)
+        DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+        cache.invalidate()
+        self.assertIsNone(cache.load())
+
+    def test_concurrent_cold_loads_share_no_temp_files(self):
+        with multiprocessing.get_context('fork').Pool(4) as pool:
+            rows = pool.starmap(_cold_load, [(self.csv_path, self.cache_dir)] * 8)
+        self.assertEqual(rows, [2] * 8)
+        self.assertIsNotNone(SnapshotCache(self.cache_dir, self.csv_path).load())
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name.endswith(('.tmp', '.old'))], [])
+
+    def test_failed_snapshot_write_is_a_miss(self):
+        with patch('numpy.save', side_effect=OSError('disk full')), patch('builtins.print') as mock_print:
+            data = DataLoader(self.csv_path, cache_dir=self.cache_dir).load_data()
+            mock_print.assert_not_called()
+        self.assertEqual(len(data), 2)
+        self.assertIsNone(SnapshotCache(self.cache_dir, self.csv_path).load())
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+if __name__ == '__main__':
+    unittest.main()
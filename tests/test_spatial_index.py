@@ -0,0 +1,70 @@
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from modules.spatial_index import GridIndex, wgs84_to_svy21
+
+class TestGridIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame({
+            'x_coord': rng.uniform(10000, 20000, 500),
+            'y_coord': rng.uniform(30000, 36000, 500),
+        })
+        self.data.loc[7, 'x_coord'] = np.nan
+        self.index = GridIndex(self.data, cell_size=250.0)
+
+    def brute_force(self, x, y):
+        distances = np.hypot(self.data['x_coord'] - x, self.data['y_coord'] - y).to_numpy()
+        distances[np.isnan(distances)] = np.inf
+        return distances
+
+    def test_nearest_matches_brute_force(self):
+        for x, y in [(15000, 33000), (10000, 30000), (25000, 40000), (12345, 35999)]:
+            rows, distances = self.index.nearest(x, y, k=7)
+            expected = np.sort(self.brute_force(x, y))[:7]
+            np.testing.assert_allclose(distances, expected)
+            self.assertNotIn(7, rows)
+
+    def test_off_grid_points_skip_empty_rings(self):
+        # A swapped latitude and longitude lands about 10,000 km off the grid.
+        for x, y in [(1.0e7, 33000), (15000, -1.0e7), (-5.0e6, 5.0e6)]:
+            start = time.perf_counter()
+            rows, distances = self.index.nearest(x, y, k=3)
+            self.assertLess(time.perf_counter() - start, 0.5)
+            np.testing.assert_allclose(distances, np.sort(self.brute_force(x, y))[:3])
+        rows, _ = self.index.nearest(1.0e7, 33000, k=3, radius=1000)
+        self.assertEqual(len(rows), 0)
+
+    def test_radius(self):
+        rows, distances = self.index.nearest(15000, 33000, k=None, radius=600)
+        brute = self.brute_force(15000, 33000)
+        self.assertEqual(sorted(rows.tolist()), np.flatnonzero(brute <= 600).tolist())
+        self.assertTrue((np.diff(distances) >= 0).all())
+
+    def test_mask(self):
+        mask = np.zeros(len(self.data), dtype=bool)
+        mask[::2] = True
+        rows, _ = self.index.nearest(15000, 33000, k=5, mask=mask)
+        self.assertEqual(len(rows), 5)
+        self.assertTrue((rows % 2 == 0).all())
+
+    def test_no_match(self):
+        rows, distances = self.index.nearest(15000, 33000, k=5, radius=0.001)
+        self.assertEqual(len(rows), 0)
+        self.assertEqual(len(distances), 0)
+
+class TestWGS84ToSVY21(unittest.TestCase):
+    def test_projection_origin(self):
+        x, y = wgs84_to_svy21(1.366666, 103.833333)
+        self.assertAlmostEqual(float(x), 28001.642, places=3)
+        self.assertAlmostEqual(float(y), 38744.572, places=3)
+
+    def test_vectorized(self):
+        x, y = wgs84_to_svy21([1.3214, 1.3000], [103.8856, 103.8000])
+        self.assertEqual(x.shape, (2,))
+        self.assertAlmostEqual(x[0], 33818.4, places=0)
+        self.assertAlmostEqual(y[0], 33739.4, places=0)
+
+if __name__ == '__main__':
+    unittest.main()
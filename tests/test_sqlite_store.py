@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from modules import cli
+from modules.sqlite_store import SQLiteStore
+
+STATIC = pd.DataFrame({
+    'car_park_no': ['ACB', 'ACM', 'AH1', 'BE3'],
+    'address': ['BLK 270/271 ALBERT CENTRE', 'BLK 98A ALJUNIED CRESCENT', 'BLK 101 JALAN DUSUN',
+                'BLK 14 BEDOK NORTH STREET 3'],
+    'x_coord': [30314.79, 33758.41, 29257.73, 38902.34],
+    'y_coord': [31490.49, 33695.52, 34500.99, 34225.14],
+    'car_park_type': ['BASEMENT CAR PARK', 'MULTI-STOREY CAR PARK', 'SURFACE CAR PARK', 'SURFACE CAR PARK'],
+    'type_of_parking_system': 'ELECTRONIC PARKING',
+    'short_term_parking': 'WHOLE DAY',
+    'free_parking': ['NO', 'SUN & PH FR 7AM-10.30PM', 'NO', 'NO'],
+    'night_parking': 'YES',
+    'car_park_decks': [1, 5, 0, 0],
+    'gantry_height': [1.8, 2.1, 0.0, 0.0],
+    'car_park_basement': ['Y', 'N', 'N', 'N'],
+})
+
+def feed(available=(50, 4, 20, 7, 9), timestamp='2025-03-08T23:16:36+08:00'):
+    return pd.DataFrame({
+        'car_park_no': ['ACB', 'ACB', 'ACM', 'AH1', 'BE3'],
+        'update_datetime': '2025-03-08T23:16:32',
+        'total_lots': [100, 10, 150, 200, 90],
+        'lot_type': ['C', 'Y', 'C', 'C', 'C'],
+        'lots_available': list(available),
+        'feed_timestamp': timestamp,
+    })
+
+def output(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        function(*args, **kwargs)
+    return out.getvalue()
+
+class TestSQLiteStore(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'carparks.db')
+        self.store = SQLiteStore(self.path)
+        self.store.load_catalogue(STATIC, 'source')
+        self.store.upsert_availability(feed())
+
+    def test_answers_match_the_in_memory_path(self):
+        data = cli.DataMerger().merge_data(STATIC, feed())
+        for output_format in ('text', 'json', 'csv'):
+            for number in ('ACB', 'NOPE'):
+                self.assertEqual(output(cli.store_query, number, self.store, output_format=output_format),
+                                 output(cli.query_carpark, number, data, output_format=output_format))
+                self.assertEqual(output(cli.store_view, number, self.store, output_format=output_format),
+                                 output(cli.view_last_update, number, data, output_format=output_format))
+            for address in ('blk', 'ALJUNIED CRES', 'bedok north st', 'nowhere'):
+                self.assertEqual(output(cli.store_search, address, self.store, limit=2, output_format=output_format),
+                                 output(cli.search_by_address, address, data, limit=2, output_format=output_format))
+            self.assertEqual(output(cli.store_nearest, (30000, 32000), self.store, k=3, output_format=output_format),
+                             output(cli.find_nearest, (30000, 32000), data, k=3, output_format=output_format))
+
+    def test_search_type_ahead_on_partly_typed_long_forms(self):
+        for address, expected in (('BEDOK NOR', ['BE3']), ('aljunied cresc', ['ACM']), ('bedok north stre', ['BE3']),
+                                  ('blo', ['ACB', 'ACM', 'AH1', 'BE3']), ('jalan dus', ['AH1'])):
+            self.assertEqual(self.store.search(address)['car_park_no'].tolist(), expected)
+
+    def test_nearest_within_radius_and_available(self):
+        self.store.upsert_availability(feed(available=(0, 0, 20, 7, 9)))
+        self.assertEqual(self.store.nearest(30000, 32000, k=5, radius=3000)['car_park_no'].tolist(),
+                         ['ACB', 'AH1'])
+        self.assertEqual(self.store.nearest(30000, 32000, k=2, available=True)['car_park_no'].tolist(),
+                         ['AH1', 'ACM'])
+
+    def test_upsert_replaces_the_latest_snapshot(self):
+        later = feed(available=(49, 4, 20, 7, 9), timestamp='2025-03-08T23:17:36+08:00').drop(index=1)
+        self.store.upsert_availability(later)
+        result = self.store.lookup('ACB')
+        self.assertEqual(result['lot_type'].tolist(), ['C'])
+        self.assertEqual(result['lots_available'].tolist(), [49])
+
+    def test_only_one_process_refreshes_a_stale_store(self):
+        fetches = []
+        def fetch():
+            fetches.append(1)
+            time.sleep(0.2)
+            return feed()
+        # Each reader opens its own connection, as separate processes would.
+        readers = [threading.Thread(target=lambda: SQLiteStore(self.path).refresh(fetch, max_age=60))
+                   for _ in range(4)]
+        self.store.upsert_availability(feed(), fetched_at=time.time() - 120)
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(len(fetches), 1)
+        self.assertLess(self.store.age(), 60)
+
+    def test_fetch_runs_outside_the_write_lock(self):
+        self.store.upsert_availability(feed(), fetched_at=time.time() - 120)
+        seen = []
+        def fetch():
+            # Another process finds the refresh claimed, and writers are not blocked by the fetch.
+            other = SQLiteStore(self.path, timeout=0.1)
+            seen.append(other.refresh(lambda: self.fail("fetched twice"), max_age=60))
+            other.load_catalogue(STATIC, 'source')
+            seen.append(other.lookup('ACB')['lots_available'].tolist())
+            return feed(available=(49, 4, 20, 7, 9))
+        self.assertTrue(self.store.refresh(fetch, max_age=60))
+        self.assertEqual(seen, [False, [50, 4]])
+        self.assertEqual(self.store.lookup('ACB')['lots_available'].tolist(), [49, 4])
+
+    def test_failed_fetch_releases_the_claim(self):
+        self.store.upsert_availability(feed(), fetched_at=time.time() - 120)
+        def fail():
+            raise ConnectionError("feed down")
+        with self.assertRaises(ConnectionError):
+            self.store.refresh(fail, max_age=60)
+        self.assertTrue(self.store.refresh(lambda: feed(available=(49, 4, 20, 7, 9)), max_age=60))
+        self.assertEqual(self.store.lookup('ACB')['lots_available'].tolist(), [49, 4])
+
+    @patch('modules.cli.APIFetcher')
+    def test_cli_answers_from_stored_data_when_the_fetch_fails(self, MockFetcher):
+        MockFetcher.return_value.fetch_data.side_effect = ConnectionError("feed down")
+        self.store.upsert_availability(feed(), fetched_at=time.time() - 120)
+        with patch.object(cli, 'catalogue_source', return_value='source'), \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            store = cli.open_store(self.path, max_age=60)
+            answer = output(cli.store_query, 'ACB', store)
+        self.assertIn("Warning: could not refresh availability (feed down)", err.getvalue())
+        self.assertIn("Lots available: 50", answer)
+
+    @patch('modules.cli.argparse.ArgumentParser.parse_args')
+    @patch('modules.cli.DataLoader')
+    @patch('modules.cli.APIFetcher')
+    def test_cli_shares_the_store_between_calls(self, MockFetcher, MockLoader, mock_args):
+        MockLoader.return_value.load_data.return_value = STATIC
+        MockFetcher.return_value.fetch_data.return_value = feed()
+        path = os.path.join(os.path.dirname(self.path), 'shared.db')
+        for number in ('ACB', 'ACM'):
+            mock_args.return_value = argparse.Namespace(query=number, search=None, view=None, store=path,
+                                                        refresh_interval=60)
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                cli.main()
+            self.assertIn(f"Car Park No: {number}", out.getvalue())
+        # The second call read what the first one stored.
+        self.assertEqual(MockLoader.return_value.load_data.call_count, 1)
+        self.assertEqual(MockFetcher.return_value.fetch_data.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
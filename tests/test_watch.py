@@ -0,0 +1,133 @@
+import io
+import json
+import os
+import socket
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from modules import cli
+from modules.watch import AvailabilityWatcher, DeltaFilter, DeltaPublisher, StdoutSink, diff_snapshots
+from tests.stub_server import StubFeedServer
+
+def snapshot(available, feed_timestamp='2025-03-08T23:16:36+08:00'):
+    """ A fetch_availability frame from {(car park, lot type): lots available}. """
+    keys = list(available)
+    return pd.DataFrame({
+        'car_park_no': [number for number, _ in keys],
+        'update_datetime': '2025-03-08T23:16:32',
+        'total_lots': 100,
+        'lot_type': [lot_type for _, lot_type in keys],
+        'lots_available': list(available.values()),
+        'feed_timestamp': feed_timestamp,
+    })
+
+class TestDiffSnapshots(unittest.TestCase):
+    def test_reports_changed_added_and_removed_records(self):
+        before = snapshot({('ACB', 'C'): 50, ('ACB', 'Y'): 4, ('ACM', 'C'): 20, ('AH1', 'C'): 7})
+        # Reordered rows, one change, one new car park and one that is no longer listed.
+        after = snapshot({('ACM', 'C'): 20, ('ACB', 'Y'): 3, ('ACB', 'C'): 50, ('BE3', 'C'): 9})
+        deltas = diff_snapshots(before, after).set_index(['car_park_no', 'lot_type'])
+        self.assertEqual(deltas['change'].to_dict(),
+                         {('ACB', 'Y'): 'changed', ('BE3', 'C'): 'added', ('AH1', 'C'): 'removed'})
+        self.assertEqual(deltas.loc[('ACB', 'Y'), 'previous_lots_available'], 4)
+        self.assertEqual(deltas.loc[('ACB', 'Y'), 'lots_available'], 3)
+        self.assertTrue(pd.isna(deltas.loc[('AH1', 'C'), 'lots_available']))
+
+    def test_filters(self):
+        before = snapshot({('ACB', 'C'): 12, ('ACM', 'C'): 12, ('AH1', 'C'): 5})
+        after = snapshot({('ACB', 'C'): 9, ('ACM', 'C'): 30, ('AH1', 'C'): 4})
+        deltas = diff_snapshots(before, after)
+        self.assertEqual(DeltaFilter(carparks=['ACM', 'AH1'])(deltas)['car_park_no'].tolist(), ['ACM', 'AH1'])
+        # AH1 was already below 10, so only ACB crossed the threshold.
+        self.assertEqual(DeltaFilter(below=10)(deltas)['car_park_no'].tolist(), ['ACB'])
+
+class TestAvailabilityWatcher(unittest.TestCase):
+    def test_publishes_only_deltas(self):
+        snapshots = iter([snapshot({('ACB', 'C'): 50, ('ACM', 'C'): 20}),
+                          snapshot({('ACB', 'C'): 50, ('ACM', 'C'): 20}),
+                          snapshot({('ACB', 'C'): 49, ('ACM', 'C'): 20})])
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            AvailabilityWatcher(lambda: next(snapshots), [StdoutSink()], interval=0).run(polls=3)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records, [{
+            'car_park_no': 'ACB', 'lot_type': 'C', 'change': 'changed', 'lots_available': 49,
+            'previous_lots_available': 50, 'total_lots': 100, 'update_datetime': '2025-03-08T23:16:32',
+            'feed_timestamp': '2025-03-08T23:16:36+08:00',
+        }])
+
+    def test_watch_command_polls_the_feed(self):
+        polls = iter([50, 50, 42])
+        def payload(params):
+            return {'items': [{'timestamp': '2025-03-08T23:16:36+08:00', 'carpark_data': [{
+                'carpark_number': 'ACB', 'update_datetime': '2025-03-08T23:16:32',
+                'carpark_info': [{'total_lots': '100', 'lot_type': 'C', 'lots_available': str(next(polls))}],
+            }]}]}
+        with StubFeedServer(payload, etag=None) as server, patch.object(cli, 'API_URL', server.url), \
+                patch('sys.stdout', new_callable=io.StringIO) as out:
+            cli.watch_availability(interval=0, below=45, polls=3)
+        self.assertEqual([json.loads(line)['lots_available'] for line in out.getvalue().splitlines()], [42])
+
+    def test_watch_with_metrics_publishes_deltas_and_serves_metrics(self):
+        polls = iter([50, 42])
+        def payload(params):
+            return {'items': [{'timestamp': '2025-03-08T23:16:36+08:00', 'carpark_data': [{
+                'carpark_number': 'ACB', 'update_datetime': '2025-03-08T23:16:32',
+                'carpark_info': [{'total_lots': '100', 'lot_type': 'C', 'lots_available': str(next(polls))}],
+            }]}]}
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        with StubFeedServer(payload, etag=None) as server, patch.object(cli, 'API_URL', server.url), \
+                patch('sys.stdout', new_callable=io.StringIO) as out, \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            cli.watch_availability(interval=0, polls=2, metrics=f'127.0.0.1:{port}')
+        lines = out.getvalue().splitlines()
+        self.assertEqual(err.getvalue(), '')
+        self.assertEqual([json.loads(line)['lots_available'] for line in lines], [42])
+        # The metrics server is closed with the watch.
+        with self.assertRaises(OSError):
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+
+class TestDeltaPublisher(unittest.TestCase):
+    def wait_for_subscribers(self, publisher, count):
+        deadline = time.monotonic() + 5
+        while publisher.subscribers < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(publisher.subscribers, count)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets not available')
+    def test_streams_ndjson_to_socket_subscribers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            publisher = DeltaPublisher(os.path.join(tmp, 'watch.sock')).start()
+            try:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.settimeout(5)
+                    sock.connect(os.path.join(tmp, 'watch.sock'))
+                    self.wait_for_subscribers(publisher, 1)
+                    publisher.publish(['{"car_park_no":"ACB"}', '{"car_park_no":"ACM"}'])
+                    with sock.makefile('r') as stream:
+                        lines = [stream.readline(), stream.readline()]
+            finally:
+                publisher.close()
+        self.assertEqual([json.loads(line)['car_park_no'] for line in lines], ['ACB', 'ACM'])
+
+    def test_serves_server_sent_events(self):
+        publisher = DeltaPublisher('127.0.0.1:0', sse=True).start()
+        try:
+            with socket.create_connection(publisher.server_address, timeout=5) as sock:
+                sock.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+                with sock.makefile('r') as stream:
+                    self.assertEqual(stream.readline().strip(), "HTTP/1.1 200 OK")
+                    while stream.readline().strip():
+                        pass
+                    self.wait_for_subscribers(publisher, 1)
+                    publisher.publish(['{"car_park_no":"ACB"}'])
+                    event = [stream.readline().strip(), stream.readline().strip()]
+        finally:
+            publisher.close()
+        self.assertEqual(event, ['event: delta', 'data: {"car_park_no":"ACB"}'])
+
+if __name__ == '__main__':
+    unittest.main()